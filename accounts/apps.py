@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "accounts"
+
+    def ready(self) -> None:
+        """Подключает обработчики сигналов и системные проверки приложения."""
+        from accounts import checks, signals  # noqa: F401
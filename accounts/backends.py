@@ -0,0 +1,78 @@
+"""
+Бэкенд аутентификации с кэшированием пользователя сессии.
+
+AuthenticationMiddleware на каждом запросе загружает пользователя по id из сессии.
+CachedModelBackend берет его из кэша по ключу из id и версии пользователя; версия хранится
+в кэше отдельно и увеличивается сигналами accounts.signals после фиксации изменения пользователя
+(роль, пароль, флаг активности и прочие поля), поэтому устаревшая запись становится недостижимой.
+Проверка хэша сессии (смена пароля завершает сессии) выполняется Django как обычно —
+по паролю из актуальной записи.
+
+Вместе с кэшируемыми сессиями (SESSION_ENGINE cached_db) аутентификация запроса
+в установившемся режиме не выполняет SQL-запросов. Бэкенду нужен кэш, общий для всех воркеров:
+настройки включают его только с таким кэшем, а с кэшем процесса проверка accounts.E001 сообщает об ошибке.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+import time
+from typing import Any, Optional
+
+VERSION_KEY_PREFIX = "accounts:user-version:"
+USER_KEY_PREFIX = "accounts:user:"
+
+_MISSING = object()
+
+
+def _version_key(user_id: Any) -> str:
+    """Возвращает ключ версии пользователя."""
+    return f"{VERSION_KEY_PREFIX}{user_id}"
+
+
+def get_user_version(user_id: Any) -> int:
+    """
+    Возвращает текущую версию пользователя, инициализируя отсутствующую.
+
+    Начальная версия — время в наносекундах, чтобы после вытеснения ключа версии из кэша
+    старые записи пользователя не совпали с новой версией.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_user_version(user_id: Any) -> None:
+    """Увеличивает версию пользователя, делая недоступной его закэшированную запись."""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_user_version_on_commit(user_id: Any) -> None:
+    """
+    Увеличивает версию пользователя после фиксации текущей транзакции.
+
+    Иначе параллельный запрос мог бы успеть закэшировать еще не зафиксированное
+    (старое) состояние пользователя под уже новой версией.
+    """
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """Стандартный ModelBackend, загружающий пользователя сессии через кэш."""
+
+    def get_user(self, user_id: Any) -> Optional[Any]:
+        """Возвращает пользователя по id из кэша или из БД (None, если он не найден или неактивен)."""
+        key = f"{USER_KEY_PREFIX}{user_id}:{get_user_version(user_id)}"
+        user = cache.get(key, _MISSING)
+        if user is _MISSING:
+            user = super().get_user(user_id)
+            cache.set(key, user, settings.CRM_USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,45 @@
+"""
+Системные проверки настроек аутентификации.
+
+CachedModelBackend и сессии cached_db/cache полагаются на сброс записей в кэше при выходе и смене
+пароля или роли. С кэшем процесса (LocMemCache) сброс виден только воркеру, в котором он выполнен,
+и остальные воркеры продолжают пускать пользователя со старыми правами, поэтому такая настройка — ошибка.
+"""
+
+from django.conf import settings
+from django.core.checks import CheckMessage, Error, Tags, register
+from typing import Any, List
+
+CACHED_BACKEND = "accounts.backends.CachedModelBackend"
+CACHED_SESSION_ENGINES = ("django.contrib.sessions.backends.cached_db", "django.contrib.sessions.backends.cache")
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs: Any = None, **kwargs: Any) -> List[CheckMessage]:
+    """Проверяет, что кэширование пользователя и сессий включено только с общим бэкендом кэша."""
+    errors: List[CheckMessage] = []
+    if CACHED_BACKEND in settings.AUTHENTICATION_BACKENDS and _is_local("default"):
+        errors.append(
+            Error(
+                f"{CACHED_BACKEND} requires a cache shared by all workers, "
+                'but CACHES["default"] is a per-process cache.',
+                hint="Configure a shared cache backend (CACHE_BACKEND) or use ModelBackend.",
+                id="accounts.E001",
+            )
+        )
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES and _is_local(settings.SESSION_CACHE_ALIAS):
+        errors.append(
+            Error(
+                f"SESSION_ENGINE {settings.SESSION_ENGINE} requires a cache shared by all workers, "
+                f'but CACHES["{settings.SESSION_CACHE_ALIAS}"] is a per-process cache.',
+                hint="Configure a shared cache backend (CACHE_BACKEND) or use django.contrib.sessions.backends.db.",
+                id="accounts.E001",
+            )
+        )
+    return errors
+
+
+def _is_local(alias: str) -> bool:
+    """Проверяет, что кэш alias хранится в памяти процесса."""
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    return backend in settings.CRM_LOCAL_CACHE_BACKENDS
@@ -0,0 +1,26 @@
+"""
+Обработчики сигналов модели пользователя.
+
+Увеличивают версию пользователя в кэше аутентификации (см. accounts.backends) после изменения
+или удаления пользователя. Сохранение одного только last_login при входе версию не меняет:
+от него не зависят ни права, ни проверка сессии.
+"""
+
+from accounts.backends import bump_user_version_on_commit
+from accounts.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from typing import Any
+
+@receiver(post_save, sender=User)
+def user_saved(sender: Any, instance: User, update_fields: Any = None, **kwargs: Any) -> None:
+    """Сбрасывает закэшированного пользователя после изменения."""
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_user_version_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender: Any, instance: User, **kwargs: Any) -> None:
+    """Сбрасывает закэшированного пользователя после удаления."""
+    bump_user_version_on_commit(instance.pk)
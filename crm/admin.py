@@ -1,9 +1,17 @@
+from .bulk import bulk_convert_leads, bulk_delete_leads, bulk_reassign_leads
+from .models.audit import AuditEvent
+from .models.campaign_stats import CampaignStats, ServiceStats
 from .models.campaigns import Campaign
 from .models.clients import Client
-from .models.contracts import Contract
+from .models.contracts import Contract, DocumentBlob
 from .models.leads import Lead
 from .models.services import Service
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.http import HttpRequest
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -18,11 +26,50 @@ class CampaignAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+class LeadActionForm(ActionForm):
+    """Дополнительные параметры массовых действий над лидами в панели действий админки."""
+
+    campaign = forms.ModelChoiceField(queryset=Campaign.objects.all(), required=False, label="Кампания")
+    contract = forms.ModelChoiceField(queryset=Contract.objects.all(), required=False, label="Договор")
+
+
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ("full_name", "phone", "email", "campaign", "is_converted")
     list_filter = ("campaign", "is_converted")
-    search_fields = ("full_name", "phone", "email")
+    search_fields = ("full_name", "phone", "email", "external_id")
+    action_form = LeadActionForm
+    actions = ("convert_leads", "reassign_leads", "delete_leads")
+
+    def _action_param(self, request: HttpRequest, name: str) -> object:
+        """Возвращает объект, выбранный в поле name панели действий, или None."""
+        try:
+            return LeadActionForm.base_fields[name].clean(request.POST.get(name))
+        except ValidationError:
+            return None
+
+    @admin.action(description="Конвертировать в клиентов по выбранному договору", permissions=["change"])
+    def convert_leads(self, request: HttpRequest, queryset: QuerySet[Lead]) -> None:
+        contract = self._action_param(request, "contract")
+        if contract is None:
+            self.message_user(request, "Выберите договор.", messages.ERROR)
+            return
+        count = bulk_convert_leads(queryset.values_list("pk", flat=True), contract)
+        self.message_user(request, f"Конвертировано лидов: {count}.", messages.SUCCESS)
+
+    @admin.action(description="Перенести в выбранную кампанию", permissions=["change"])
+    def reassign_leads(self, request: HttpRequest, queryset: QuerySet[Lead]) -> None:
+        campaign = self._action_param(request, "campaign")
+        if campaign is None:
+            self.message_user(request, "Выберите кампанию.", messages.ERROR)
+            return
+        count = bulk_reassign_leads(queryset.values_list("pk", flat=True), campaign)
+        self.message_user(request, f"Перенесено лидов: {count}.", messages.SUCCESS)
+
+    @admin.action(description="Удалить выбранных лидов (без клиентов)", permissions=["delete"])
+    def delete_leads(self, request: HttpRequest, queryset: QuerySet[Lead]) -> None:
+        count, skipped = bulk_delete_leads(queryset.values_list("pk", flat=True))
+        self.message_user(request, f"Удалено лидов: {count}, пропущено: {skipped}.", messages.SUCCESS)
 
 
 @admin.register(Contract)
@@ -32,8 +79,47 @@ class ContractAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+@admin.register(DocumentBlob)
+class DocumentBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "ref_count", "updated_at")
+    readonly_fields = ("name", "size", "ref_count", "created_at", "updated_at")
+    search_fields = ("name",)
+
+
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
     list_display = ("lead", "contract", "created_at")
     list_filter = ("contract__service",)
     search_fields = ("lead__full_name",)
+
+
+@admin.register(CampaignStats)
+class CampaignStatsAdmin(admin.ModelAdmin):
+    list_display = ("campaign", "lead_count", "client_count", "revenue", "budget", "updated_at")
+    readonly_fields = ("lead_count", "client_count", "revenue", "budget", "updated_at")
+
+
+@admin.register(ServiceStats)
+class ServiceStatsAdmin(admin.ModelAdmin):
+    list_display = ("service", "campaign_count", "lead_count", "client_count", "revenue", "updated_at")
+    readonly_fields = ("campaign_count", "lead_count", "client_count", "revenue", "updated_at")
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    """Журнал аудита только для чтения; фильтры соответствуют индексам по объекту и автору."""
+
+    list_display = ("created_at", "actor", "action", "entity_type", "entity_id")
+    list_filter = ("action", "entity_type")
+    list_select_related = ("actor",)
+    search_fields = ("=entity_id", "=actor__username")
+    show_full_result_count = False
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: object = None) -> bool:
+        return False
+
+    def has_delete_permission(self, request: HttpRequest, obj: object = None) -> bool:
+        return False
@@ -0,0 +1,191 @@
+"""
+Агрегирующие запросы статистики кампаний.
+
+Каждый показатель считается отдельным коррелированным подзапросом к своей таблице,
+поэтому строки кампаний не размножаются соединениями Lead → Client → Contract,
+бюджет вычитается ровно один раз, а вся выборка выполняется одним SQL-запросом.
+Количество лидов включает лидов, перенесенных в архив (LeadArchive, см. crm.archive).
+
+Временные ряды читаются из предрассчитанной таблицы CampaignDailyStats и группируются
+по дням, неделям или месяцам без обращения к таблице лидов.
+"""
+
+from crm.models.campaign_stats import CampaignDailyStats
+from crm.models.campaigns import Campaign
+from crm.models.clients import Client
+from crm.models.leads import Lead, LeadArchive
+from crm.models.services import Service
+import datetime
+from decimal import Decimal
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, TruncDate, TruncDay, TruncMonth, TruncWeek
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+GRANULARITIES = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+DIMENSIONS = {
+    "campaign": ("campaign_id", "campaign__name"),
+    "channel": ("campaign__channel", "campaign__channel"),
+    "service": ("campaign__service_id", "campaign__service__name"),
+}
+
+
+def _scalar(queryset: QuerySet, group_by: str, aggregate: Any, output_field: Any, default: Any) -> Coalesce:
+    """Оборачивает агрегат по одной кампании в скалярный подзапрос со значением по умолчанию."""
+    subquery = queryset.order_by().values(group_by).annotate(value=aggregate).values("value")
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(default, output_field=output_field))
+
+
+def campaign_stats_queryset(campaign_ids: Optional[Iterable[int]] = None) -> QuerySet[Campaign]:
+    """
+    Возвращает кампании, аннотированные показателями статистики.
+
+    Аннотации: lead_count, client_count, revenue и roi (revenue - budget).
+    """
+    leads = Lead.objects.filter(campaign_id=OuterRef("pk"))
+    archived = LeadArchive.objects.filter(campaign_id=OuterRef("pk"))
+    clients = Client.objects.filter(lead__campaign_id=OuterRef("pk"))
+
+    queryset = Campaign.objects.annotate(
+        lead_count=_scalar(leads, "campaign_id", Count("pk"), IntegerField(), 0)
+        + _scalar(archived, "campaign_id", Count("pk"), IntegerField(), 0),
+        client_count=_scalar(clients, "lead__campaign_id", Count("pk"), IntegerField(), 0),
+        revenue=_scalar(clients, "lead__campaign_id", Sum("contract__amount"), MONEY, Decimal("0")),
+    ).annotate(roi=ExpressionWrapper(F("revenue") - F("budget"), output_field=MONEY))
+    if campaign_ids is not None:
+        queryset = queryset.filter(pk__in=list(campaign_ids))
+    return queryset
+
+
+def campaign_stats_values(campaign_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """Возвращает показатели в виде словаря {campaign_id: {поле: значение}} за один запрос."""
+    rows = campaign_stats_queryset(campaign_ids).values("pk", "lead_count", "client_count", "revenue", "budget")
+    return {row.pop("pk"): row for row in rows}
+
+
+def service_stats_queryset(service_ids: Optional[Iterable[int]] = None) -> QuerySet[Service]:
+    """
+    Возвращает услуги, аннотированные показателями по всем их кампаниям.
+
+    Аннотации: campaign_count, lead_count, client_count и revenue.
+    """
+    campaigns = Campaign.objects.filter(service_id=OuterRef("pk"))
+    leads = Lead.objects.filter(campaign__service_id=OuterRef("pk"))
+    archived = LeadArchive.objects.filter(campaign__service_id=OuterRef("pk"))
+    clients = Client.objects.filter(lead__campaign__service_id=OuterRef("pk"))
+
+    queryset = Service.objects.annotate(
+        campaign_count=_scalar(campaigns, "service_id", Count("pk"), IntegerField(), 0),
+        lead_count=_scalar(leads, "campaign__service_id", Count("pk"), IntegerField(), 0)
+        + _scalar(archived, "campaign__service_id", Count("pk"), IntegerField(), 0),
+        client_count=_scalar(clients, "lead__campaign__service_id", Count("pk"), IntegerField(), 0),
+        revenue=_scalar(clients, "lead__campaign__service_id", Sum("contract__amount"), MONEY, Decimal("0")),
+    )
+    if service_ids is not None:
+        queryset = queryset.filter(pk__in=list(service_ids))
+    return queryset
+
+
+def service_stats_values(service_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """Возвращает показатели услуг в виде словаря {service_id: {поле: значение}} за один запрос."""
+    rows = service_stats_queryset(service_ids).values("pk", "campaign_count", "lead_count", "client_count", "revenue")
+    return {row.pop("pk"): row for row in rows}
+
+
+def daily_stats_values(
+    campaign_ids: Optional[Iterable[int]] = None,
+) -> Dict[Tuple[int, datetime.date], Dict[str, Any]]:
+    """
+    Рассчитывает дневные срезы по исходным таблицам.
+
+    Лиды группируются по дате создания лида, клиенты — по дате создания клиента;
+    каждое отношение агрегируется отдельным запросом, чтобы избежать размножения строк.
+    """
+    leads = Lead.objects.all()
+    archived = LeadArchive.objects.all()
+    clients = Client.objects.all()
+    if campaign_ids is not None:
+        ids = list(campaign_ids)
+        leads = leads.filter(campaign_id__in=ids)
+        archived = archived.filter(campaign_id__in=ids)
+        clients = clients.filter(lead__campaign_id__in=ids)
+
+    result: Dict[Tuple[int, datetime.date], Dict[str, Any]] = {}
+
+    def bucket(campaign_id: int, day: datetime.date) -> Dict[str, Any]:
+        return result.setdefault((campaign_id, day), {"lead_count": 0, "conversion_count": 0, "revenue": Decimal("0")})
+
+    for queryset in (leads, archived):
+        for row in queryset.annotate(day=TruncDate("created_at")).values("campaign_id", "day").annotate(n=Count("pk")):
+            bucket(row["campaign_id"], row["day"])["lead_count"] += row["n"]
+    client_rows = (
+        clients.annotate(day=TruncDate("created_at"))
+        .values("lead__campaign_id", "day")
+        .annotate(n=Count("pk"), revenue=Sum("contract__amount"))
+    )
+    for row in client_rows:
+        values = bucket(row["lead__campaign_id"], row["day"])
+        values["conversion_count"] = row["n"]
+        values["revenue"] = row["revenue"] or Decimal("0")
+    return result
+
+
+def campaign_timeseries(
+    granularity: str = "day",
+    dimension: str = "campaign",
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Возвращает ряды лидов, конверсий и выручки, сгруппированные по периоду и измерению.
+
+    Аргументы:
+        granularity: "day", "week" или "month"
+        dimension: "campaign", "channel" или "service"
+        date_from, date_to: границы диапазона дат включительно
+
+    Каждая строка содержит period, key, label, leads, conversions, revenue.
+    """
+    trunc = GRANULARITIES[granularity]
+    key_field, label_field = DIMENSIONS[dimension]
+
+    queryset = CampaignDailyStats.objects.all()
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lte=date_to)
+
+    rows = (
+        queryset.annotate(period=trunc("date"))
+        .values("period", *dict.fromkeys((key_field, label_field)))
+        .annotate(leads=Sum("lead_count"), conversions=Sum("conversion_count"), revenue=Sum("revenue"))
+        .order_by("period", label_field)
+    )
+    return [
+        {
+            "period": row["period"],
+            "key": row[key_field],
+            "label": row[label_field],
+            "leads": row["leads"],
+            "conversions": row["conversions"],
+            "revenue": row["revenue"],
+        }
+        for row in rows
+    ]
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class CrmConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "crm"
+
+    def ready(self) -> None:
+        """Подключает обработчики сигналов приложения."""
+        from crm import signals  # noqa: F401
@@ -0,0 +1,148 @@
+"""
+Архивирование давних неконвертированных лидов (модель LeadArchive).
+
+archive_leads переносит лидов старше заданного момента, у которых нет клиента, из рабочей таблицы
+в архив пачками: каждая пачка — отдельная короткая транзакция (блокировка строк пачки, INSERT в архив,
+DELETE из crm_lead), поэтому перенос выполняется без остановки работы. Сводки статистики кампаний
+учитывают архивных лидов (см. crm.aggregates), поэтому перенос их не меняет.
+
+purge_archive_month выгружает месяц архива в сжатый CSV (набор archived_leads из crm.exports) и удаляет его:
+на PostgreSQL секция месяца отсоединяется (DETACH PARTITION CONCURRENTLY) и удаляется целиком,
+на остальных СУБД удаляются строки. Вклад удаленных лидов вычитается из сводок.
+"""
+
+from crm.audit import record, record_many
+from crm.bulk import delete_lead_rows
+from crm.cache import bump_model_version_on_commit
+from crm.exports import stream_export
+from crm.models.audit import AuditEvent
+from crm.models.clients import Client
+from crm.models.leads import Lead, LeadArchive
+from crm.rollups import ZERO, apply_bucket_deltas
+import datetime
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from typing import Iterable, Tuple
+
+BATCH_SIZE = 5000
+
+ARCHIVED_FIELDS = ("id", "full_name", "phone", "email", "campaign_id", "external_id", "created_at", "updated_at")
+
+
+def month_start(moment: datetime.datetime) -> datetime.date:
+    """Возвращает первый день месяца, к которому относится момент времени, в текущем часовом поясе."""
+    day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+    return day.replace(day=1)
+
+
+def month_bounds(month: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Возвращает полуоткрытый интервал [начало месяца, начало следующего месяца)."""
+    following = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.datetime(month.year, month.month, 1)),
+        timezone.make_aware(datetime.datetime(following.year, following.month, 1)),
+    )
+
+
+def partition_name(month: datetime.date) -> str:
+    """Возвращает имя секции архива для месяца."""
+    return f"{LeadArchive._meta.db_table}_y{month:%Y}m{month:%m}"
+
+
+def ensure_partitions(months: Iterable[datetime.date]) -> None:
+    """Создает недостающие секции архива для месяцев (только PostgreSQL)."""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for month in sorted(set(months)):
+            start, end = month_bounds(month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(month))} "
+                f"PARTITION OF {connection.ops.quote_name(LeadArchive._meta.db_table)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+
+
+def archive_leads(before: datetime.datetime, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Переносит неконвертированных лидов, созданных раньше before, в архив.
+
+    Строки пачки блокируются с SKIP LOCKED, поэтому лиды, которые в этот момент редактируются
+    или конвертируются, остаются в рабочей таблице до следующего запуска.
+
+    Возвращает:
+        int: Количество перенесенных лидов
+    """
+    candidates = Lead.objects.filter(created_at__lt=before, is_converted=False).exclude(
+        pk__in=Client.objects.values("lead_id")
+    )
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                candidates.select_for_update(skip_locked=True)
+                .order_by("created_at", "id")
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            archived_at = timezone.now()
+            ensure_partitions(month_start(row["created_at"]) for row in rows)
+            LeadArchive.objects.bulk_create(LeadArchive(archived_at=archived_at, **row) for row in rows)
+            pks = [row["id"] for row in rows]
+            # Без сигналов post_delete: у выбранных лидов нет клиентов, а архивные лиды остаются в сводках
+            delete_lead_rows(pks)
+            bump_model_version_on_commit(Lead)
+            bump_model_version_on_commit(LeadArchive)
+            record_many(AuditEvent.Action.ARCHIVE, Lead, pks, before=before.isoformat())
+        moved += len(rows)
+    return moved
+
+
+def purge_archive_month(month: datetime.date, path: str) -> int:
+    """
+    Выгружает архивных лидов месяца в gzip-файл CSV и удаляет их из БД.
+
+    Возвращает:
+        int: Количество удаленных лидов
+    """
+    start, end = month_bounds(month)
+    rows = LeadArchive.objects.filter(created_at__gte=start, created_at__lt=end)
+    per_day = rows.annotate(day=TruncDate("created_at")).values("campaign_id", "day").annotate(n=Count("pk")).order_by()
+    removed = {(row["campaign_id"], row["day"]): (row["n"], 0, ZERO) for row in per_day}
+    count = sum(leads for leads, _, _ in removed.values())
+
+    last_day = end.date() - datetime.timedelta(days=1)
+    with open(path, "wb") as out:
+        for chunk in stream_export("archived_leads", compress=True, date_from=start.date(), date_to=last_day):
+            out.write(chunk)
+
+    if connection.vendor == "postgresql":
+        table = connection.ops.quote_name(partition_name(month))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [partition_name(month)])
+            exists = cursor.fetchone()[0] is not None
+            if exists:
+                # Вне транзакции: CONCURRENTLY не блокирует чтение архива на время отсоединения
+                cursor.execute(
+                    f"ALTER TABLE {connection.ops.quote_name(LeadArchive._meta.db_table)} "
+                    f"DETACH PARTITION {table} CONCURRENTLY"
+                )
+        with transaction.atomic():
+            if exists:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE {table}")
+            apply_bucket_deltas(removed, sign=-1)
+    else:
+        with transaction.atomic():
+            # У LeadArchive нет обработчиков сигналов и связанных моделей, поэтому delete() выполняет
+            # один DELETE по условию, не загружая строки
+            rows.delete()
+            apply_bucket_deltas(removed, sign=-1)
+
+    bump_model_version_on_commit(LeadArchive)
+    if count:
+        record(AuditEvent.Action.DELETE, LeadArchive, None, count=count, month=f"{month:%Y-%m}", file=path)
+    return count
@@ -0,0 +1,154 @@
+"""
+Журнал аудита действий над объектами CRM (модель AuditEvent).
+
+События создания, изменения и удаления записываются обработчиками сигналов (crm.signals),
+массовые операции (crm.bulk) и импорт записывают их сами. Событие попадает в буфер только после
+фиксации транзакции, в которой выполнено действие, — откаченные изменения в журнал не попадают.
+
+В HTTP-запросе буфер открывает crm.middleware.AuditMiddleware: он же задает автора событий
+(пользователь запроса) и в конце запроса записывает все накопленные события одним bulk_create.
+Вне запроса (команды, shell) можно открыть буфер через collect(); без буфера событие
+записывается сразу после фиксации транзакции.
+"""
+
+import contextlib
+import contextvars
+from crm.models.audit import AuditEvent
+import datetime
+from django.db import DatabaseError, models, transaction
+from django.utils import timezone
+from services.logging_utils import log_error
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Type
+
+BATCH_SIZE = 1000
+
+_buffer: contextvars.ContextVar[Optional[List[AuditEvent]]] = contextvars.ContextVar("crm_audit_buffer", default=None)
+# Автор хранится функцией: asgiref при переходах sync/async проверяет типы значений контекста,
+# и ленивый request.user вычислялся бы (с запросом к БД) в чужом потоке
+_actor: contextvars.ContextVar[Callable[[], Any]] = contextvars.ContextVar("crm_audit_actor", default=lambda: None)
+
+
+def _actor_id(user: Any) -> Optional[int]:
+    """Возвращает id автора события (None для анонимного пользователя и системы)."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    return user.pk
+
+
+def _enqueue(events: List[AuditEvent]) -> None:
+    """Передает события в буфер (или сразу в БД) после фиксации текущей транзакции."""
+    buffer = _buffer.get()
+    if buffer is not None:
+        transaction.on_commit(lambda: buffer.extend(events))
+    else:
+        transaction.on_commit(lambda: flush(events))
+
+
+def record(action: str, model: Type[models.Model], entity_id: Any, user: Any = None, **details: Any) -> None:
+    """
+    Записывает событие над объектом.
+
+    Аргументы:
+        action: Действие (AuditEvent.Action)
+        model: Модель объекта
+        entity_id: id объекта или None для действия над набором
+        user: Автор; по умолчанию — пользователь текущего запроса
+        details: Параметры действия (должны сериализоваться в JSON)
+    """
+    record_many(action, model, [entity_id], user, **details)
+
+
+def record_many(
+    action: str, model: Type[models.Model], entity_ids: Iterable[Any], user: Any = None, **details: Any
+) -> None:
+    """Записывает одно и то же действие над несколькими объектами модели."""
+    actor_id = _actor_id(user if user is not None else _actor.get()())
+    now = timezone.now()
+    entity_type = model._meta.model_name
+    events = [
+        AuditEvent(
+            created_at=now,
+            actor_id=actor_id,
+            action=action,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            details=details,
+        )
+        for entity_id in entity_ids
+    ]
+    if events:
+        _enqueue(events)
+
+
+def flush(events: List[AuditEvent]) -> None:
+    """Записывает события одним bulk_create; ошибка записи журнала не прерывает обработку запроса."""
+    if not events:
+        return
+    try:
+        AuditEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    except DatabaseError as e:
+        log_error("Не удалось записать %s событий аудита: %s", len(events), e)
+
+
+@contextlib.contextmanager
+def collect(user: Any = None, autoflush: bool = True) -> Iterator[List[AuditEvent]]:
+    """
+    Копит события внутри блока и записывает их одной вставкой при выходе.
+
+    Аргументы:
+        user: Автор событий блока (например, request.user); вычисляется лениво при записи события
+        autoflush: Записать события при выходе; False — их записывает вызывающий код
+            (асинхронный middleware вызывает flush в потоке)
+    """
+    events: List[AuditEvent] = []
+    buffer_token = _buffer.set(events)
+    actor_token = _actor.set(lambda: user)
+    try:
+        yield events
+    finally:
+        _buffer.reset(buffer_token)
+        _actor.reset(actor_token)
+        if autoflush:
+            flush(events)
+
+
+def history(model: Type[models.Model], entity_id: Any) -> models.QuerySet:
+    """Возвращает историю объекта, от новых событий к старым (индекс crm_audit_entity_idx)."""
+    return AuditEvent.objects.filter(entity_type=model._meta.model_name, entity_id=entity_id).order_by(
+        "-created_at", "-id"
+    )
+
+
+def user_activity(user: Any, since: Optional[datetime.datetime] = None) -> models.QuerySet:
+    """
+    Возвращает действия пользователя, от новых к старым (индекс crm_audit_actor_idx).
+
+    Аргументы:
+        since: Начало периода; по умолчанию — начало текущего дня
+    """
+    if since is None:
+        since = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return AuditEvent.objects.filter(actor_id=_actor_id(user), created_at__gte=since).order_by("-created_at", "-id")
+
+
+def prune(before: datetime.datetime, batch_size: int = 10000) -> int:
+    """
+    Удаляет события старше before пачками, не удерживая долгих блокировок.
+
+    Возвращает:
+        int: Количество удаленных событий
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                AuditEvent.objects.filter(created_at__lt=before)
+                .order_by("created_at")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                return deleted
+            # У событий нет связанных записей и обработчиков сигналов, поэтому delete() выполняет
+            # один DELETE без загрузки объектов
+            AuditEvent.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
@@ -0,0 +1,163 @@
+"""
+Массовые операции над потенциальными клиентами (лидами): конвертация, смена кампании, удаление.
+
+Каждая операция выполняется в одной транзакции фиксированным числом запросов к таблицам лидов
+и клиентов, независимо от количества выбранных лидов: строки блокируются одним SELECT ... FOR UPDATE,
+клиенты создаются bulk_create, флаги и кампании меняются одним UPDATE, удаление — одним DELETE.
+Сигналы моделей при этом не вызываются, поэтому сводки статистики кампаний обновляются
+сгруппированными приращениями (число запросов зависит от числа пар «кампания, день»),
+а версии кэша увеличиваются и события журнала аудита (crm.audit) записываются явно.
+"""
+
+from crm.audit import record_many
+from crm.cache import bump_model_version_on_commit
+from crm.models.audit import AuditEvent
+from crm.models.campaigns import Campaign
+from crm.models.clients import Client
+from crm.models.contracts import Contract
+from crm.models.leads import Lead
+from crm.rollups import ZERO, Bucket, apply_bucket_deltas, local_day
+import datetime
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from typing import Dict, Iterable, List, Tuple
+
+BATCH_SIZE = 1000
+
+Buckets = Dict[Tuple[int, datetime.date], Bucket]
+
+
+def _lock_leads(lead_ids: Iterable[int], queryset: QuerySet[Lead]) -> Dict[int, int]:
+    """Блокирует выбранных лидов до конца транзакции и возвращает их кампании: {id лида: id кампании}."""
+    return dict(queryset.select_for_update().filter(pk__in=list(lead_ids)).values_list("pk", "campaign_id"))
+
+
+def delete_lead_rows(lead_ids: List[int]) -> None:
+    """
+    Удаляет строки лидов одним DELETE ... WHERE id IN (...) без загрузки объектов.
+
+    Сигналы pre_delete/post_delete и каскады моделей не вызываются: вызывающий код сам вычитает вклад
+    лидов из сводок, увеличивает версию кэша и пишет журнал аудита, а у удаляемых лидов не должно быть клиентов.
+    """
+    if not lead_ids:
+        return
+    table = connection.ops.quote_name(Lead._meta.db_table)
+    column = connection.ops.quote_name(Lead._meta.pk.column)
+    placeholders = ", ".join(["%s"] * len(lead_ids))
+    with connection.cursor() as cursor:
+        # Имена таблицы и столбца берутся из метаданных модели, значения передаются параметрами
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", lead_ids)  # noqa: S608
+
+
+def _unconverted(queryset: QuerySet[Lead]) -> QuerySet[Lead]:
+    """Исключает лидов, у которых уже есть клиент (подзапрос вместо LEFT JOIN, совместимого с FOR UPDATE)."""
+    return queryset.exclude(pk__in=Client.objects.values("lead_id"))
+
+
+def _stats_buckets(lead_ids: List[int], with_clients: bool) -> Buckets:
+    """Возвращает вклад лидов (и их клиентов) в дневные срезы статистики двумя агрегирующими запросами."""
+    buckets: Dict[Tuple[int, datetime.date], List] = {}
+    leads = (
+        Lead.objects.filter(pk__in=lead_ids)
+        .annotate(day=TruncDate("created_at"))
+        .values("campaign_id", "day")
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+    for row in leads:
+        buckets.setdefault((row["campaign_id"], row["day"]), [0, 0, ZERO])[0] += row["n"]
+    if with_clients:
+        clients = (
+            Client.objects.filter(lead_id__in=lead_ids)
+            .annotate(day=TruncDate("created_at"))
+            .values("lead__campaign_id", "day")
+            .annotate(n=Count("pk"), revenue=Sum("contract__amount"))
+            .order_by()
+        )
+        for row in clients:
+            bucket = buckets.setdefault((row["lead__campaign_id"], row["day"]), [0, 0, ZERO])
+            bucket[1] += row["n"]
+            bucket[2] += row["revenue"] or ZERO
+    return {key: (leads, conversions, revenue) for key, (leads, conversions, revenue) in buckets.items()}
+
+
+def bulk_convert_leads(lead_ids: Iterable[int], contract: Contract) -> int:
+    """
+    Конвертирует лидов в клиентов по одному договору.
+
+    Лиды, у которых уже есть клиент, пропускаются.
+
+    Возвращает:
+        int: Количество созданных клиентов
+    """
+    with transaction.atomic():
+        campaigns = _lock_leads(lead_ids, _unconverted(Lead.objects.all()))
+        if not campaigns:
+            return 0
+        clients = Client.objects.bulk_create(
+            [Client(lead_id=pk, contract=contract) for pk in campaigns], batch_size=BATCH_SIZE
+        )
+        Lead.objects.filter(pk__in=list(campaigns)).update(is_converted=True, updated_at=timezone.now())
+
+        amount = Decimal(contract.amount)
+        per_day: Dict[Tuple[int, datetime.date], int] = {}
+        for client in clients:
+            key = (campaigns[client.lead_id], local_day(client.created_at))
+            per_day[key] = per_day.get(key, 0) + 1
+        apply_bucket_deltas({key: (0, count, amount * count) for key, count in per_day.items()})
+
+        bump_model_version_on_commit(Client)
+        bump_model_version_on_commit(Lead)
+        record_many(AuditEvent.Action.CONVERT, Lead, list(campaigns), contract_id=contract.pk)
+        record_many(AuditEvent.Action.CREATE, Client, [client.pk for client in clients if client.pk is not None])
+    return len(clients)
+
+
+def bulk_reassign_leads(lead_ids: Iterable[int], campaign: Campaign) -> int:
+    """
+    Переносит лидов (вместе с их клиентами в статистике) в другую кампанию.
+
+    Возвращает:
+        int: Количество перенесенных лидов
+    """
+    with transaction.atomic():
+        pks = list(_lock_leads(lead_ids, Lead.objects.exclude(campaign_id=campaign.pk)))
+        if not pks:
+            return 0
+        moved = _stats_buckets(pks, with_clients=True)
+        Lead.objects.filter(pk__in=pks).update(campaign=campaign, updated_at=timezone.now())
+
+        apply_bucket_deltas(moved, sign=-1)
+        arrived: Buckets = {}
+        for (_, day), (leads, conversions, revenue) in moved.items():
+            previous = arrived.get((campaign.pk, day), (0, 0, ZERO))
+            arrived[(campaign.pk, day)] = (previous[0] + leads, previous[1] + conversions, previous[2] + revenue)
+        apply_bucket_deltas(arrived)
+
+        bump_model_version_on_commit(Lead)
+        record_many(AuditEvent.Action.UPDATE, Lead, pks, fields=["campaign"], campaign_id=campaign.pk)
+    return len(pks)
+
+
+def bulk_delete_leads(lead_ids: Iterable[int]) -> Tuple[int, int]:
+    """
+    Удаляет лидов, у которых нет клиента (клиенты защищают лидов от удаления).
+
+    Возвращает:
+        tuple: (количество удаленных, количество пропущенных лидов)
+    """
+    requested = set(lead_ids)
+    with transaction.atomic():
+        pks = list(_lock_leads(requested, _unconverted(Lead.objects.all())))
+        if pks:
+            removed = _stats_buckets(pks, with_clients=False)
+            # Сигналы post_delete не нужны: их работу (сводки, кэш и журнал аудита) выполняют строки ниже,
+            # а клиентов у выбранных лидов нет
+            delete_lead_rows(pks)
+            apply_bucket_deltas(removed, sign=-1)
+            bump_model_version_on_commit(Lead)
+            record_many(AuditEvent.Action.DELETE, Lead, pks)
+    return len(pks), len(requested) - len(pks)
@@ -0,0 +1,150 @@
+"""
+Версионируемый кэш результатов для тяжелых операций чтения CRM.
+
+Каждая модель, от которой зависят закэшированные данные, имеет счетчик версии в кэше.
+Ключ записи включает текущие версии всех зависимостей, поэтому изменение любой из моделей
+(сигналы save/delete увеличивают ее версию) делает старые записи недостижимыми —
+явная очистка не нужна, устаревшие значения вытесняются бэкендом по TTL.
+
+Модуль ведет счетчики попаданий и промахов в разрезе имен кэшируемых результатов. Увеличение версии
+видно только процессам, разделяющим кэш, поэтому с кэшем процесса (CRM_LOCAL_CACHE_BACKENDS, например
+local-memory по умолчанию) кэширование выключено: cached_result каждый раз вычисляет результат,
+иначе остальные воркеры до истечения CRM_CACHE_TIMEOUT отдавали бы устаревшие данные.
+"""
+
+from collections import defaultdict
+from crm.replicas import primary
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+VERSION_KEY_PREFIX = "crm:version:"
+RESULT_KEY_PREFIX = "crm:result:"
+
+_MISSING = object()
+_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+_counters_lock = threading.Lock()
+
+
+def _label(model: Type[models.Model]) -> str:
+    """Возвращает метку модели для ключа версии."""
+    return model._meta.label_lower
+
+
+def is_enabled() -> bool:
+    """Проверяет, что кэш по умолчанию общий для всех процессов (не из CRM_LOCAL_CACHE_BACKENDS)."""
+    return settings.CACHES["default"]["BACKEND"] not in settings.CRM_LOCAL_CACHE_BACKENDS
+
+
+def _new_version() -> int:
+    """
+    Возвращает начальное значение версии.
+
+    Используется время в наносекундах, а не 1: если ключ версии был вытеснен из кэша,
+    новая версия не совпадет ни с одной из прежних и старые записи не оживут.
+    """
+    return time.time_ns()
+
+
+def get_model_versions(model_list: Iterable[Type[models.Model]]) -> List[int]:
+    """Возвращает текущие версии моделей, инициализируя отсутствующие."""
+    keys = [VERSION_KEY_PREFIX + _label(model) for model in model_list]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key, _new_version())
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model: Type[models.Model]) -> None:
+    """Увеличивает версию модели, делая недоступными все зависящие от нее записи."""
+    if not is_enabled():
+        return
+    key = VERSION_KEY_PREFIX + _label(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def bump_model_version_on_commit(model: Type[models.Model]) -> None:
+    """
+    Увеличивает версию модели после фиксации текущей транзакции.
+
+    Иначе параллельный запрос мог бы успеть закэшировать еще не зафиксированное
+    (старое) состояние под уже новой версией.
+    """
+    transaction.on_commit(lambda: bump_model_version(model))
+
+
+def _result_key(name: str, depends_on: Iterable[Type[models.Model]], params: Tuple[Any, ...]) -> str:
+    """Формирует ключ результата из имени, версий зависимостей и параметров."""
+    versions = ".".join(str(v) for v in get_model_versions(depends_on))
+    digest = hashlib.md5(repr(params).encode(), usedforsecurity=False).hexdigest() if params else "-"
+    return f"{RESULT_KEY_PREFIX}{name}:{versions}:{digest}"
+
+
+def _count(name: str, outcome: str) -> None:
+    """Увеличивает счетчик попаданий или промахов для имени результата."""
+    with _counters_lock:
+        _counters[name][outcome] += 1
+
+
+def cached_result(
+    name: str,
+    depends_on: Iterable[Type[models.Model]],
+    builder: Callable[[], T],
+    params: Tuple[Any, ...] = (),
+    timeout: Optional[int] = None,
+) -> T:
+    """
+    Возвращает закэшированный результат builder() или вычисляет и сохраняет его.
+
+    Аргументы:
+        name: Имя результата (используется в ключе и в счетчиках)
+        depends_on: Модели, изменение которых должно инвалидировать результат
+        builder: Функция, вычисляющая результат; значение должно сериализоваться pickle
+        params: Параметры, от которых зависит результат (фильтры, страница и т.п.)
+        timeout: Время жизни записи; по умолчанию CRM_CACHE_TIMEOUT
+
+    Если кэш не общий (см. is_enabled), результат вычисляется без кэширования.
+    """
+    if not is_enabled():
+        return builder()
+    key = _result_key(name, depends_on, params)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count(name, "hits")
+        return value
+
+    _count(name, "misses")
+    # С основной БД: результат с отстающей реплики сохранился бы под уже увеличенной версией
+    with primary():
+        value = builder()
+    cache.set(key, value, timeout if timeout is not None else settings.CRM_CACHE_TIMEOUT)
+    return value
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Возвращает снимок счетчиков попаданий и промахов текущего процесса."""
+    with _counters_lock:
+        return {name: dict(values) for name, values in _counters.items()}
+
+
+def cached_choices(queryset: models.QuerySet, empty_label: Optional[str] = "---------") -> List[Tuple[Any, str]]:
+    """Возвращает список вариантов выбора для queryset, закэшированный по версии его модели."""
+    model = queryset.model
+    choices = cached_result(
+        f"choices:{_label(model)}",
+        [model],
+        lambda: [(obj.pk, str(obj)) for obj in queryset],
+        params=(str(queryset.query),),
+    )
+    return ([("", empty_label)] if empty_label is not None else []) + choices
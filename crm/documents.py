@@ -0,0 +1,175 @@
+"""
+Учет ссылок договоров на файлы документов и удаление файлов без ссылок.
+
+Документы договоров хранятся по хэшу содержимого (crm.storage), поэтому один файл может принадлежать
+нескольким договорам. Обработчики сигналов Contract (crm.signals) увеличивают и уменьшают счетчик
+ссылок DocumentBlob при создании, смене документа и удалении договора. Массовые изменения договоров
+сигналов не вызывают: счетчики пересчитывает rebuild_references (команда prune_documents
+выполняет его перед удалением).
+
+prune_orphans удаляет файлы, на которые не ссылается ни один договор, не раньше чем через заданное
+время после последнего изменения: файл сохраняется в хранилище до фиксации транзакции договора,
+и на такой свежий файл еще может появиться ссылка.
+"""
+
+from crm.audit import record
+from crm.cache import bump_model_version_on_commit
+from crm.models.audit import AuditEvent
+from crm.models.contracts import Contract, DocumentBlob
+from crm.storage import TEMPORARY_PREFIX, document_storage, is_blob_name
+import datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+import posixpath
+from typing import Dict, Iterator, Optional, Tuple
+
+def _size(name: str) -> int:
+    """Возвращает размер файла хранилища (0, если файла нет)."""
+    try:
+        return document_storage().size(name)
+    except FileNotFoundError:
+        return 0
+
+
+def add_reference(name: Optional[str]) -> None:
+    """Учитывает ссылку договора на файл name."""
+    if not name:
+        return
+    if DocumentBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DocumentBlob.objects.create(name=name, size=_size(name), ref_count=1)
+    except IntegrityError:
+        # Строку одновременно создал другой запрос
+        DocumentBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1, updated_at=timezone.now())
+
+
+def remove_reference(name: Optional[str]) -> None:
+    """Снимает ссылку договора на файл name; файл удаляется позже командой prune_documents."""
+    if not name:
+        return
+    DocumentBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1, updated_at=timezone.now()
+    )
+
+
+def reference_counts() -> Dict[str, int]:
+    """Возвращает число договоров по именам файлов документов, пересчитанное по таблице договоров."""
+    rows = Contract.objects.exclude(document="").values("document").annotate(n=Count("pk")).order_by()
+    return {row["document"]: row["n"] for row in rows}
+
+
+def rebuild_references() -> int:
+    """
+    Приводит счетчики ссылок DocumentBlob к числу договоров с каждым файлом.
+
+    Возвращает:
+        int: Количество исправленных или добавленных строк
+    """
+    actual = reference_counts()
+    stored = dict(DocumentBlob.objects.values_list("name", "ref_count"))
+    fixed = 0
+    for name, count in actual.items():
+        if name not in stored:
+            DocumentBlob.objects.get_or_create(name=name, defaults={"size": _size(name), "ref_count": count})
+            fixed += 1
+        elif stored[name] != count:
+            DocumentBlob.objects.filter(name=name).update(ref_count=count, updated_at=timezone.now())
+            fixed += 1
+    stale = [name for name, count in stored.items() if count and name not in actual]
+    if stale:
+        fixed += DocumentBlob.objects.filter(name__in=stale).update(ref_count=0, updated_at=timezone.now())
+    return fixed
+
+
+def _walk(directory: str) -> Iterator[str]:
+    """Перечисляет имена файлов хранилища документов в каталоге и его подкаталогах."""
+    storage = document_storage()
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from _walk(posixpath.join(directory, subdirectory))
+
+
+def _delete_if_older(name: str, before: datetime.datetime) -> int:
+    """Удаляет файл хранилища, не изменявшийся с момента before; возвращает освобожденные байты."""
+    storage = document_storage()
+    try:
+        if storage.get_modified_time(name) >= before:
+            return 0
+        size = storage.size(name)
+    except FileNotFoundError:
+        return 0
+    storage.delete(name)
+    return size
+
+
+def prune_orphans(before: datetime.datetime) -> Tuple[int, int]:
+    """
+    Удаляет файлы документов без ссылок, не изменявшиеся с момента before.
+
+    Удаляются файлы строк DocumentBlob с нулевым счетчиком, файлы с именем-хэшем без строки
+    (загрузки, транзакция которых откатилась) и брошенные временные файлы загрузок.
+    Файлы, сохраненные до перехода на хранилище по хэшу и никогда не учтенные, не трогаются.
+
+    Возвращает:
+        tuple: Количество удаленных файлов и освобожденных байтов
+    """
+    removed = freed = 0
+    for name in DocumentBlob.objects.filter(ref_count=0, updated_at__lt=before).values_list("name", flat=True):
+        with transaction.atomic():
+            # Строка блокируется: параллельная ссылка на тот же файл дождется удаления и создаст строку заново
+            blob = DocumentBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+            if blob is None or Contract.objects.filter(document=name).exists():
+                continue
+            size = _delete_if_older(name, before)
+            if size or not document_storage().exists(name):
+                blob.delete()
+                removed += 1
+                freed += size
+
+    directory = Contract._meta.get_field("document").upload_to.rstrip("/")
+    known = set(DocumentBlob.objects.values_list("name", flat=True))
+    for name in _walk(directory):
+        temporary = posixpath.basename(name).startswith(TEMPORARY_PREFIX)
+        if not temporary and (not is_blob_name(name) or name in known):
+            continue
+        if not temporary and Contract.objects.filter(document=name).exists():
+            continue
+        size = _delete_if_older(name, before)
+        if size:
+            removed += 1
+            freed += size
+    return removed, freed
+
+
+def migrate_legacy_documents() -> int:
+    """
+    Переносит документы, сохраненные до перехода на хранилище по хэшу, в хранилище по хэшу.
+
+    Одинаковые файлы (например, повторные загрузки с суффиксом имени) сводятся к одному;
+    договоры переключаются на новые имена, а старые файлы удаляются после фиксации транзакции.
+
+    Возвращает:
+        int: Количество перенесенных файлов
+    """
+    storage = document_storage()
+    legacy = [name for name in reference_counts() if not is_blob_name(name) and storage.exists(name)]
+    for name in legacy:
+        with storage.open(name, "rb") as file:
+            stored = storage.save(name, file)
+        with transaction.atomic():
+            ids = list(Contract.objects.filter(document=name).values_list("pk", flat=True))
+            Contract.objects.filter(pk__in=ids).update(document=stored, updated_at=timezone.now())
+            bump_model_version_on_commit(Contract)
+            record(AuditEvent.Action.UPDATE, Contract, None, count=len(ids), document=[name, stored])
+            transaction.on_commit(lambda name=name: storage.delete(name))
+    if legacy:
+        rebuild_references()
+    return len(legacy)
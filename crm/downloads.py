@@ -0,0 +1,146 @@
+"""
+Отдача защищенных файлов (документов договоров) после проверки прав в представлении.
+
+При CRM_SENDFILE_BACKEND = "nginx" ответ содержит только заголовок X-Accel-Redirect с путем
+CRM_SENDFILE_PREFIX + имя файла в хранилище: файл читает и отдает nginx из internal-локации,
+отображенной на MEDIA_ROOT, вместе с Range, ETag и кэшированием. При "xsendfile" (Apache mod_xsendfile,
+lighttpd) передается абсолютный путь файла в X-Sendfile. MEDIA_ROOT не должен раздаваться веб-сервером напрямую.
+
+Без прокси файл отдается самим Django потоково (FileResponse и чтение блоками), без загрузки
+в память целиком, с поддержкой одного диапазона Range (If-Range), ETag/Last-Modified и ответов 304/412.
+"""
+
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.db.models.fields.files import FieldFile
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+import mimetypes
+import os
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+import urllib.parse
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range с одним диапазоном байтов.
+
+    Аргументы:
+        header (str): Значение заголовка Range
+        size (int): Размер файла в байтах
+
+    Возвращает:
+        tuple: Первый и последний байт диапазона включительно; None, если диапазон не поддерживается
+        (несколько диапазонов, другие единицы) — тогда отдается весь файл
+
+    Исключения:
+        ValueError: Если диапазон не пересекается с файлом (ответ 416)
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Суффиксный диапазон: последние N байтов
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def iter_range(file: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    """Читает length байтов файла с позиции start блоками CHUNK_SIZE и закрывает файл."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_etag(storage: Storage, name: str) -> Tuple[str, float]:
+    """Возвращает ETag (размер и время изменения, как у nginx) и время изменения файла хранилища."""
+    modified = storage.get_modified_time(name).timestamp()
+    return quote_etag(f"{storage.size(name):x}-{int(modified):x}"), modified
+
+
+def serve_file(request: HttpRequest, file: FieldFile, filename: Optional[str] = None) -> HttpResponse:
+    """
+    Отдает файл поля модели как вложение.
+
+    Аргументы:
+        request (HttpRequest): Запрос, права которого уже проверены
+        file (FieldFile): Файл (например, Contract.document)
+        filename (str): Имя файла для браузера; по умолчанию — имя в хранилище
+
+    Исключения:
+        Http404: Если файла нет в хранилище
+    """
+    filename = filename or os.path.basename(file.name)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    disposition = content_disposition_header(True, filename)
+
+    backend = settings.CRM_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == "nginx":
+            response["X-Accel-Redirect"] = settings.CRM_SENDFILE_PREFIX + urllib.parse.quote(file.name)
+        else:
+            response["X-Sendfile"] = file.path
+        response["Content-Disposition"] = disposition
+        return response
+
+    storage, name = file.storage, file.name
+    try:
+        etag, modified = file_etag(storage, name)
+        size = storage.size(name)
+    except (FileNotFoundError, NotImplementedError) as e:
+        raise Http404("Файл не найден.") from e
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(modified))
+    if conditional is not None:
+        return conditional
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers["Range"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    try:
+        handle = storage.open(name, "rb")
+    except FileNotFoundError as e:
+        raise Http404("Файл не найден.") from e
+    if byte_range is None:
+        # FileResponse отдает файл через wsgi.file_wrapper (sendfile), если сервер его поддерживает
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(iter_range(handle, start, end - start + 1), status=206)
+        response["Content-Type"] = content_type
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    response["Content-Disposition"] = disposition
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modified)
+    return response
@@ -0,0 +1,235 @@
+"""
+Потоковая выгрузка лидов, клиентов и договоров в CSV и JSON Lines.
+
+Строки читаются через values_list(...).iterator(chunk_size=...) — без создания объектов моделей
+и без загрузки всей выборки в память (на PostgreSQL используется серверный курсор). Связанные
+поля берутся теми же запросами через JOIN. Сериализованные строки отдаются генератором,
+при необходимости сжимаются gzip на лету, поэтому расход памяти не зависит от объема выгрузки.
+"""
+
+from crm.models.clients import Client
+from crm.models.contracts import Contract
+from crm.models.leads import Lead, LeadArchive
+import csv
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import models
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Type
+import zlib
+
+CHUNK_SIZE = 2000
+GZIP_FLUSH_BYTES = 64 * 1024
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class ExportSpec:
+    """
+    Описание набора данных для выгрузки.
+
+    Атрибуты:
+        model (Model): Модель набора
+        columns (tuple): Пары (заголовок столбца, путь поля для values_list)
+        campaign_filter (callable): Фильтрует queryset по id кампании
+        permission (str): Действие политики доступа (crm.permissions), разрешающее выгрузку
+    """
+
+    def __init__(
+        self,
+        model: Type[models.Model],
+        columns: Sequence[Tuple[str, str]],
+        campaign_filter: Callable[[QuerySet, int], QuerySet],
+        permission: str,
+    ) -> None:
+        """Инициализирует описание набора."""
+        self.model = model
+        self.columns = tuple(columns)
+        self.campaign_filter = campaign_filter
+        self.permission = permission
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        """Возвращает заголовки столбцов."""
+        return tuple(header for header, _ in self.columns)
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "leads": ExportSpec(
+        Lead,
+        [
+            ("id", "id"),
+            ("full_name", "full_name"),
+            ("phone", "phone"),
+            ("email", "email"),
+            ("campaign_id", "campaign_id"),
+            ("campaign", "campaign__name"),
+            ("is_converted", "is_converted"),
+            ("external_id", "external_id"),
+            ("created_at", "created_at"),
+        ],
+        lambda queryset, campaign_id: queryset.filter(campaign_id=campaign_id),
+        permission="lead.export",
+    ),
+    # Лиды, перенесенные в архив командой archive_leads; на PostgreSQL диапазон дат отсекает секции архива
+    "archived_leads": ExportSpec(
+        LeadArchive,
+        [
+            ("id", "id"),
+            ("full_name", "full_name"),
+            ("phone", "phone"),
+            ("email", "email"),
+            ("campaign_id", "campaign_id"),
+            ("campaign", "campaign__name"),
+            ("external_id", "external_id"),
+            ("created_at", "created_at"),
+            ("archived_at", "archived_at"),
+        ],
+        lambda queryset, campaign_id: queryset.filter(campaign_id=campaign_id),
+        permission="lead.export",
+    ),
+    "clients": ExportSpec(
+        Client,
+        [
+            ("id", "id"),
+            ("lead_id", "lead_id"),
+            ("full_name", "lead__full_name"),
+            ("phone", "lead__phone"),
+            ("email", "lead__email"),
+            ("campaign_id", "lead__campaign_id"),
+            ("campaign", "lead__campaign__name"),
+            ("contract_id", "contract_id"),
+            ("contract", "contract__name"),
+            ("amount", "contract__amount"),
+            ("created_at", "created_at"),
+        ],
+        lambda queryset, campaign_id: queryset.filter(lead__campaign_id=campaign_id),
+        permission="client.export",
+    ),
+    "contracts": ExportSpec(
+        Contract,
+        [
+            ("id", "id"),
+            ("name", "name"),
+            ("service_id", "service_id"),
+            ("service", "service__name"),
+            ("start_date", "start_date"),
+            ("end_date", "end_date"),
+            ("amount", "amount"),
+            ("document", "document"),
+            ("created_at", "created_at"),
+        ],
+        # Подзапрос вместо JOIN по клиентам, чтобы договор с несколькими клиентами не дублировался
+        lambda queryset, campaign_id: queryset.filter(
+            pk__in=Client.objects.filter(lead__campaign_id=campaign_id).values("contract_id")
+        ),
+        permission="contract.export",
+    ),
+}
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    """Возвращает начало дня в текущем часовом поясе."""
+    moment = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+def export_queryset(
+    spec: ExportSpec,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    campaign_id: Optional[int] = None,
+    condition: Optional[Q] = None,
+) -> QuerySet:
+    """
+    Возвращает queryset кортежей значений столбцов набора с учетом фильтров.
+
+    Диапазон дат применяется к created_at полуоткрытым интервалом [начало date_from, начало date_to + 1),
+    чтобы условие обслуживалось индексом (created_at, id). condition — условие видимости строк
+    (crm.permissions.row_filter).
+    """
+    queryset = spec.model._default_manager.all()
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    if date_from:
+        queryset = queryset.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=_day_start(date_to + datetime.timedelta(days=1)))
+    if campaign_id:
+        queryset = spec.campaign_filter(queryset, campaign_id)
+    return queryset.order_by("created_at", "id").values_list(*(path for _, path in spec.columns))
+
+
+def _plain(value: Any) -> Any:
+    """Приводит значение к JSON-совместимому виду."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """Псевдофайл для csv.writer, возвращающий записанную строку вместо буферизации."""
+
+    def write(self, value: str) -> str:
+        """Возвращает переданную строку."""
+        return value
+
+
+def render_csv(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """Сериализует строки в CSV построчно."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_plain(value) for value in row])
+
+
+def render_jsonl(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """Сериализует строки в JSON Lines (объект на строку)."""
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(_plain, row), strict=True)), ensure_ascii=False) + "\n"
+
+
+RENDERERS = {"csv": render_csv, "jsonl": render_jsonl}
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+    Сжимает поток строк в формат gzip на лету.
+
+    Сжатые данные отдаются порциями не меньше GZIP_FLUSH_BYTES, чтобы не дробить ответ на мелкие куски.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 — заголовок и контрольная сумма gzip
+    pending = b""
+    for chunk in chunks:
+        pending += compressor.compress(chunk.encode())
+        if len(pending) >= GZIP_FLUSH_BYTES:
+            yield pending
+            pending = b""
+    yield pending + compressor.flush()
+
+
+def stream_export(
+    name: str,
+    fmt: str = "csv",
+    compress: bool = False,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    campaign_id: Optional[int] = None,
+    condition: Optional[Q] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Any]:
+    """
+    Возвращает генератор выгрузки набора: строки текста или, при compress, байты gzip.
+
+    Исключения:
+        KeyError: Если набор или формат неизвестен
+    """
+    spec = EXPORTS[name]
+    renderer = RENDERERS[fmt]
+    rows = export_queryset(spec, date_from, date_to, campaign_id, condition).iterator(chunk_size=chunk_size)
+    chunks = renderer(spec.headers, rows)
+    return gzip_chunks(chunks) if compress else chunks
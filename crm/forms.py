@@ -1,9 +1,24 @@
+from .cache import cached_choices
 from .models.campaigns import Campaign
 from .models.clients import Client
 from .models.contracts import Contract
 from .models.leads import Lead
 from .models.services import Service
 from django import forms
+from typing import Any, ClassVar, List, Tuple
+
+class CachedChoicesMixin:
+    """Подставляет в поля выбора варианты из версионируемого кэша вместо запроса при каждом рендере."""
+
+    cached_choice_fields: ClassVar[Tuple[str, ...]] = ()
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Заменяет варианты перечисленных полей закэшированными."""
+        super().__init__(*args, **kwargs)
+        for name in self.cached_choice_fields:
+            field = self.fields[name]
+            field.choices = cached_choices(field.queryset, field.empty_label)
+
 
 class ServiceForm(forms.ModelForm):
     class Meta:
@@ -11,19 +26,25 @@ class ServiceForm(forms.ModelForm):
         fields = ["name", "description", "price"]
 
 
-class CampaignForm(forms.ModelForm):
+class CampaignForm(CachedChoicesMixin, forms.ModelForm):
+    cached_choice_fields = ("service",)
+
     class Meta:
         model = Campaign
         fields = ["name", "service", "channel", "budget"]
 
 
-class LeadForm(forms.ModelForm):
+class LeadForm(CachedChoicesMixin, forms.ModelForm):
+    cached_choice_fields = ("campaign",)
+
     class Meta:
         model = Lead
         fields = ["full_name", "phone", "email", "campaign"]
 
 
-class ContractForm(forms.ModelForm):
+class ContractForm(CachedChoicesMixin, forms.ModelForm):
+    cached_choice_fields = ("service",)
+
     class Meta:
         model = Contract
         fields = "__all__"
@@ -36,7 +57,94 @@ class ContractForm(forms.ModelForm):
         }
 
 
-class ClientForm(forms.ModelForm):
+class ClientForm(CachedChoicesMixin, forms.ModelForm):
+    cached_choice_fields = ("contract",)
+
     class Meta:
         model = Client
         fields = ["lead", "contract"]
+
+
+class IdListField(forms.Field):
+    """Список целочисленных id; существование объектов проверяет код, который их использует."""
+
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {"required": "Не выбрано ни одной записи.", "invalid": "Некорректный список id."}
+
+    def to_python(self, value: Any) -> List[int]:
+        """Преобразует значения в список уникальных id."""
+        if not value:
+            return []
+        try:
+            return sorted({int(item) for item in value})
+        except (TypeError, ValueError) as e:
+            raise forms.ValidationError(self.error_messages["invalid"], code="invalid") from e
+
+
+class LeadBulkActionForm(CachedChoicesMixin, forms.Form):
+    """Массовое действие над выбранными лидами: конвертация, смена кампании или удаление."""
+
+    ACTION_CHOICES = [("convert", "Конвертировать"), ("reassign", "Перенести в кампанию"), ("delete", "Удалить")]
+
+    cached_choice_fields = ("campaign", "contract")
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    leads = IdListField()
+    campaign = forms.ModelChoiceField(queryset=Campaign.objects.all(), required=False)
+    contract = forms.ModelChoiceField(queryset=Contract.objects.all(), required=False)
+
+    def clean(self) -> dict:
+        """Проверяет, что для действия указаны нужные параметры."""
+        cleaned_data = super().clean() or {}
+        action = cleaned_data.get("action")
+        if action == "convert" and not cleaned_data.get("contract"):
+            self.add_error("contract", "Укажите договор для конвертации.")
+        if action == "reassign" and not cleaned_data.get("campaign"):
+            self.add_error("campaign", "Укажите кампанию для переноса.")
+        return cleaned_data
+
+
+class StatsFilterForm(forms.Form):
+    """Фильтр временных рядов статистики кампаний по диапазону дат и разрезу."""
+
+    GRANULARITY_CHOICES = [("day", "По дням"), ("week", "По неделям"), ("month", "По месяцам")]
+    DIMENSION_CHOICES = [("campaign", "Кампании"), ("channel", "Каналы"), ("service", "Услуги")]
+
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"))
+    granularity = forms.ChoiceField(choices=GRANULARITY_CHOICES, required=False)
+    dimension = forms.ChoiceField(choices=DIMENSION_CHOICES, required=False)
+
+    def clean(self) -> dict:
+        """Проверяет, что начало диапазона не позже его конца."""
+        cleaned_data = super().clean() or {}
+        date_from, date_to = cleaned_data.get("date_from"), cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Дата начала периода не может быть позже даты окончания.")
+        return cleaned_data
+
+
+class LeadImportForm(forms.Form):
+    """Загрузка CSV-файла с лидами (столбцы full_name, phone, email, campaign)."""
+
+    file = forms.FileField(label="CSV-файл", widget=forms.ClearableFileInput(attrs={"accept": ".csv,text/csv"}))
+
+
+class ExportFilterForm(forms.Form):
+    """Параметры выгрузки: формат, сжатие, диапазон дат создания и кампания."""
+
+    FORMAT_CHOICES = [("csv", "CSV"), ("jsonl", "JSON Lines")]
+
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    gzip = forms.BooleanField(required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    campaign = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self) -> dict:
+        """Проверяет, что начало диапазона не позже его конца."""
+        cleaned_data = super().clean() or {}
+        date_from, date_to = cleaned_data.get("date_from"), cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Дата начала периода не может быть позже даты окончания.")
+        return cleaned_data
@@ -0,0 +1,208 @@
+"""
+Потоковый импорт потенциальных клиентов (лидов) из CSV.
+
+Файл читается построчно и обрабатывается пачками фиксированного размера, поэтому потребление
+памяти не зависит от размера файла. Каждая строка проверяется по правилам полей LeadForm,
+кампания ищется в заранее загруженной карте (по id или названию) без запросов к БД.
+Валидные строки пачки записываются одним bulk_create, а на PostgreSQL — командой COPY.
+
+Массовая запись не вызывает сигналы моделей, поэтому после каждой пачки в той же транзакции
+обновляются сводки статистики кампаний (crm.rollups) и версия кэша модели Lead, а в журнал аудита
+записывается событие создания каждого лида.
+"""
+
+from collections import Counter
+from crm.audit import record_many
+from crm.cache import bump_model_version_on_commit
+from crm.forms import LeadForm
+from crm.models.audit import AuditEvent
+from crm.models.campaigns import Campaign
+from crm.models.leads import Lead
+from crm.rollups import ZERO, apply_bucket_deltas, local_day
+import csv
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+import io
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+REQUIRED_COLUMNS = ("full_name", "phone", "email", "campaign")
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+RowError = Tuple[int, Dict[str, List[str]]]
+
+
+class ImportReport:
+    """
+    Итоги импорта.
+
+    Атрибуты:
+        created (int): Количество созданных лидов
+        failed (int): Количество отклоненных строк
+        errors (list): Первые MAX_REPORTED_ERRORS ошибок в виде (номер строки файла, {поле: [сообщения]})
+    """
+
+    def __init__(self) -> None:
+        """Инициализирует пустой отчет."""
+        self.created = 0
+        self.failed = 0
+        self.errors: List[RowError] = []
+
+    def add_error(self, line: int, errors: Dict[str, List[str]]) -> None:
+        """Учитывает отклоненную строку, сохраняя в отчете не более MAX_REPORTED_ERRORS ошибок."""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, errors))
+
+    @property
+    def truncated(self) -> bool:
+        """Проверяет, были ли ошибки, не попавшие в отчет."""
+        return self.failed > len(self.errors)
+
+
+def campaign_lookup() -> Dict[str, Optional[int]]:
+    """
+    Загружает карту ссылок на кампании: id и название (без учета регистра) -> id.
+
+    Неоднозначным названиям (у нескольких кампаний) соответствует None.
+    """
+    lookup: Dict[str, Optional[int]] = {}
+    names: Counter = Counter()
+    rows = list(Campaign.objects.values_list("pk", "name"))
+    for pk, name in rows:
+        key = name.strip().casefold()
+        names[key] += 1
+        lookup[key] = pk if names[key] == 1 else None
+    lookup.update((str(pk), pk) for pk, _ in rows)
+    return lookup
+
+
+def clean_row(row: Dict[str, Any], campaigns: Dict[str, Optional[int]]) -> Tuple[Optional[Lead], Dict[str, List[str]]]:
+    """
+    Проверяет строку CSV по правилам полей LeadForm и строит несохраненный объект лида.
+
+    Возвращает:
+        tuple: (лид или None, ошибки по полям)
+    """
+    values: Dict[str, Any] = {}
+    errors: Dict[str, List[str]] = {}
+    for name in ("full_name", "phone", "email"):
+        try:
+            values[name] = LeadForm.base_fields[name].clean((row.get(name) or "").strip())
+        except ValidationError as e:
+            errors[name] = list(e.messages)
+
+    reference = (row.get("campaign") or "").strip()
+    key = reference if reference.isdigit() else reference.casefold()
+    if not reference:
+        errors["campaign"] = ["Обязательное поле."]
+    elif key not in campaigns:
+        errors["campaign"] = [f"Кампания «{reference}» не найдена."]
+    elif campaigns[key] is None:
+        errors["campaign"] = [f"Название кампании «{reference}» неоднозначно, укажите id."]
+    else:
+        values["campaign_id"] = campaigns[key]
+
+    if errors:
+        return None, errors
+    return Lead(**values), errors
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """Разбивает поток строк на пачки (номер строки файла, строка); заголовок — строка 1."""
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    for line, row in enumerate(rows, start=2):
+        batch.append((line, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_leads(leads: List[Lead]) -> List[int]:
+    """Записывает лидов командой COPY ... FROM STDIN (PostgreSQL) и возвращает их id."""
+    now = timezone.now()
+    stamp = now.isoformat()
+    names = ("full_name", "phone", "email", "campaign", "is_converted", "created_at", "updated_at")
+    columns = ", ".join(connection.ops.quote_name(Lead._meta.get_field(name).column) for name in names)
+    sql = f"COPY {connection.ops.quote_name(Lead._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for lead in leads:
+        lead.created_at = lead.updated_at = now
+        writer.writerow([lead.full_name, lead.phone, lead.email, lead.campaign_id, "f", stamp, stamp])
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    # COPY не возвращает id: строки пачки отличаются общим моментом создания с точностью до микросекунды
+    return list(Lead.objects.filter(created_at=now).values_list("pk", flat=True))
+
+
+def _write_batch(leads: List[Lead], use_copy: bool) -> None:
+    """Записывает пачку лидов и применяет ее к сводкам статистики в одной транзакции."""
+    with transaction.atomic():
+        if use_copy:
+            pks = _copy_leads(leads)
+        else:
+            pks = [lead.pk for lead in Lead.objects.bulk_create(leads)]
+
+        per_day: Counter = Counter()
+        for lead in leads:
+            per_day[(lead.campaign_id, local_day(lead.created_at))] += 1
+        apply_bucket_deltas({key: (count, 0, ZERO) for key, count in per_day.items()})
+        bump_model_version_on_commit(Lead)
+        record_many(AuditEvent.Action.CREATE, Lead, pks, source="import")
+
+
+def import_leads(
+    stream: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    use_copy: Optional[bool] = None,
+    on_error: Optional[Callable[[int, Dict[str, Any], Dict[str, List[str]]], None]] = None,
+) -> ImportReport:
+    """
+    Импортирует лидов из CSV-потока с заголовком full_name, phone, email, campaign.
+
+    Аргументы:
+        stream: Текстовый поток (файл, открытый с newline="")
+        batch_size: Размер пачки проверки и записи
+        use_copy: Писать через COPY; по умолчанию — если БД PostgreSQL
+        on_error: Вызывается для каждой отклоненной строки (номер строки, строка, ошибки)
+
+    Возвращает:
+        ImportReport: Итоги импорта
+
+    Исключения:
+        ValueError: Если в заголовке нет обязательных столбцов
+    """
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"В файле нет обязательных столбцов: {', '.join(missing)}")
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+
+    campaigns = campaign_lookup()
+    report = ImportReport()
+    for batch in _batches(reader, batch_size):
+        leads: List[Lead] = []
+        for line, row in batch:
+            lead, errors = clean_row(row, campaigns)
+            if lead is None:
+                report.add_error(line, errors)
+                if on_error is not None:
+                    on_error(line, row, errors)
+            else:
+                leads.append(lead)
+        if leads:
+            _write_batch(leads, use_copy)
+            report.created += len(leads)
+    return report
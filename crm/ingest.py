@@ -0,0 +1,211 @@
+"""
+Высокопроизводительный прием лидов от рекламных систем.
+
+Входящие лиды проверяются легкой схемой (без ModelForm) и попадают в буфер процесса,
+который копит их из всех одновременных запросов и сбрасывает в БД микропачками —
+при достижении CRM_INGEST_BATCH_SIZE лидов или по истечении CRM_INGEST_FLUSH_INTERVAL секунд.
+Каждый запрос дожидается сброса своей пачки и получает статус по каждому лиду.
+
+Прием идемпотентен по external_id: повторная доставка того же лида (ретраи рекламной системы)
+не создает дубликат, а возвращает статус "duplicate".
+"""
+
+from asgiref.sync import sync_to_async
+import asyncio
+from collections import Counter
+from crm.audit import record_many
+from crm.cache import bump_model_version_on_commit
+from crm.models.audit import AuditEvent
+from crm.models.campaigns import Campaign
+from crm.models.leads import Lead
+from crm.rollups import ZERO, apply_bucket_deltas, local_day
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from typing import Any, Dict, List, Optional, Set, Tuple
+import weakref
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+UNKNOWN_CAMPAIGN = "unknown_campaign"
+
+SCHEMA: Dict[str, Tuple[type, int]] = {
+    "external_id": (str, 100),
+    "full_name": (str, 255),
+    "phone": (str, 20),
+    "email": (str, 254),
+    "campaign": (int, 0),
+}
+
+
+def validate_lead(data: Any) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """
+    Проверяет лид по схеме SCHEMA.
+
+    Возвращает:
+        tuple: (нормализованные значения или None, ошибки по полям)
+    """
+    if not isinstance(data, dict):
+        return None, {"__all__": "Ожидается объект."}
+    values: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, (kind, max_length) in SCHEMA.items():
+        value = data.get(name)
+        if kind is int:
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                errors[name] = "Ожидается положительное целое число."
+            else:
+                values[name] = value
+            continue
+        value = value.strip() if isinstance(value, str) else ""
+        if not value:
+            errors[name] = "Обязательное поле."
+        elif len(value) > max_length:
+            errors[name] = f"Не более {max_length} символов."
+        else:
+            values[name] = value
+    if "email" in values:
+        try:
+            validate_email(values["email"])
+        except ValidationError:
+            errors["email"] = "Некорректный email."
+    return (None, errors) if errors else (values, errors)
+
+
+def write_batch(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Записывает пачку проверенных лидов и возвращает статус каждого.
+
+    Выполняется фиксированным числом запросов: проверка кампаний, поиск уже принятых external_id,
+    bulk_create с игнорированием конфликтов (защита от гонки между воркерами) и проверка вставленных строк.
+    """
+    external_ids = [item["external_id"] for item in items]
+    with transaction.atomic():
+        campaign_ids = {item["campaign"] for item in items}
+        campaigns = set(Campaign.objects.filter(pk__in=campaign_ids).values_list("pk", flat=True))
+        existing = set(Lead.objects.filter(external_id__in=external_ids).values_list("external_id", flat=True))
+
+        statuses: List[str] = []
+        new: Dict[str, Lead] = {}
+        for item in items:
+            if item["campaign"] not in campaigns:
+                statuses.append(UNKNOWN_CAMPAIGN)
+            elif item["external_id"] in existing or item["external_id"] in new:
+                statuses.append(DUPLICATE)
+            else:
+                statuses.append(CREATED)
+                new[item["external_id"]] = Lead(
+                    external_id=item["external_id"],
+                    full_name=item["full_name"],
+                    phone=item["phone"],
+                    email=item["email"],
+                    campaign_id=item["campaign"],
+                )
+        if not new:
+            return statuses
+
+        # Строки, вставленные параллельным воркером между проверкой и вставкой, отличаются от наших
+        # моментом создания: такие лиды считаются дубликатами и не учитываются в статистике повторно.
+        Lead.objects.bulk_create(new.values(), ignore_conflicts=True)
+        # С ignore_conflicts bulk_create не возвращает id: они берутся из той же проверки
+        stored = list(Lead.objects.filter(external_id__in=list(new)).values_list("external_id", "created_at", "pk"))
+        lost = {external_id for external_id, created_at, _ in stored if created_at != new[external_id].created_at}
+        if lost:
+            statuses = [
+                DUPLICATE if status == CREATED and item["external_id"] in lost else status
+                for item, status in zip(items, statuses, strict=True)
+            ]
+
+        per_day: Counter = Counter(
+            (lead.campaign_id, local_day(lead.created_at)) for key, lead in new.items() if key not in lost
+        )
+        apply_bucket_deltas({key: (count, 0, ZERO) for key, count in per_day.items()})
+        bump_model_version_on_commit(Lead)
+        created = [pk for external_id, _, pk in stored if external_id not in lost]
+        record_many(AuditEvent.Action.CREATE, Lead, created, source="ingest")
+    return statuses
+
+
+class IngestBuffer:
+    """
+    Буфер микропачек одного цикла событий.
+
+    Атрибуты:
+        batch_size (int): Размер пачки, при котором сброс выполняется немедленно
+        flush_interval (float): Максимальное время ожидания пачки, секунд
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float) -> None:
+        """Инициализирует пустой буфер."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, items: List[Dict[str, Any]]) -> List[str]:
+        """Ставит лиды в очередь и ждет их записи; возвращает статусы в порядке items."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._pending.append((item, future))
+            futures.append(future)
+
+        if len(self._pending) >= self.batch_size:
+            # Сброс идет в отдельной задаче: отмена этого запроса (разрыв соединения) не должна прерывать
+            # запись пачки, в которой лежат лиды других запросов
+            await asyncio.shield(self._schedule_flush())
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+        return list(await asyncio.gather(*futures))
+
+    def _schedule_flush(self) -> asyncio.Task:
+        """Запускает сброс в отдельной задаче, удерживая ссылку на нее до ее завершения."""
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def flush(self) -> None:
+        """Сбрасывает накопленные лиды в БД пачками не больше batch_size."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            while self._pending:
+                batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+                try:
+                    statuses = await sync_to_async(write_batch)([item for item, _ in batch])
+                    for (_, future), status in zip(batch, statuses, strict=True):
+                        if not future.done():
+                            future.set_result(status)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                finally:
+                    # Пачка уже извлечена из очереди: если сброс отменен (остановка цикла событий),
+                    # ожидающие запросы получают отмену, а не ждут вечно
+                    for _, future in batch:
+                        if not future.done():
+                            future.cancel()
+
+
+_buffers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, IngestBuffer]" = weakref.WeakKeyDictionary()
+
+
+def get_buffer() -> IngestBuffer:
+    """
+    Возвращает буфер текущего цикла событий.
+
+    Под ASGI цикл один на воркер, и буфер объединяет лиды всех запросов воркера;
+    под WSGI каждый асинхронный запрос выполняется в своем цикле и пачка собирается в пределах запроса.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = IngestBuffer(settings.CRM_INGEST_BATCH_SIZE, settings.CRM_INGEST_FLUSH_INTERVAL)
+    return buffer
@@ -0,0 +1,57 @@
+from crm.archive import BATCH_SIZE, archive_leads, month_bounds, month_start, purge_archive_month
+from crm.models.leads import LeadArchive
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+import os
+from typing import Any
+
+class Command(BaseCommand):
+    help = (
+        "Moves unconverted leads older than N whole months from crm_lead to the (on PostgreSQL, monthly "
+        "partitioned) lead archive in small batches; optionally dumps archived months before a given month "
+        "to gzipped CSV files and drops them"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--months", type=int, default=settings.CRM_LEAD_ARCHIVE_MONTHS, help="Archive leads older than this"
+        )
+        parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Leads moved per transaction")
+        parser.add_argument(
+            "--purge-before",
+            type=lambda value: datetime.datetime.strptime(value, "%Y-%m").date(),
+            help="Dump and drop archived months before this month (YYYY-MM)",
+        )
+        parser.add_argument("--dir", help="Directory for the dumps of purged months")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["months"] < 1 or options["batch"] < 1:
+            raise CommandError("--months and --batch must be positive")
+        if options["purge_before"] and not options["dir"]:
+            raise CommandError("--purge-before requires --dir")
+
+        month = month_start(timezone.now())
+        for _ in range(options["months"]):
+            month = (month - datetime.timedelta(days=1)).replace(day=1)
+        before = month_bounds(month)[0]
+        moved = archive_leads(before, batch_size=options["batch"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} unconverted leads created before {before:%Y-%m-%d}"))
+
+        if options["purge_before"]:
+            self.purge(options["purge_before"], options["dir"])
+
+    def purge(self, purge_before: datetime.date, directory: str) -> None:
+        """Выгружает и удаляет месяцы архива раньше purge_before, начиная с самого старого."""
+        oldest = LeadArchive.objects.aggregate(oldest=Min("created_at"))["oldest"]
+        if oldest is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        month = month_start(oldest)
+        while month < purge_before:
+            path = os.path.join(directory, f"archived-leads-{month:%Y-%m}.csv.gz")
+            removed = purge_archive_month(month, path)
+            self.stdout.write(self.style.SUCCESS(f"Purged {removed} archived leads of {month:%Y-%m} to {path}"))
+            month = month_bounds(month)[1].date()
@@ -0,0 +1,89 @@
+from accounts.backends import bump_user_version
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client as TestClient, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from importlib import import_module
+import time
+from typing import Any, Dict, Tuple
+import uuid
+
+MODES: Dict[str, Dict[str, Any]] = {
+    "db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "AUTHENTICATION_BACKENDS": ["django.contrib.auth.backends.ModelBackend"],
+    },
+    "cached": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "AUTHENTICATION_BACKENDS": ["accounts.backends.CachedModelBackend"],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures per-request authentication overhead (session and user lookup in SessionMiddleware and "
+        "AuthenticationMiddleware) with database-backed and cached sessions/users inside a rolled-back transaction"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--requests", type=int, default=2000, help="Authenticated requests per mode")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if cache.__class__.__name__ == "DummyCache":
+            raise CommandError("The default cache is DummyCache; configure a real backend to benchmark caching")
+        results: Dict[str, Tuple[int, float]] = {}
+        user_id = None
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(username=f"authbench-{uuid.uuid4().hex[:8]}")
+                user_id = user.pk
+                for mode, overrides in MODES.items():
+                    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], **overrides):
+                        results[mode] = self.measure(user, options["requests"])
+                transaction.set_rollback(True)
+        finally:
+            if user_id is not None:
+                bump_user_version(user_id)  # id из отмененной транзакции может достаться новому пользователю
+
+        for mode, (queries, micros) in results.items():
+            self.stdout.write(f"{mode}: {queries} queries/request, {micros:.0f} us/request")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Cached authentication saves {results['db'][0] - results['cached'][0]} queries "
+                f"and {results['db'][1] - results['cached'][1]:.0f} us per request"
+            )
+        )
+
+    def measure(self, user: Any, requests: int) -> Tuple[int, float]:
+        """Авторизует сессию и возвращает (SQL-запросов на запрос, микросекунд на запрос) для текущих настроек."""
+        client = TestClient()
+        client.force_login(user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        factory = RequestFactory()
+        sessions = SessionMiddleware(lambda request: None)
+        auth = AuthenticationMiddleware(lambda request: None)
+
+        def authenticate() -> None:
+            request = factory.get("/")
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+            sessions.process_request(request)
+            auth.process_request(request)
+            if request.user.pk != user.pk:
+                raise CommandError("Session did not authenticate the benchmark user")
+
+        authenticate()  # прогрев кэшей: измеряется установившийся режим
+        with CaptureQueriesContext(connection) as queries:
+            authenticate()
+        # Время замеряется отдельно: запись SQL в CaptureQueriesContext сама по себе замедляет запросы
+        started = time.perf_counter()
+        for _ in range(requests):
+            authenticate()
+        elapsed = time.perf_counter() - started
+        import_module(settings.SESSION_ENGINE).SessionStore(session_key).delete()
+        return len(queries.captured_queries), elapsed / requests * 1_000_000
@@ -0,0 +1,149 @@
+from accounts.backends import bump_user_version
+import copy
+from crm.metrics import pool_stats
+from crm.models import Campaign, Client, Contract, Lead, Service
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+from django.urls import reverse
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+import uuid
+
+# Карточки, задержка которых измеряется: маршрут и модель, первый объект которой открывается
+DETAIL_VIEWS = (
+    ("service_detail", Service),
+    ("campaign_detail", Campaign),
+    ("lead_detail", Lead),
+    ("contract_detail", Contract),
+    ("client_detail", Client),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the latency of the detail views with a new database connection per request (CONN_MAX_AGE=0, "
+        "no pool) and with reused connections (the configured psycopg pool, or persistent connections when "
+        "pooling is unavailable), and prints the number of connections opened and the pool statistics"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--requests", type=int, default=200, help="Requests to each detail view per mode")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["requests"] < 1:
+            raise CommandError("--requests must be positive")
+        urls = [
+            (name, reverse(name, args=[obj.pk]))
+            for name, model in DETAIL_VIEWS
+            if (obj := model.objects.order_by("pk").first()) is not None
+        ]
+        if not urls:
+            raise CommandError("No services, campaigns, leads, contracts or clients to open; run createdata first")
+
+        pooled = any(connections[alias].settings_dict["OPTIONS"].get("pool") for alias in settings.DATABASES)
+        reused_mode = "pooled" if pooled else "persistent"
+        # Соединение закрывается после каждого запроса, поэтому транзакция с откатом невозможна:
+        # пользователь создается и удаляется явно
+        user = get_user_model().objects.create_user(
+            username=f"connbench-{uuid.uuid4().hex[:8]}", role=get_user_model().Role.ADMIN
+        )
+        user_id = user.pk
+        results: Dict[str, Tuple[Dict[str, List[float]], int]] = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                client = TestClient()
+                client.force_login(user)
+                results["per-request"] = self.measure(client, urls, options["requests"], reuse=False)
+                results[reused_mode] = self.measure(client, urls, options["requests"], reuse=True)
+                client.logout()
+        finally:
+            user.delete()
+            bump_user_version(user_id)  # id удаленного пользователя может достаться новому
+
+        baseline, _ = results["per-request"]
+        for mode, (latencies, opened) in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{mode}: {opened} connections opened"))
+            for name, values in latencies.items():
+                median = statistics.median(values)
+                p95 = statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+                self.stdout.write(f"  {name}: median {median:.2f} ms, p95 {p95:.2f} ms")
+        for name, values in results[reused_mode][0].items():
+            before, after = statistics.median(baseline[name]), statistics.median(values)
+            self.stdout.write(self.style.SUCCESS(f"{name}: x{before / after:.2f} with {reused_mode} connections"))
+        for alias, stats in pool_stats().items():
+            self.stdout.write(f"pool {alias}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    def measure(
+        self, client: TestClient, urls: List[Tuple[str, str]], requests: int, reuse: bool
+    ) -> Tuple[Dict[str, List[float]], int]:
+        """
+        Открывает карточки requests раз в заданном режиме соединений.
+
+        Аргументы:
+            client (TestClient): Клиент с авторизованной сессией
+            urls (list): Пары (имя маршрута, адрес карточки)
+            requests (int): Количество запросов к каждой карточке
+            reuse (bool): Переиспользовать соединения (пул или постоянные соединения) вместо новых на каждый запрос
+
+        Возвращает:
+            tuple: Задержки по маршрутам в миллисекундах и количество открытых соединений с БД
+            (с пулом — новых соединений пула, а не выдач из него)
+        """
+        saved = {alias: copy.deepcopy(connections[alias].settings_dict) for alias in settings.DATABASES}
+        opened = 0
+
+        def count_connection(**kwargs: Any) -> None:
+            nonlocal opened
+            opened += 1
+
+        connections.close_all()
+        self.configure_connections(reuse)
+        latencies: Dict[str, List[float]] = {name: [] for name, _ in urls}
+        try:
+            for _, url in urls:  # прогрев: открытие пула, шаблоны, кэши
+                client.get(url)
+                close_old_connections()
+            pool_opened = sum(stats["connections_num"] for stats in pool_stats().values())
+            connection_created.connect(count_connection)
+            for _ in range(requests):
+                for name, url in urls:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    # Тестовый клиент не закрывает соединения по окончании запроса, как обработчики WSGI и ASGI
+                    close_old_connections()
+                    latencies[name].append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} returned {response.status_code}")
+            if reuse and pool_stats():
+                opened = sum(stats["connections_num"] for stats in pool_stats().values()) - pool_opened
+        finally:
+            connection_created.disconnect(count_connection)
+            connections.close_all()
+            for alias, settings_dict in saved.items():
+                connections[alias].settings_dict.clear()
+                connections[alias].settings_dict.update(settings_dict)
+        return latencies, opened
+
+    def configure_connections(self, reuse: bool) -> None:
+        """
+        Настраивает соединения всех БД на режим измерения.
+
+        Аргументы:
+            reuse (bool): Переиспользовать соединения: пул, если он настроен, иначе постоянные соединения;
+                при False пул отключается и соединение закрывается после каждого запроса
+        """
+        for alias in settings.DATABASES:
+            settings_dict = connections[alias].settings_dict
+            if not reuse:
+                settings_dict["OPTIONS"] = {
+                    key: value for key, value in settings_dict["OPTIONS"].items() if key != "pool"
+                }
+                settings_dict["CONN_MAX_AGE"] = 0
+            elif not settings_dict["OPTIONS"].get("pool"):
+                settings_dict["CONN_MAX_AGE"] = None
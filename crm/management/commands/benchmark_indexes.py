@@ -0,0 +1,108 @@
+from crm.aggregates import campaign_stats_queryset
+from crm.archive import BATCH_SIZE as ARCHIVE_BATCH_SIZE
+from crm.exports import EXPORTS, export_queryset
+from crm.models import Campaign, Lead, Service
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+import uuid
+
+# Индексы миграции 0008_lead_access_path_indexes, эффект которых измеряется
+INDEX_NAMES = ("crm_lead_campaign_created_idx", "crm_lead_unconverted_idx")
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates leads inside a rolled-back transaction and prints query plans and timings of the lead "
+        "access paths without and with the indexes of migration 0008. The indexes are dropped for the duration "
+        "of the run, which locks crm_lead on PostgreSQL: use a development copy of the database"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--leads", type=int, default=200000, help="Number of generated leads")
+        parser.add_argument("--campaigns", type=int, default=100, help="Number of generated campaigns")
+        parser.add_argument("--runs", type=int, default=5, help="Executions of each query per phase (median)")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        indexes = [index for index in Lead._meta.indexes if index.name in INDEX_NAMES]
+        results: Dict[str, Dict[str, Tuple[str, float]]] = {}
+        with transaction.atomic():
+            queries = self.generate(options["leads"], options["campaigns"])
+            # DDL выполняется напрямую: редактор схемы SQLite нельзя открыть внутри atomic,
+            # а сами команды откатываются вместе с транзакцией на обеих СУБД
+            editor = connection.schema_editor()
+            with connection.cursor() as cursor:
+                for index in indexes:
+                    cursor.execute(f"DROP INDEX {editor.quote_name(index.name)}")
+                results["without"] = self.measure(queries, options["runs"])
+                for index in indexes:
+                    cursor.execute(str(index.create_sql(Lead, editor)))
+            results["with"] = self.measure(queries, options["runs"])
+            transaction.set_rollback(True)
+
+        for label in queries:
+            (plan_before, before), (plan_after, after) = results["without"][label], results["with"][label]
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f"  without indexes: {before:.2f} ms\n    " + plan_before.replace("\n", "\n    "))
+            self.stdout.write(f"  with indexes: {after:.2f} ms\n    " + plan_after.replace("\n", "\n    "))
+            self.stdout.write(self.style.SUCCESS(f"  speedup: x{before / after:.1f}" if after else "  speedup: n/a"))
+
+    def generate(self, leads: int, campaigns: int) -> Dict[str, Callable[[], QuerySet]]:
+        """Создает кампании и лидов (каждый третий конвертирован) и возвращает измеряемые запросы."""
+        run = uuid.uuid4().hex[:8]
+        service = Service.objects.create(name=f"Index benchmark {run}", description="", price=0)
+        created = Campaign.objects.bulk_create(
+            Campaign(name=f"Index benchmark {run} {n}", service=service, channel="benchmark", budget=0)
+            for n in range(campaigns)
+        )
+        ids = [campaign.pk for campaign in created]
+        Lead.objects.bulk_create(
+            (
+                Lead(
+                    full_name=f"Benchmark Lead {n}",
+                    phone=f"+7998{n:07d}",
+                    email=f"bench{n}@example.com",
+                    campaign_id=ids[n % campaigns],
+                    is_converted=n % 3 == 0,
+                )
+                for n in range(leads)
+            ),
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE crm_lead" if connection.vendor == "postgresql" else "ANALYZE")
+
+        campaign_id = ids[campaigns // 2]
+        today = timezone.localdate()
+        archive_before = timezone.now()
+        spec = EXPORTS["leads"]
+        return {
+            "Lead export of one campaign": lambda: export_queryset(spec, campaign_id=campaign_id),
+            "Lead export of one campaign for a day": lambda: export_queryset(
+                spec, date_from=today, date_to=today, campaign_id=campaign_id
+            ),
+            "Lead count of one campaign (statistics)": lambda: campaign_stats_queryset([campaign_id]).values(
+                "pk", "lead_count"
+            ),
+            "Oldest unconverted leads (archiving batch)": lambda: Lead.objects.filter(
+                created_at__lt=archive_before, is_converted=False
+            ).order_by("created_at", "id")[:ARCHIVE_BATCH_SIZE],
+        }
+
+    def measure(self, queries: Dict[str, Callable[[], QuerySet]], runs: int) -> Dict[str, Tuple[str, float]]:
+        """Возвращает {запрос: (план, медиана времени выполнения в мс)}."""
+        explain: Dict[str, Any] = {"analyze": True} if connection.vendor == "postgresql" else {}
+        results: Dict[str, Tuple[str, float]] = {}
+        for label, build in queries.items():
+            plan = build().explain(**explain)
+            timings: List[float] = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (plan, statistics.median(timings))
+        return results
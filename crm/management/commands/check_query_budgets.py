@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import get_runner
+from typing import Any
+
+TEST_LABEL = "crm.tests.test_query_budgets"
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the query budget tests (crm/tests/test_query_budgets.py) on a test database: every view in "
+        "crm/urls.py is requested with synthetic data at two sizes and fails if its query count grows with "
+        "the number of rows or repeats one query shape (N+1)"
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        runner = get_runner(settings)(verbosity=options["verbosity"], interactive=False)
+        if runner.run_tests([TEST_LABEL]):
+            raise CommandError("Some views exceed their query budget")
+        self.stdout.write(self.style.SUCCESS("All views issue a constant number of queries"))
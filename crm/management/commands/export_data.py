@@ -0,0 +1,35 @@
+from crm.exports import CHUNK_SIZE, EXPORTS, FORMATS, stream_export
+import datetime
+from django.core.management.base import BaseCommand
+import sys
+from typing import Any
+
+class Command(BaseCommand):
+    help = "Streams leads, clients or contracts to a CSV/JSON Lines file (optionally gzipped) with constant memory"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("dataset", choices=sorted(EXPORTS), help="Dataset to export")
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv", help="Output format")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip")
+        parser.add_argument("--date-from", type=datetime.date.fromisoformat, help="Created on or after (YYYY-MM-DD)")
+        parser.add_argument("--date-to", type=datetime.date.fromisoformat, help="Created on or before (YYYY-MM-DD)")
+        parser.add_argument("--campaign", type=int, help="Campaign id")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched per database round trip")
+        parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        chunks = stream_export(
+            options["dataset"],
+            fmt=options["format"],
+            compress=options["gzip"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            campaign_id=options["campaign"],
+            chunk_size=options["chunk_size"],
+        )
+        output = options["output"] or sys.stdout.fileno()
+        with open(output, "wb", closefd=bool(options["output"])) as out:
+            for chunk in chunks:
+                out.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}"))
@@ -0,0 +1,46 @@
+from crm.imports import DEFAULT_BATCH_SIZE, import_leads
+import csv
+from django.core.management.base import BaseCommand, CommandError
+import json
+from typing import Any
+
+class Command(BaseCommand):
+    help = "Streams leads from a CSV file (full_name, phone, email, campaign) into the database in batches"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("path", help="Path to the CSV file")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per validated batch")
+        parser.add_argument("--no-copy", action="store_true", help="Use bulk_create even on PostgreSQL")
+        parser.add_argument("--errors", help="Write rejected rows with their errors to this CSV file")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        error_file = open(options["errors"], "w", newline="", encoding="utf-8") if options["errors"] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(["line", "errors", "row"])
+
+        def on_error(line: int, row: dict, errors: dict) -> None:
+            if error_writer:
+                error_writer.writerow(
+                    [line, json.dumps(errors, ensure_ascii=False), json.dumps(row, ensure_ascii=False)]
+                )
+
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as stream:
+                report = import_leads(
+                    stream,
+                    batch_size=options["batch_size"],
+                    use_copy=False if options["no_copy"] else None,
+                    on_error=on_error,
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e)) from e
+        finally:
+            if error_file:
+                error_file.close()
+
+        for line, errors in report.errors[:20]:
+            self.stdout.write(f"line {line}: {json.dumps(errors, ensure_ascii=False)}")
+        if report.failed:
+            self.stdout.write(self.style.WARNING(f"Rejected {report.failed} rows"))
+        self.stdout.write(self.style.SUCCESS(f"Imported {report.created} leads"))
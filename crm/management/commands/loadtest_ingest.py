@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+import json
+import statistics
+import time
+from typing import Any, List, Tuple
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the lead ingestion endpoint of a running server, e.g. "
+        "`uvicorn crm_system.asgi:application --workers 1`, and reports leads/s and request latency"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--url", default="http://127.0.0.1:8000/crm/leads/ingest/", help="Ingestion endpoint URL")
+        parser.add_argument("--token", required=True, help="One of CRM_INGEST_TOKENS")
+        parser.add_argument("--campaign", type=int, required=True, help="Campaign id for generated leads")
+        parser.add_argument("--total", type=int, default=20000, help="Total number of leads to send")
+        parser.add_argument("--batch", type=int, default=50, help="Leads per request")
+        parser.add_argument("--concurrency", type=int, default=16, help="Parallel connections")
+        parser.add_argument("--duplicates", action="store_true", help="Send every batch twice to exercise idempotency")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if urllib.parse.urlsplit(options["url"]).scheme not in ("http", "https"):
+            raise CommandError(f"--url must be an http(s) URL: {options['url']}")
+        run = uuid.uuid4().hex[:8]
+        batches = [
+            [
+                {
+                    "external_id": f"loadtest-{run}-{n}",
+                    "full_name": f"Load Test {n}",
+                    "phone": f"+7999{n:07d}",
+                    "email": f"load{n}@example.com",
+                    "campaign": options["campaign"],
+                }
+                for n in range(start, min(start + options["batch"], options["total"]))
+            ]
+            for start in range(0, options["total"], options["batch"])
+        ]
+        if options["duplicates"]:
+            batches = [batch for batch in batches for _ in range(2)]
+
+        def send(batch: List[dict]) -> Tuple[float, dict]:
+            # Схема --url проверена в начале handle: только http(s)
+            request = urllib.request.Request(  # noqa: S310
+                options["url"],
+                data=json.dumps(batch).encode(),
+                headers={"Content-Type": "application/json", "Authorization": f"Bearer {options['token']}"},
+            )
+            started = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=60) as response:  # noqa: S310
+                body = json.loads(response.read())
+            return time.perf_counter() - started, body
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                results = list(pool.map(send, batches))
+        except (urllib.error.URLError, OSError) as e:
+            raise CommandError(f"Request failed: {e}") from e
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        sent = sum(len(batch) for batch in batches)
+        created = sum(body["created"] for _, body in results)
+        duplicates = sum(body["duplicates"] for _, body in results)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(f"requests={len(batches)} leads={sent} created={created} duplicates={duplicates}")
+        p50, p95, p99 = (quantiles[q] * 1000 for q in (49, 94, 98))
+        self.stdout.write(f"latency p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms")
+        self.stdout.write(self.style.SUCCESS(f"{sent / elapsed:.0f} leads/s over {elapsed:.2f}s"))
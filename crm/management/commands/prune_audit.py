@@ -0,0 +1,22 @@
+from crm.audit import prune
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from typing import Any
+
+class Command(BaseCommand):
+    help = "Deletes audit events older than the retention period in small batches"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--days", type=int, default=settings.CRM_AUDIT_RETENTION_DAYS, help="Keep events for this many days"
+        )
+        parser.add_argument("--batch", type=int, default=10000, help="Events deleted per transaction")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["days"] < 1 or options["batch"] < 1:
+            raise CommandError("--days and --batch must be positive")
+        before = timezone.now() - datetime.timedelta(days=options["days"])
+        deleted = prune(before, batch_size=options["batch"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} audit events older than {before:%Y-%m-%d %H:%M}"))
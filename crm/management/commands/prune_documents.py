@@ -0,0 +1,35 @@
+from crm.documents import migrate_legacy_documents, prune_orphans, rebuild_references
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from typing import Any
+
+class Command(BaseCommand):
+    help = (
+        "Recounts contract references to document files, optionally moves documents uploaded before "
+        "content-addressed storage into it, and deletes document files no contract refers to"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=settings.CRM_DOCUMENT_ORPHAN_HOURS,
+            help="Keep unreferenced files changed within this many hours",
+        )
+        parser.add_argument(
+            "--migrate-legacy", action="store_true", help="Deduplicate documents stored under their upload names"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["hours"] < 1:
+            raise CommandError("--hours must be positive")
+        if options["migrate_legacy"]:
+            moved = migrate_legacy_documents()
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} legacy documents to content-addressed storage"))
+        fixed = rebuild_references()
+        self.stdout.write(f"Fixed {fixed} document reference counts")
+        before = timezone.now() - datetime.timedelta(hours=options["hours"])
+        removed, freed = prune_orphans(before)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {removed} unreferenced document files ({freed} bytes)"))
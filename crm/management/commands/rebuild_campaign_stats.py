@@ -0,0 +1,53 @@
+from crm.models.campaigns import Campaign
+from crm.rollups import (
+    find_campaign_stats_drift,
+    find_daily_stats_drift,
+    find_service_stats_drift,
+    rebuild_campaign_stats,
+    rebuild_daily_stats,
+    rebuild_service_stats,
+)
+from django.core.management.base import BaseCommand, CommandError
+from typing import Any
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the campaign statistics rollups (totals, daily series and per-service totals) from scratch "
+        "or checks them for drift"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--campaign", type=int, action="append", dest="campaigns", help="Campaign id (repeatable)")
+        parser.add_argument("--check", action="store_true", help="Only report drift, do not rewrite the rollups")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        campaign_ids = options["campaigns"]
+        service_ids = None
+        if campaign_ids is not None:
+            service_ids = set(Campaign.objects.filter(pk__in=campaign_ids).values_list("service_id", flat=True))
+
+        if options["check"]:
+            drift = find_campaign_stats_drift(campaign_ids) + find_daily_stats_drift(campaign_ids)
+            for item in drift:
+                day = f" date={item['date']}" if "date" in item else ""
+                self.stdout.write(
+                    f"campaign={item['campaign_id']}{day} field={item['field']} "
+                    f"stored={item['stored']} actual={item['actual']}"
+                )
+            service_drift = find_service_stats_drift(service_ids)
+            for item in service_drift:
+                self.stdout.write(
+                    f"service={item['service_id']} field={item['field']} "
+                    f"stored={item['stored']} actual={item['actual']}"
+                )
+            if drift or service_drift:
+                raise CommandError(f"Campaign stats rollups have drifted: {len(drift) + len(service_drift)} mismatches")
+            self.stdout.write(self.style.SUCCESS("Campaign stats rollups are consistent"))
+            return
+
+        campaigns = rebuild_campaign_stats(campaign_ids)
+        days = rebuild_daily_stats(campaign_ids)
+        services = rebuild_service_stats(service_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt stats for {campaigns} campaigns ({days} daily rows) and {services} services")
+        )
@@ -0,0 +1,84 @@
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import glob
+import json
+import os
+from typing import Any, Dict, Iterator, List
+
+SORT_KEYS = {
+    "total": lambda item: item["total_ms"],
+    "count": lambda item: item["count"],
+    "max": lambda item: item["max_ms"],
+    "mean": lambda item: item["total_ms"] / item["count"],
+}
+
+
+class Command(BaseCommand):
+    help = "Aggregates the slow-query log by query fingerprint and prints the shapes that dominate database time"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--log", default=settings.CRM_SLOW_QUERY_LOG, help="Log path (rotated files included)")
+        parser.add_argument("--top", type=int, default=10, help="Number of fingerprints to print")
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="total", help="Ranking key")
+        parser.add_argument("--view", help="Only queries issued by this URL name")
+        parser.add_argument("--explain", action="store_true", help="Print the latest captured EXPLAIN plan")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        files = sorted(glob.glob(f"{glob.escape(options['log'])}*"), key=os.path.getmtime)
+        if not files:
+            raise CommandError(f"No slow-query log at {options['log']}")
+
+        groups: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries(files):
+            if options["view"] and entry.get("view") != options["view"]:
+                continue
+            group = groups.setdefault(
+                entry["fingerprint"],
+                {
+                    "fingerprint": entry["fingerprint"],
+                    "sql": entry["sql"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "sites": Counter(),
+                    "explain": None,
+                },
+            )
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            site = " | ".join(filter(None, (entry.get("view"), entry.get("call_site"), entry.get("template"))))
+            group["sites"][site or "unknown"] += 1
+            group["explain"] = entry.get("explain") or group["explain"]
+
+        total_ms = sum(group["total_ms"] for group in groups.values()) or 1.0
+        ranked: List[Dict[str, Any]] = sorted(groups.values(), key=SORT_KEYS[options["sort"]], reverse=True)
+        for group in ranked[: options["top"]]:
+            mean = group["total_ms"] / group["count"]
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{group['fingerprint']} total={group['total_ms']:.0f}ms ({group['total_ms'] / total_ms:.0%}) "
+                    f"count={group['count']} mean={mean:.1f}ms max={group['max_ms']:.1f}ms"
+                )
+            )
+            self.stdout.write(f"  {group['sql']}")
+            for site, count in group["sites"].most_common(3):
+                self.stdout.write(f"  {count} x {site}")
+            if options["explain"] and group["explain"]:
+                self.stdout.write("  " + group["explain"].replace("\n", "\n  "))
+        self.stdout.write(
+            self.style.SUCCESS(f"{sum(g['count'] for g in groups.values())} slow queries, {len(groups)} fingerprints")
+        )
+
+    def entries(self, files: List[str]) -> Iterator[Dict[str, Any]]:
+        """Читает записи журнала, пропуская поврежденные строки."""
+        for path in files:
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "fingerprint" in entry and "duration_ms" in entry:
+                        yield entry
@@ -0,0 +1,404 @@
+"""
+Метрики запросов CRM в формате Prometheus.
+
+Middleware crm.middleware.RequestMetricsMiddleware для каждого запроса замеряет время ответа,
+число и суммарное время SQL-запросов и размер ответа и передает их в record_request.
+SQL учитывается обертками выполнения запросов (connection.execute_wrappers), которые подключаются
+к каждому соединению с БД и работают независимо от DEBUG; счетчики запроса хранятся в contextvar,
+поэтому учитываются и запросы асинхронных представлений, выполняемые через sync_to_async.
+Та же обертка передает медленные запросы в журнал crm.slowqueries.
+
+Значения копятся в памяти процесса в гистограммах с фиксированными границами. Если задан каталог
+CRM_METRICS_DIR, процесс не чаще раза в CRM_METRICS_FLUSH_INTERVAL секунд сохраняет снимок
+в свой файл, а эндпоинт метрик суммирует файлы всех воркеров. Каталог очищается при развертывании.
+В снимок входят и показатели пулов соединений с БД (psycopg_pool, см. DB_POOL в настройках);
+текущие значения пулов берутся только у работающих процессов.
+"""
+
+import atexit
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from crm.cache import cache_stats
+from crm.slowqueries import record_slow_query
+from django.conf import settings
+from django.db import connections
+import json
+import os
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+UNMATCHED = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Показатели psycopg_pool.ConnectionPool.get_stats(): имя, тип метрики Prometheus, описание
+POOL_METRICS: Tuple[Tuple[str, str, str], ...] = (
+    ("pool_min", "gauge", "Минимальный размер пула."),
+    ("pool_max", "gauge", "Максимальный размер пула."),
+    ("pool_size", "gauge", "Открытые соединения пула (выданные и свободные)."),
+    ("pool_available", "gauge", "Свободные соединения пула."),
+    ("requests_waiting", "gauge", "Запросы соединения, ожидающие в очереди."),
+    ("requests_num", "counter", "Выдачи соединений из пула."),
+    ("requests_queued", "counter", "Выдачи, которым пришлось ждать свободного соединения."),
+    ("requests_wait_ms", "counter", "Суммарное ожидание соединения, мс."),
+    ("requests_errors", "counter", "Запросы соединения, завершившиеся ошибкой (в том числе по таймауту)."),
+    ("connections_num", "counter", "Попытки открыть соединение с БД."),
+    ("connections_errors", "counter", "Неудачные попытки открыть соединение."),
+    ("connections_lost", "counter", "Соединения, отброшенные проверкой при выдаче (разорванные)."),
+    ("returns_bad", "counter", "Соединения, возвращенные в пул в неисправном состоянии."),
+    ("usage_ms", "counter", "Суммарное время использования выданных соединений, мс."),
+)
+POOL_GAUGES = frozenset(key for key, kind, _ in POOL_METRICS if kind == "gauge")
+
+
+class QueryStats:
+    """
+    Счетчики SQL одного HTTP-запроса.
+
+    Атрибуты:
+        count (int): Количество выполненных SQL-запросов
+        duration (float): Суммарное время их выполнения, секунд
+        shapes (dict): Количество выполнений каждого текста SQL (для поиска N+1, см. crm.querybudget)
+        trace (list): Если задан — журнал запросов (SQL, время, места вызова в коде проекта), см. trace_queries
+        request (HttpRequest): HTTP-запрос, если счетчики заведены middleware
+    """
+
+    __slots__ = ("count", "duration", "shapes", "trace", "request")
+
+    def __init__(self, request: Any = None) -> None:
+        """Инициализирует нулевые счетчики."""
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.trace: Optional[List[Tuple[str, float, List[str]]]] = None
+
+    @property
+    def view(self) -> Optional[str]:
+        """Возвращает имя маршрута HTTP-запроса (None до разрешения URL или вне запроса)."""
+        match = getattr(self.request, "resolver_match", None)
+        return match.view_name if match else None
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("crm_query_stats", default=None)
+
+
+def sql_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: Dict[str, Any]) -> Any:
+    """
+    Обертка выполнения SQL.
+
+    Учитывает запрос в счетчиках текущего HTTP-запроса, если они заведены, а успешно выполненные
+    запросы не быстрее CRM_SLOW_QUERY_MS передает в журнал медленных запросов (crm.slowqueries).
+    """
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        if stats is not None:
+            stats.count += 1
+            stats.duration += elapsed
+            stats.shapes[sql] = stats.shapes.get(sql, 0) + 1
+            if stats.trace is not None:
+                stats.trace.append((sql, elapsed, _origin()))
+    threshold = settings.CRM_SLOW_QUERY_MS
+    if threshold > 0 and elapsed * 1000 >= threshold:
+        record_slow_query(sql, params, many, elapsed, context, stats.view if stats is not None else None)
+    return result
+
+
+def instrument_connection(connection: Any) -> None:
+    """Подключает sql_wrapper к соединению с БД (однократно, в том числе после переподключения)."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+@contextmanager
+def track_queries(request: Any = None) -> Iterator[QueryStats]:
+    """Заводит счетчики SQL (HTTP-запроса request) на время блока и возвращает их."""
+    stats = QueryStats(request)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _origin(depth: int = 6) -> List[str]:
+    """Возвращает места вызова SQL в коде проекта (без Django и сторонних пакетов), от ближайшего."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        f"{os.path.relpath(frame.filename, root)}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root) and "site-packages" not in frame.filename and frame.filename != __file__
+    ]
+    return frames[::-1][:depth]
+
+
+@contextmanager
+def trace_queries() -> Iterator[List[Tuple[str, float, List[str]]]]:
+    """
+    Ведет журнал SQL-запросов текущего HTTP-запроса на время блока (для профилировщика).
+
+    Использует счетчики track_queries, если они заведены, иначе заводит свои.
+    """
+    stats = _current.get()
+    token = None
+    if stats is None:
+        stats = QueryStats()
+        token = _current.set(stats)
+    stats.trace = trace = []
+    try:
+        yield trace
+    finally:
+        stats.trace = None
+        if token is not None:
+            _current.reset(token)
+
+
+Series = Dict[str, Any]
+
+_series: Dict[Tuple[str, str], Series] = {}
+_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _new_series() -> Series:
+    """Возвращает пустой набор значений для пары (представление, метод)."""
+    return {
+        "latency": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_sum": 0.0,
+        "queries": [0] * (len(QUERY_BUCKETS) + 1),
+        "queries_sum": 0,
+        "sql_seconds": 0.0,
+        "response_bytes": 0,
+        "statuses": {},
+    }
+
+
+def record_request(view: str, method: str, status: int, duration: float, queries: QueryStats, size: int) -> None:
+    """Учитывает завершенный HTTP-запрос."""
+    global _last_flush
+    now = time.monotonic()
+    with _lock:
+        series = _series.get((view, method))
+        if series is None:
+            series = _series[(view, method)] = _new_series()
+        series["latency"][bisect_left(LATENCY_BUCKETS, duration)] += 1
+        series["latency_sum"] += duration
+        series["queries"][bisect_left(QUERY_BUCKETS, queries.count)] += 1
+        series["queries_sum"] += queries.count
+        series["sql_seconds"] += queries.duration
+        series["response_bytes"] += size
+        status_class = f"{status // 100}xx"
+        series["statuses"][status_class] = series["statuses"].get(status_class, 0) + 1
+
+        flush = settings.CRM_METRICS_DIR and now - _last_flush >= settings.CRM_METRICS_FLUSH_INTERVAL
+        if flush:
+            _last_flush = now
+    if flush:
+        flush_snapshot()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Возвращает снимок метрик текущего процесса."""
+    with _lock:
+        views = [
+            {
+                "view": view,
+                "method": method,
+                **series,
+                "latency": list(series["latency"]),
+                "queries": list(series["queries"]),
+                "statuses": dict(series["statuses"]),
+            }
+            for (view, method), series in _series.items()
+        ]
+    return {"views": views, "cache": cache_stats(), "pools": pool_stats()}
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Возвращает показатели открытых пулов соединений процесса по псевдонимам БД."""
+    stats = {}
+    for alias in settings.DATABASES:
+        pool = getattr(connections[alias], "pool", None)  # есть только у PostgreSQL с настроенным пулом
+        if pool is not None and not pool.closed:
+            values = pool.get_stats()
+            stats[alias] = {key: int(values.get(key, 0)) for key, _, _ in POOL_METRICS}
+    return stats
+
+
+def _snapshot_path(pid: int) -> str:
+    """Возвращает путь файла снимка процесса."""
+    return os.path.join(settings.CRM_METRICS_DIR, f"metrics-{pid}.json")
+
+
+def flush_snapshot() -> None:
+    """Атомарно сохраняет снимок процесса в CRM_METRICS_DIR (если процесс обслужил хотя бы один запрос)."""
+    if not settings.CRM_METRICS_DIR or not _series:
+        return
+    path = _snapshot_path(os.getpid())
+    try:
+        os.makedirs(settings.CRM_METRICS_DIR, exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(snapshot(), file)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass  # метрики не должны влиять на обработку запроса; снимок будет записан при следующем сбросе
+
+
+atexit.register(flush_snapshot)
+
+
+def _merge(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+    """Прибавляет снимок part к сумме total."""
+    for row in part.get("views", []):
+        series = total["views"].setdefault((row["view"], row["method"]), _new_series())
+        for key in ("latency", "queries"):
+            series[key] = [a + b for a, b in zip(series[key], row[key], strict=True)]
+        for key in ("latency_sum", "queries_sum", "sql_seconds", "response_bytes"):
+            series[key] += row[key]
+        for status_class, count in row["statuses"].items():
+            series["statuses"][status_class] = series["statuses"].get(status_class, 0) + count
+    for name, outcomes in part.get("cache", {}).items():
+        counters = total["cache"].setdefault(name, {})
+        for outcome, count in outcomes.items():
+            counters[outcome] = counters.get(outcome, 0) + count
+    for alias, values in part.get("pools", {}).items():
+        pool = total["pools"].setdefault(alias, {})
+        for key, value in values.items():
+            pool[key] = pool.get(key, 0) + value
+
+
+def _process_alive(pid: int) -> bool:
+    """Проверяет, что процесс с номером pid работает (на Windows всегда True: там os.kill завершает процесс)."""
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # процесс есть, но принадлежит другому пользователю
+    return True
+
+
+def collect() -> Dict[str, Any]:
+    """
+    Суммирует метрики всех процессов.
+
+    Текущий процесс берется из памяти, остальные — из их файлов в CRM_METRICS_DIR
+    (включая завершившиеся воркеры, чтобы счетчики не уменьшались). Пулы соединений завершившихся
+    воркеров закрыты, поэтому из их показателей учитываются только счетчики, а текущие значения
+    (POOL_GAUGES) отбрасываются.
+    """
+    total: Dict[str, Any] = {"views": {}, "cache": {}, "pools": {}}
+    _merge(total, snapshot())
+    if settings.CRM_METRICS_DIR and os.path.isdir(settings.CRM_METRICS_DIR):
+        own = os.path.basename(_snapshot_path(os.getpid()))
+        for name in sorted(os.listdir(settings.CRM_METRICS_DIR)):
+            if not name.startswith("metrics-") or not name.endswith(".json") or name == own:
+                continue
+            try:
+                with open(os.path.join(settings.CRM_METRICS_DIR, name), encoding="utf-8") as file:
+                    part = json.load(file)
+            except (OSError, ValueError):
+                continue
+            pid = name[len("metrics-") : -len(".json")]
+            if not pid.isdigit() or not _process_alive(int(pid)):
+                part["pools"] = {
+                    alias: {key: value for key, value in values.items() if key not in POOL_GAUGES}
+                    for alias, values in part.get("pools", {}).items()
+                }
+            _merge(total, part)
+    return total
+
+
+def _labels(**labels: Any) -> str:
+    """Форматирует метки Prometheus с экранированием значений."""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _histogram(
+    lines: List[str], name: str, buckets: Sequence[float], counts: List[int], total: float, labels: Dict[str, str]
+) -> None:
+    """Добавляет строки гистограммы (накопительные бакеты, сумма, количество)."""
+    cumulative = 0
+    for bound, count in zip([*buckets, "+Inf"], counts, strict=True):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+def _view_histograms(
+    lines: List[str],
+    name: str,
+    help_text: str,
+    buckets: Sequence[float],
+    key: str,
+    views: List[Tuple[Tuple[str, str], Series]],
+) -> None:
+    """Добавляет гистограмму name по всем парам (представление, метод) из значений series[key]."""
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (view, method), series in views:
+        _histogram(lines, name, buckets, series[key], series[f"{key}_sum"], {"view": view, "method": method})
+
+
+def render_prometheus(data: Dict[str, Any]) -> str:
+    """Возвращает метрики в текстовом формате Prometheus."""
+    views = sorted(data["views"].items())
+    lines: List[str] = []
+    _view_histograms(
+        lines,
+        "crm_http_request_duration_seconds",
+        "Время обработки запроса по представлениям.",
+        LATENCY_BUCKETS,
+        "latency",
+        views,
+    )
+
+    lines += [
+        "# HELP crm_http_requests_total Количество запросов по представлениям и классам статусов.",
+        "# TYPE crm_http_requests_total counter",
+    ]
+    for (view, method), series in views:
+        for status_class, count in sorted(series["statuses"].items()):
+            lines.append(f"crm_http_requests_total{_labels(view=view, method=method, status=status_class)} {count}")
+
+    _view_histograms(
+        lines, "crm_db_queries_per_request", "Количество SQL-запросов на HTTP-запрос.", QUERY_BUCKETS, "queries", views
+    )
+
+    for name, key, help_text in (
+        ("crm_db_query_duration_seconds_total", "sql_seconds", "Суммарное время SQL-запросов."),
+        ("crm_http_response_size_bytes_total", "response_bytes", "Суммарный размер ответов."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (view, method), series in views:
+            lines.append(f"{name}{_labels(view=view, method=method)} {series[key]}")
+
+    lines += [
+        "# HELP crm_cache_requests_total Обращения к кэшу результатов CRM.",
+        "# TYPE crm_cache_requests_total counter",
+    ]
+    for name, outcomes in sorted(data["cache"].items()):
+        for outcome, count in sorted(outcomes.items()):
+            lines.append(f"crm_cache_requests_total{_labels(name=name, outcome=outcome)} {count}")
+
+    pools = sorted(data["pools"].items())
+    for key, kind, help_text in POOL_METRICS:
+        name = f"crm_db_pool_{key}_total" if kind == "counter" else f"crm_db_pool_{key}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for alias, values in pools:
+            lines.append(f"{name}{_labels(alias=alias)} {values.get(key, 0)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,175 @@
+"""Middleware CRM."""
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from crm.audit import collect, flush
+from crm.metrics import UNMATCHED, QueryStats, record_request, track_queries
+from crm.profiling import REPORT_HEADER, RequestProfile, is_allowed, is_requested
+from crm.querybudget import check_repeated_queries
+from crm.replicas import finish_response, routing
+from django.http import HttpRequest, HttpResponse
+import time
+from typing import Any, Callable
+
+class RequestMetricsMiddleware:
+    """
+    Замеряет время ответа, SQL-запросы и размер ответа каждого запроса (см. crm.metrics).
+
+    Кроме того, проверяет запрос на повторяющиеся SQL-запросы одной формы (см. crm.querybudget).
+
+    Запросы группируются по имени маршрута (view_name); для потоковых ответов учитывается время
+    до начала отправки тела, а размер берется из заголовка Content-Length, если он задан.
+    Поддерживает синхронный и асинхронный режимы, чтобы не переключать асинхронные представления в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """Инициализирует middleware."""
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Обрабатывает запрос в синхронном режиме."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with track_queries(request) as queries:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Обрабатывает запрос в асинхронном режиме."""
+        start = time.perf_counter()
+        with track_queries(request) as queries:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    @staticmethod
+    def record(request: HttpRequest, response: HttpResponse, duration: float, queries: QueryStats) -> None:
+        """Передает замеры запроса в crm.metrics и проверяет его на N+1."""
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match and match.view_name else UNMATCHED
+        if response.streaming:
+            size = int(response.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+        record_request(view, request.method or "", response.status_code, duration, queries, size)
+        check_repeated_queries(view, queries)
+
+
+class RequestProfilerMiddleware:
+    """
+    Профилирует запрос, если администратор запросил это заголовком или параметром (см. crm.profiling).
+
+    Должен стоять после AuthenticationMiddleware. Для остальных запросов только проверяет признак
+    профилирования и сразу передает запрос дальше.
+
+    cProfile профилирует только поток, в котором включен. Поэтому в асинхронном режиме обработка
+    передается в поток sync_to_async, где включается профилировщик, а оттуда через async_to_sync
+    обратно в цикл событий: синхронные представления и вызовы sync_to_async запроса выполняются
+    в этом же потоке и попадают в профиль, а корутины цикла событий — нет (это отмечается в отчете).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """Инициализирует middleware."""
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Обрабатывает запрос в синхронном режиме."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (is_requested(request) and is_allowed(request)):
+            return self.get_response(request)
+        with RequestProfile() as profile:
+            response = self.get_response(request)
+        response[REPORT_HEADER] = profile.save(request, response)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Обрабатывает запрос в асинхронном режиме."""
+        if not (is_requested(request) and await sync_to_async(is_allowed)(request)):
+            return await self.get_response(request)
+        profile = RequestProfile(asynchronous=True)
+
+        def profiled(request: HttpRequest) -> HttpResponse:
+            with profile:
+                return async_to_sync(self.get_response)(request)
+
+        response = await sync_to_async(profiled)(request)
+        response[REPORT_HEADER] = await sync_to_async(profile.save)(request, response)
+        return response
+
+
+class AuditMiddleware:
+    """
+    Копит события журнала аудита запроса и записывает их одним bulk_create в конце запроса (см. crm.audit).
+
+    Должен стоять после AuthenticationMiddleware: автором событий становится пользователь запроса.
+    Запросы без событий (все запросы на чтение) к БД не обращаются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """Инициализирует middleware."""
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Обрабатывает запрос в синхронном режиме."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect(getattr(request, "user", None)):
+            return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Обрабатывает запрос в асинхронном режиме."""
+        with collect(getattr(request, "user", None), autoflush=False) as events:
+            response = await self.get_response(request)
+        if events:
+            await sync_to_async(flush)(events)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Открывает состояние маршрутизации чтений между основной БД и репликами (см. crm.replicas).
+
+    Клиент, выполнивший запись, получает cookie закрепления на CRM_REPLICA_PIN_SECONDS: пока она
+    действует, его чтения идут на основную БД и он видит свои изменения. Должен стоять раньше
+    SessionMiddleware и AuditMiddleware, чтобы учитывать их записи в конце запроса.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """Инициализирует middleware."""
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        """Обрабатывает запрос в синхронном режиме."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(request) as state:
+            response = self.get_response(request)
+        return finish_response(response, state)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Обрабатывает запрос в асинхронном режиме."""
+        with routing(request) as state:
+            response = await self.get_response(request)
+        return finish_response(response, state)
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-17 05:53
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+def populate_campaign_stats(apps, schema_editor):
+    Campaign = apps.get_model("crm", "Campaign")
+    CampaignStats = apps.get_model("crm", "CampaignStats")
+    Client = apps.get_model("crm", "Client")
+    Lead = apps.get_model("crm", "Lead")
+
+    stats = {
+        pk: CampaignStats(campaign_id=pk, budget=budget) for pk, budget in Campaign.objects.values_list("pk", "budget")
+    }
+    for row in Lead.objects.values("campaign_id").annotate(n=Count("pk")).order_by():
+        stats[row["campaign_id"]].lead_count = row["n"]
+    for row in (
+        Client.objects.values("lead__campaign_id").annotate(n=Count("pk"), revenue=Sum("contract__amount")).order_by()
+    ):
+        stats[row["lead__campaign_id"]].client_count = row["n"]
+        stats[row["lead__campaign_id"]].revenue = row["revenue"] or Decimal("0")
+    CampaignStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CampaignStats",
+            fields=[
+                (
+                    "campaign",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="crm.campaign",
+                    ),
+                ),
+                ("lead_count", models.PositiveIntegerField(default=0)),
+                ("client_count", models.PositiveIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=Decimal("0"), max_digits=14)),
+                ("budget", models.DecimalField(decimal_places=2, default=Decimal("0"), max_digits=10)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Campaign Stats",
+                "verbose_name_plural": "Campaign Stats",
+            },
+        ),
+        migrations.RunPython(populate_campaign_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-17 05:55
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+def populate_daily_stats(apps, schema_editor):
+    CampaignDailyStats = apps.get_model("crm", "CampaignDailyStats")
+    Client = apps.get_model("crm", "Client")
+    Lead = apps.get_model("crm", "Lead")
+
+    rows = {}
+    for row in Lead.objects.annotate(day=TruncDate("created_at")).values("campaign_id", "day").annotate(n=Count("pk")):
+        key = (row["campaign_id"], row["day"])
+        rows[key] = CampaignDailyStats(campaign_id=key[0], date=key[1], lead_count=row["n"])
+    client_rows = (
+        Client.objects.annotate(day=TruncDate("created_at"))
+        .values("lead__campaign_id", "day")
+        .annotate(n=Count("pk"), revenue=Sum("contract__amount"))
+    )
+    for row in client_rows:
+        key = (row["lead__campaign_id"], row["day"])
+        stats = rows.setdefault(key, CampaignDailyStats(campaign_id=key[0], date=key[1]))
+        stats.conversion_count = row["n"]
+        stats.revenue = row["revenue"] or Decimal("0")
+    CampaignDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0002_campaignstats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CampaignDailyStats",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField()),
+                ("lead_count", models.IntegerField(default=0)),
+                ("conversion_count", models.IntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=Decimal("0"), max_digits=14)),
+                (
+                    "campaign",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="daily_stats", to="crm.campaign"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Campaign Daily Stats",
+                "verbose_name_plural": "Campaign Daily Stats",
+                "indexes": [models.Index(fields=["date", "campaign"], name="crm_dailystats_date_idx")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("campaign", "date"), name="crm_campaigndailystats_campaign_date_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+INDEXES = [
+    ("campaign", models.Index(fields=["created_at", "id"], name="crm_campaign_created_id_idx")),
+    ("client", models.Index(fields=["created_at", "id"], name="crm_client_created_id_idx")),
+    ("contract", models.Index(fields=["created_at", "id"], name="crm_contract_created_id_idx")),
+    ("lead", models.Index(fields=["created_at", "id"], name="crm_lead_created_id_idx")),
+    ("service", models.Index(fields=["name", "id"], name="crm_service_name_id_idx")),
+]
+
+
+def concurrently(schema_editor):
+    # На PostgreSQL индексы строятся без блокировки записи в таблицу
+    return {"concurrently": True} if schema_editor.connection.vendor == "postgresql" else {}
+
+
+def add_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        schema_editor.add_index(apps.get_model("crm", model_name), index, **concurrently(schema_editor))
+
+
+def remove_indexes(apps, schema_editor):
+    for model_name, index in reversed(INDEXES):
+        schema_editor.remove_index(apps.get_model("crm", model_name), index, **concurrently(schema_editor))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("crm", "0003_campaigndailystats"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_indexes, remove_indexes)],
+            state_operations=[migrations.AddIndex(model_name=name, index=index) for name, index in INDEXES],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:02
+
+from django.db import migrations
+
+# Индекс по выражению, а не по генерируемому столбцу: ADD COLUMN ... STORED переписал бы всю таблицу
+# под ACCESS EXCLUSIVE. Выражение должно совпадать с crm.search.SEARCH_VECTOR, иначе индекс не используется.
+SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(full_name, '') || ' ' || coalesce(email, '') || ' ' || coalesce(phone, ''))"
+)
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS crm_lead_search_vector_gin ON crm_lead USING gin (({SEARCH_VECTOR}))",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS crm_lead_full_name_trgm ON crm_lead USING gin (UPPER(full_name::text) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS crm_lead_phone_trgm ON crm_lead USING gin (UPPER(phone::text) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS crm_lead_email_trgm ON crm_lead USING gin (UPPER(email::text) gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX CONCURRENTLY IF EXISTS crm_lead_email_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS crm_lead_phone_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS crm_lead_full_name_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS crm_lead_search_vector_gin",
+]
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("crm", "0004_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
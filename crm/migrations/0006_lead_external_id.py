@@ -0,0 +1,16 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:10
+
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0005_lead_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="external_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
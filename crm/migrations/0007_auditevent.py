@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0006_lead_external_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "Создание"),
+                            ("update", "Изменение"),
+                            ("delete", "Удаление"),
+                            ("convert", "Конвертация"),
+                            ("import", "Импорт"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("entity_type", models.CharField(max_length=32)),
+                ("entity_id", models.BigIntegerField(blank=True, null=True)),
+                ("details", models.JSONField(blank=True, default=dict)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="audit_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Audit Event",
+                "verbose_name_plural": "Audit Events",
+                "indexes": [
+                    models.Index(fields=["entity_type", "entity_id", "created_at"], name="crm_audit_entity_idx"),
+                    models.Index(fields=["actor", "created_at"], name="crm_audit_actor_idx"),
+                    models.Index(fields=["created_at"], name="crm_audit_created_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+INDEXES = [
+    ("lead", models.Index(fields=["campaign", "created_at", "id"], name="crm_lead_campaign_created_idx")),
+    (
+        "lead",
+        models.Index(
+            fields=["created_at", "id"], condition=models.Q(is_converted=False), name="crm_lead_unconverted_idx"
+        ),
+    ),
+]
+
+
+def concurrently(schema_editor):
+    # На PostgreSQL индексы строятся без блокировки записи в таблицу
+    return {"concurrently": True} if schema_editor.connection.vendor == "postgresql" else {}
+
+
+def add_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        schema_editor.add_index(apps.get_model("crm", model_name), index, **concurrently(schema_editor))
+
+
+def remove_indexes(apps, schema_editor):
+    for model_name, index in reversed(INDEXES):
+        schema_editor.remove_index(apps.get_model("crm", model_name), index, **concurrently(schema_editor))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ("crm", "0007_auditevent"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_indexes, remove_indexes)],
+            state_operations=[migrations.AddIndex(model_name=name, index=index) for name, index in INDEXES],
+        ),
+    ]
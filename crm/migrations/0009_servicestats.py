@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:24
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+def populate_service_stats(apps, schema_editor):
+    Campaign = apps.get_model("crm", "Campaign")
+    Client = apps.get_model("crm", "Client")
+    Lead = apps.get_model("crm", "Lead")
+    Service = apps.get_model("crm", "Service")
+    ServiceStats = apps.get_model("crm", "ServiceStats")
+
+    stats = {pk: ServiceStats(service_id=pk) for pk in Service.objects.values_list("pk", flat=True)}
+    for row in Campaign.objects.values("service_id").annotate(n=Count("pk")).order_by():
+        stats[row["service_id"]].campaign_count = row["n"]
+    for row in Lead.objects.values("campaign__service_id").annotate(n=Count("pk")).order_by():
+        stats[row["campaign__service_id"]].lead_count = row["n"]
+    for row in (
+        Client.objects.values("lead__campaign__service_id")
+        .annotate(n=Count("pk"), revenue=Sum("contract__amount"))
+        .order_by()
+    ):
+        stats[row["lead__campaign__service_id"]].client_count = row["n"]
+        stats[row["lead__campaign__service_id"]].revenue = row["revenue"] or Decimal("0")
+    ServiceStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0008_lead_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ServiceStats",
+            fields=[
+                (
+                    "service",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="crm.service",
+                    ),
+                ),
+                ("campaign_count", models.PositiveIntegerField(default=0)),
+                ("lead_count", models.PositiveIntegerField(default=0)),
+                ("client_count", models.PositiveIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=Decimal("0"), max_digits=14)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Service Stats",
+                "verbose_name_plural": "Service Stats",
+            },
+        ),
+        migrations.RunPython(populate_service_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# На PostgreSQL архив секционирован по месяцам created_at; первичный ключ секционированной таблицы
+# обязан включать ключ секционирования. Секции месяцев создает crm.archive.ensure_partitions.
+POSTGRESQL_CREATE_SQL = [
+    """
+    CREATE TABLE crm_leadarchive (
+        id bigint NOT NULL,
+        full_name varchar(255) NOT NULL,
+        phone varchar(20) NOT NULL,
+        email varchar(254) NOT NULL,
+        campaign_id bigint NOT NULL REFERENCES crm_campaign (id) DEFERRABLE INITIALLY DEFERRED,
+        external_id varchar(100) NULL,
+        created_at timestamp with time zone NOT NULL,
+        updated_at timestamp with time zone NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE INDEX crm_leadarchive_campaign_idx ON crm_leadarchive (campaign_id, created_at, id)",
+]
+
+
+def create_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for statement in POSTGRESQL_CREATE_SQL:
+            schema_editor.execute(statement)
+    else:
+        schema_editor.create_model(apps.get_model("crm", "LeadArchive"))
+
+
+def drop_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP TABLE crm_leadarchive")
+    else:
+        schema_editor.delete_model(apps.get_model("crm", "LeadArchive"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0009_servicestats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="auditevent",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("create", "Создание"),
+                    ("update", "Изменение"),
+                    ("delete", "Удаление"),
+                    ("convert", "Конвертация"),
+                    ("import", "Импорт"),
+                    ("archive", "Архивирование"),
+                ],
+                max_length=16,
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="LeadArchive",
+                    fields=[
+                        ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                        ("full_name", models.CharField(max_length=255)),
+                        ("phone", models.CharField(max_length=20)),
+                        ("email", models.EmailField(max_length=254)),
+                        ("external_id", models.CharField(blank=True, max_length=100, null=True)),
+                        ("created_at", models.DateTimeField()),
+                        ("updated_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField()),
+                        (
+                            "campaign",
+                            models.ForeignKey(
+                                db_index=False,
+                                on_delete=django.db.models.deletion.PROTECT,
+                                related_name="archived_leads",
+                                to="crm.campaign",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "verbose_name": "Archived Lead",
+                        "verbose_name_plural": "Archived Leads",
+                        "indexes": [
+                            models.Index(fields=["campaign", "created_at", "id"], name="crm_leadarchive_campaign_idx")
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
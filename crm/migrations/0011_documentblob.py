@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:12
+
+import crm.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+def populate_document_blobs(apps, schema_editor):
+    Contract = apps.get_model("crm", "Contract")
+    DocumentBlob = apps.get_model("crm", "DocumentBlob")
+    storage = Contract._meta.get_field("document").storage
+
+    blobs = []
+    for row in Contract.objects.exclude(document="").values("document").annotate(n=Count("pk")).order_by():
+        size = storage.size(row["document"]) if storage.exists(row["document"]) else 0
+        blobs.append(DocumentBlob(name=row["document"], size=size, ref_count=row["n"]))
+    DocumentBlob.objects.bulk_create(blobs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0010_leadarchive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentBlob",
+            fields=[
+                ("name", models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Document Blob",
+                "verbose_name_plural": "Document Blobs",
+            },
+        ),
+        migrations.AlterField(
+            model_name="contract",
+            name="document",
+            field=models.FileField(storage=crm.storage.document_storage, upload_to="contracts/"),
+        ),
+        migrations.RunPython(populate_document_blobs, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,21 @@
-from .services import Service
+from .audit import AuditEvent
+from .campaign_stats import CampaignDailyStats, CampaignStats, ServiceStats
 from .campaigns import Campaign
-from .leads import Lead
-from .contracts import Contract
 from .clients import Client
+from .contracts import Contract, DocumentBlob
+from .leads import Lead, LeadArchive
+from .services import Service
 
-__all__ = ['Service', 'Campaign', 'Lead', 'Contract', 'Client']
\ No newline at end of file
+__all__ = [
+    "Service",
+    "Campaign",
+    "Lead",
+    "LeadArchive",
+    "Contract",
+    "DocumentBlob",
+    "Client",
+    "CampaignStats",
+    "CampaignDailyStats",
+    "ServiceStats",
+    "AuditEvent",
+]
@@ -0,0 +1,70 @@
+"""
+Модуль models для журнала аудита действий пользователей CRM.
+
+Содержит модель AuditEvent — неизменяемую запись о том, кто и когда создал, изменил,
+конвертировал, удалил или перенес в архив объект CRM. Записи только добавляются (пачками, см. crm.audit)
+и удаляются целиком по сроку хранения командой prune_audit.
+"""
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from typing import ClassVar
+
+class AuditEvent(models.Model):
+    """
+    Событие журнала аудита.
+
+    Атрибуты:
+        created_at (DateTime): Время действия
+        actor (User): Пользователь, выполнивший действие (None — система: прием лидов, команды)
+        action (str): Действие
+        entity_type (str): Имя модели объекта (lead, client, contract, ...)
+        entity_id (int): id объекта (None для действий над набором, например импорта)
+        details (dict): Параметры действия (измененные поля, договор конвертации, итоги импорта)
+    """
+
+    class Action(models.TextChoices):
+        """Действия, записываемые в журнал."""
+
+        CREATE = "create", "Создание"
+        UPDATE = "update", "Изменение"
+        DELETE = "delete", "Удаление"
+        CONVERT = "convert", "Конвертация"
+        IMPORT = "import", "Импорт"
+        ARCHIVE = "archive", "Архивирование"
+
+    created_at: models.DateTimeField = models.DateTimeField(default=timezone.now)
+    # Без ограничения внешнего ключа: удаление пользователя не должно менять или удалять историю.
+    # Отдельный индекс по actor не нужен — его заменяет составной индекс (actor, created_at).
+    actor: models.ForeignKey = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="audit_events",
+    )
+    action: str = models.CharField(max_length=16, choices=Action.choices)
+    entity_type: str = models.CharField(max_length=32)
+    entity_id: models.BigIntegerField = models.BigIntegerField(null=True, blank=True)
+    details: models.JSONField = models.JSONField(default=dict, blank=True)
+
+    def __str__(self) -> str:
+        """Строковое представление события."""
+        return f"{self.action} {self.entity_type}#{self.entity_id}"
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Audit Event"
+        verbose_name_plural: ClassVar[str] = "Audit Events"
+        indexes: ClassVar[list] = [
+            # История объекта: WHERE entity_type = ? AND entity_id = ? ORDER BY created_at
+            models.Index(fields=["entity_type", "entity_id", "created_at"], name="crm_audit_entity_idx"),
+            # Действия пользователя за период, при необходимости с фильтром по типу объекта
+            models.Index(fields=["actor", "created_at"], name="crm_audit_actor_idx"),
+            # Удаление по сроку хранения
+            models.Index(fields=["created_at"], name="crm_audit_created_idx"),
+        ]
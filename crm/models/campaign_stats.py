@@ -0,0 +1,128 @@
+"""
+Модуль models для хранения агрегированной статистики кампаний.
+
+Содержит модель CampaignStats — предрассчитанную сводку по каждой кампании, модель
+CampaignDailyStats с дневными срезами и модель ServiceStats — сводку по кампаниям услуги.
+Все они обновляются инкрементально при изменении кампаний, лидов, клиентов и договоров.
+"""
+
+from .campaigns import Campaign
+from .services import Service
+from decimal import Decimal
+from django.db import models
+from typing import ClassVar
+
+class CampaignStats(models.Model):
+    """
+    Сводная статистика маркетинговой кампании.
+
+    Атрибуты:
+        campaign (Campaign): Кампания, к которой относится сводка
+        lead_count (int): Количество лидов кампании
+        client_count (int): Количество лидов, конвертированных в клиентов
+        revenue (Decimal): Сумма договоров клиентов кампании
+        budget (Decimal): Бюджет кампании (копия для чтения без соединений)
+        updated_at (DateTime): Дата последнего пересчета
+    """
+
+    campaign: models.OneToOneField = models.OneToOneField(
+        Campaign, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    lead_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    client_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    revenue: models.DecimalField = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    budget: models.DecimalField = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0"))
+    updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        """Строковое представление сводки."""
+        return f"Stats for campaign #{self.campaign_id}"
+
+    @property
+    def roi(self) -> Decimal:
+        """Возвращает отдачу кампании: выручка за вычетом бюджета."""
+        return Decimal(self.revenue) - Decimal(self.budget)
+
+    @property
+    def conversion_rate(self) -> float:
+        """Возвращает процент конверсии лидов в клиентов с точностью до 0.1."""
+        if not self.lead_count:
+            return 0.0
+        return round(self.client_count * 100.0 / self.lead_count, 1)
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Campaign Stats"
+        verbose_name_plural: ClassVar[str] = "Campaign Stats"
+
+
+class CampaignDailyStats(models.Model):
+    """
+    Дневной срез статистики маркетинговой кампании.
+
+    Лиды учитываются по дате создания лида, конверсии и выручка — по дате создания клиента.
+    Недельные и месячные срезы строятся группировкой дневных строк.
+
+    Атрибуты:
+        campaign (Campaign): Кампания
+        date (Date): День среза
+        lead_count (int): Количество новых лидов за день
+        conversion_count (int): Количество конверсий за день
+        revenue (Decimal): Сумма договоров клиентов, появившихся за день
+    """
+
+    campaign: models.ForeignKey = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="daily_stats")
+    date: models.DateField = models.DateField()
+    lead_count: models.IntegerField = models.IntegerField(default=0)
+    conversion_count: models.IntegerField = models.IntegerField(default=0)
+    revenue: models.DecimalField = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    def __str__(self) -> str:
+        """Строковое представление дневного среза."""
+        return f"Stats for campaign #{self.campaign_id} on {self.date}"
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Campaign Daily Stats"
+        verbose_name_plural: ClassVar[str] = "Campaign Daily Stats"
+        constraints: ClassVar[list] = [
+            models.UniqueConstraint(fields=["campaign", "date"], name="crm_campaigndailystats_campaign_date_uniq"),
+        ]
+        indexes: ClassVar[list] = [
+            models.Index(fields=["date", "campaign"], name="crm_dailystats_date_idx"),
+        ]
+
+
+class ServiceStats(models.Model):
+    """
+    Сводная статистика услуги по всем ее кампаниям.
+
+    Атрибуты:
+        service (Service): Услуга, к которой относится сводка
+        campaign_count (int): Количество кампаний услуги
+        lead_count (int): Количество лидов кампаний услуги
+        client_count (int): Количество лидов, конвертированных в клиентов
+        revenue (Decimal): Сумма договоров клиентов кампаний услуги
+        updated_at (DateTime): Дата последнего обновления
+    """
+
+    service: models.OneToOneField = models.OneToOneField(
+        Service, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    campaign_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    lead_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    client_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    revenue: models.DecimalField = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        """Строковое представление сводки."""
+        return f"Stats for service #{self.service_id}"
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Service Stats"
+        verbose_name_plural: ClassVar[str] = "Service Stats"
@@ -38,3 +38,6 @@ class Campaign(models.Model):
 
         verbose_name: ClassVar[str] = "Campaign"
         verbose_name_plural: ClassVar[str] = "Campaigns"
+        indexes: ClassVar[list] = [
+            models.Index(fields=["created_at", "id"], name="crm_campaign_created_id_idx"),
+        ]
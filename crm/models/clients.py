@@ -34,3 +34,6 @@ class Client(models.Model):
 
         verbose_name: ClassVar[str] = "Active Client"
         verbose_name_plural: ClassVar[str] = "Active Clients"
+        indexes: ClassVar[list] = [
+            models.Index(fields=["created_at", "id"], name="crm_client_created_id_idx"),
+        ]
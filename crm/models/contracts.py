@@ -1,10 +1,12 @@
 """
 Модуль models для работы с договорами.
 
-Содержит модель Contract для хранения информации о договорах с клиентами.
+Содержит модель Contract для хранения информации о договорах с клиентами
+и модель DocumentBlob для учета ссылок на файлы документов.
 """
 
 from .services import Service
+from crm.storage import document_storage
 from django.db import models
 from typing import ClassVar
 
@@ -25,7 +27,7 @@ class Contract(models.Model):
 
     name: str = models.CharField(max_length=255)
     service: models.ForeignKey = models.ForeignKey(Service, on_delete=models.PROTECT)
-    document: models.FileField = models.FileField(upload_to="contracts/")
+    document: models.FileField = models.FileField(upload_to="contracts/", storage=document_storage)
     start_date: models.DateField = models.DateField()
     end_date: models.DateField = models.DateField()
     amount: models.DecimalField = models.DecimalField(max_digits=10, decimal_places=2)
@@ -41,3 +43,35 @@ class Contract(models.Model):
 
         verbose_name: ClassVar[str] = "Contract"
         verbose_name_plural: ClassVar[str] = "Contracts"
+        indexes: ClassVar[list] = [
+            models.Index(fields=["created_at", "id"], name="crm_contract_created_id_idx"),
+        ]
+
+
+class DocumentBlob(models.Model):
+    """
+    Файл хранилища документов договоров (crm.storage) и число ссылающихся на него договоров.
+
+    Атрибуты:
+        name (str): Имя файла в хранилище (значение Contract.document)
+        size (int): Размер файла, байт
+        ref_count (int): Количество договоров с этим документом
+        created_at (DateTime): Дата первой ссылки
+        updated_at (DateTime): Дата последнего изменения счетчика
+    """
+
+    name: str = models.CharField(max_length=100, primary_key=True)
+    size: models.PositiveBigIntegerField = models.PositiveBigIntegerField(default=0)
+    ref_count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        """Строковое представление файла."""
+        return f"{self.name} ({self.ref_count})"
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Document Blob"
+        verbose_name_plural: ClassVar[str] = "Document Blobs"
@@ -1,7 +1,8 @@
 """
 Модуль models для работы с потенциальными клиентами (лидами).
 
-Содержит модель Lead для хранения информации о потенциальных клиентах.
+Содержит модель Lead для хранения информации о потенциальных клиентах
+и модель LeadArchive для давних неконвертированных лидов, перенесенных из Lead (см. crm.archive).
 """
 
 from .campaigns import Campaign
@@ -18,6 +19,7 @@ class Lead(models.Model):
         email (str): Email
         campaign (Campaign): Связанная кампания
         is_converted (bool): Флаг конвертации в клиента
+        external_id (str): Идентификатор лида в рекламной системе (ключ идемпотентности приема)
         created_at (DateTime): Дата создания
         updated_at (DateTime): Дата обновления
     """
@@ -29,6 +31,7 @@ class Lead(models.Model):
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
     updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
     is_converted: bool = models.BooleanField(default=False)
+    external_id: str = models.CharField(max_length=100, unique=True, null=True, blank=True)
 
     def __str__(self) -> str:
         """Строковое представление лида."""
@@ -39,3 +42,65 @@ class Lead(models.Model):
 
         verbose_name: ClassVar[str] = "Potential Client"
         verbose_name_plural: ClassVar[str] = "Potential Clients"
+        indexes: ClassVar[list] = [
+            models.Index(fields=["created_at", "id"], name="crm_lead_created_id_idx"),
+            # Выгрузка и статистика кампании: WHERE campaign_id = ? [AND created_at ...] ORDER BY created_at, id
+            models.Index(fields=["campaign", "created_at", "id"], name="crm_lead_campaign_created_idx"),
+            # Давние неконвертированные лиды для архивирования (crm.archive):
+            # WHERE NOT is_converted AND created_at < ? ORDER BY created_at, id;
+            # частичный индекс не растет с конвертированными лидами
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_converted=False),
+                name="crm_lead_unconverted_idx",
+            ),
+        ]
+
+
+class LeadArchive(models.Model):
+    """
+    Архивная копия давнего неконвертированного лида.
+
+    Лиды переносятся сюда командой archive_leads с сохранением id и дат, чтобы рабочая таблица
+    лидов оставалась небольшой. На PostgreSQL таблица секционирована по месяцам created_at
+    (первичный ключ — (id, created_at)), поэтому запросы с условием на дату читают только
+    нужные секции, а старые месяцы выгружаются в файл и удаляются целиком.
+
+    Атрибуты:
+        id (int): id лида в рабочей таблице
+        full_name (str): Полное имя
+        phone (str): Телефон
+        email (str): Email
+        campaign (Campaign): Связанная кампания
+        external_id (str): Идентификатор лида в рекламной системе
+        created_at (DateTime): Дата создания лида (ключ секционирования)
+        updated_at (DateTime): Дата последнего обновления лида
+        archived_at (DateTime): Дата переноса в архив
+    """
+
+    id: models.BigIntegerField = models.BigIntegerField(primary_key=True)
+    full_name: str = models.CharField(max_length=255)
+    phone: str = models.CharField(max_length=20)
+    email: models.EmailField = models.EmailField()
+    # Индекс внешнего ключа заменяет составной индекс (campaign, created_at)
+    campaign: models.ForeignKey = models.ForeignKey(
+        Campaign, on_delete=models.PROTECT, db_index=False, related_name="archived_leads"
+    )
+    external_id: str = models.CharField(max_length=100, null=True, blank=True)
+    created_at: models.DateTimeField = models.DateTimeField()
+    updated_at: models.DateTimeField = models.DateTimeField()
+    archived_at: models.DateTimeField = models.DateTimeField()
+
+    def __str__(self) -> str:
+        """Строковое представление архивного лида."""
+        return f"Archived lead {self.full_name}"
+
+    class Meta:
+        """Мета-класс для дополнительных настроек модели."""
+
+        verbose_name: ClassVar[str] = "Archived Lead"
+        verbose_name_plural: ClassVar[str] = "Archived Leads"
+        indexes: ClassVar[list] = [
+            # Статистика и выгрузка кампании: WHERE campaign_id = ? [AND created_at ...] ORDER BY created_at, id
+            models.Index(fields=["campaign", "created_at", "id"], name="crm_leadarchive_campaign_idx"),
+        ]
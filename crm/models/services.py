@@ -34,3 +34,6 @@ class Service(models.Model):
 
         verbose_name: ClassVar[str] = "Service"
         verbose_name_plural: ClassVar[str] = "Services"
+        indexes: ClassVar[list] = [
+            models.Index(fields=["name", "id"], name="crm_service_name_id_idx"),
+        ]
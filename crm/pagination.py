@@ -0,0 +1,195 @@
+"""
+Курсорная (keyset) пагинация для списков CRM.
+
+Вместо OFFSET страница выбирается условием по ключу упорядочивания последней показанной строки,
+например (created_at, id) < (последняя дата, последний id). При наличии составного индекса
+по полям ключа стоимость любой, даже очень далекой, страницы равна стоимости первой.
+"""
+
+import base64
+import binascii
+from crm.cache import cached_result
+import datetime
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q, QuerySet
+from django.http import Http404
+import json
+from typing import Any, ClassVar, List, Optional, Sequence, Tuple, Type
+
+CURSOR_PARAM = "cursor"
+
+
+class KeysetPage:
+    """
+    Страница результатов курсорной пагинации.
+
+    Атрибуты:
+        object_list (list): Объекты страницы
+        has_next (bool): Есть ли следующая страница
+        has_previous (bool): Есть ли предыдущая страница
+        next_cursor (str | None): Курсор следующей страницы
+        previous_cursor (str | None): Курсор предыдущей страницы
+    """
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        has_next: bool,
+        has_previous: bool,
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+    ) -> None:
+        """Инициализирует страницу."""
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_other_pages(self) -> bool:
+        """Проверяет, есть ли другие страницы (совместимо с django.core.paginator.Page)."""
+        return self.has_next or self.has_previous
+
+    def __iter__(self) -> Any:
+        """Итерирует объекты страницы."""
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        """Возвращает количество объектов на странице."""
+        return len(self.object_list)
+
+
+def _field_name(field: str) -> str:
+    """Возвращает имя поля без признака сортировки по убыванию."""
+    return field.lstrip("-")
+
+
+def _flip(field: str) -> str:
+    """Меняет направление сортировки поля на противоположное."""
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def encode_cursor(obj: models.Model, fields: Sequence[str], direction: str) -> str:
+    """Кодирует значения ключа объекта и направление перехода в курсор."""
+    values = [getattr(obj, _field_name(field)) for field in fields]
+    # DjangoJSONEncoder округляет время до миллисекунд: строки с той же миллисекундой пропускались бы
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    payload = {"d": direction, "v": values}
+    raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, model: Type[models.Model], fields: Sequence[str]) -> Tuple[str, List[Any]]:
+    """
+    Декодирует курсор в направление и типизированные значения ключа.
+
+    Исключения:
+        ValueError: Если курсор поврежден или не соответствует полям ключа
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        direction, raw_values = payload["d"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValueError("Malformed cursor") from e
+    if direction not in ("n", "p") or not isinstance(raw_values, list) or len(raw_values) != len(fields):
+        raise ValueError("Malformed cursor")
+    try:
+        values = [
+            model._meta.get_field(_field_name(field)).to_python(value)
+            for field, value in zip(fields, raw_values, strict=True)
+        ]
+    except Exception as e:
+        raise ValueError("Malformed cursor") from e
+    return direction, values
+
+
+def keyset_filter(fields: Sequence[str], values: Sequence[Any], forward: bool) -> Q:
+    """
+    Строит условие «строго после ключа» для лексикографического порядка полей.
+
+    Для ("-created_at", "-id") и движения вперед это
+    created_at <= v0 AND (created_at < v0 OR (created_at = v0 AND id < v1)).
+    Нестрогая граница по первому полю стоит отдельно от OR: по ней PostgreSQL начинает поиск
+    по индексу (created_at, id) с позиции курсора, а не просматривает индекс с начала.
+    """
+    condition = Q()
+    for index, field in enumerate(fields):
+        lookup = "lt" if field.startswith("-") == forward else "gt"
+        branch = Q(**{f"{_field_name(field)}__{lookup}": values[index]})
+        for previous_field, previous_value in zip(fields[:index], values[:index], strict=True):
+            branch &= Q(**{_field_name(previous_field): previous_value})
+        condition |= branch
+    leading = "lte" if fields[0].startswith("-") == forward else "gte"
+    return Q(**{f"{_field_name(fields[0])}__{leading}": values[0]}) & condition
+
+
+def paginate_keyset(queryset: QuerySet, fields: Sequence[str], page_size: int, cursor: Optional[str]) -> KeysetPage:
+    """
+    Возвращает страницу queryset, следующую за курсором (или первую страницу).
+
+    Выбирается page_size + 1 строка, чтобы без COUNT определить наличие следующей страницы.
+
+    Исключения:
+        ValueError: Если курсор поврежден
+    """
+    direction, values = decode_cursor(cursor, queryset.model, fields) if cursor else ("n", [])
+    forward = direction == "n"
+
+    ordering = list(fields) if forward else [_flip(field) for field in fields]
+    page_queryset = queryset.order_by(*ordering)
+    if values:
+        page_queryset = page_queryset.filter(keyset_filter(fields, values, forward))
+
+    rows = list(page_queryset[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    has_next = has_more if forward else bool(values)
+    has_previous = bool(values) if forward else has_more
+    return KeysetPage(
+        rows,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=encode_cursor(rows[-1], fields, "n") if has_next and rows else None,
+        previous_cursor=encode_cursor(rows[0], fields, "p") if has_previous and rows else None,
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    Примесь для ListView, заменяющая OFFSET-пагинацию курсорной.
+
+    В контекст шаблона попадает page_obj (KeysetPage) с next_cursor и previous_cursor,
+    курсор передается GET-параметром "cursor" (см. шаблон crm/_keyset_pagination.html).
+    Если задан page_cache_name, страницы кэшируются в версионируемом кэше (crm.cache)
+    с зависимостью от моделей page_cache_depends_on.
+    """
+
+    paginate_by: int = 50
+    keyset_fields: ClassVar[Tuple[str, ...]] = ("-created_at", "-id")
+    page_cache_name: ClassVar[Optional[str]] = None
+    page_cache_depends_on: ClassVar[Tuple[Type[models.Model], ...]] = ()
+
+    def paginate_queryset(self, queryset: QuerySet, page_size: int) -> Tuple[None, KeysetPage, List[Any], bool]:
+        """Возвращает кортеж в формате MultipleObjectMixin.paginate_queryset для курсорной страницы."""
+        cursor = self.request.GET.get(CURSOR_PARAM) or None  # type: ignore[attr-defined]
+
+        def build() -> KeysetPage:
+            return paginate_keyset(queryset, self.keyset_fields, page_size, cursor)
+
+        try:
+            if self.page_cache_name:
+                page = cached_result(
+                    self.page_cache_name,
+                    self.page_cache_depends_on,
+                    build,
+                    params=(str(queryset.query), cursor, page_size),
+                )
+            else:
+                page = build()
+        except ValueError as e:
+            raise Http404("Некорректный курсор страницы.") from e
+        return None, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,137 @@
+"""
+Декларативная политика доступа по ролям пользователей.
+
+POLICY сопоставляет каждому действию ("lead.add", "contract.export", ...) роли User.Role, которым оно разрешено.
+Наборы разрешенных действий для каждой роли строятся один раз при импорте модуля (ROLE_ACTIONS),
+а для запроса вычисляются не больше одного раза и кэшируются на объекте запроса, поэтому проверка
+права в представлении — поиск в frozenset без повторных обращений к пользователю.
+
+Правила видимости строк (ROW_RULES) задаются условием Q для пары (роль, модель) и применяются
+к queryset списков, карточек, поиска, выгрузок и массовых действий на уровне SQL. Например,
+чтобы операторы видели только своих лидов, достаточно добавить правило
+``(User.Role.OPERATOR, "lead"): lambda user: Q(owner=user)``. Для моделей без правил queryset не меняется.
+"""
+
+from accounts.models import User
+from django.contrib import messages
+from django.db.models import Model, Q, QuerySet
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.urls import reverse
+from services.logging_utils import log_warning
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple, Type
+
+ADMIN, OPERATOR, MARKETER, MANAGER = User.Role.ADMIN, User.Role.OPERATOR, User.Role.MARKETER, User.Role.MANAGER
+
+POLICY: Dict[str, FrozenSet[str]] = {
+    "service.add": frozenset({MARKETER, ADMIN}),
+    "service.change": frozenset({MARKETER, ADMIN}),
+    "service.delete": frozenset({MARKETER, ADMIN}),
+    "campaign.add": frozenset({MARKETER, ADMIN}),
+    "campaign.change": frozenset({MARKETER, ADMIN}),
+    "campaign.delete": frozenset({MARKETER, ADMIN}),
+    "lead.add": frozenset({OPERATOR, ADMIN}),
+    "lead.import": frozenset({OPERATOR, ADMIN}),
+    "lead.change": frozenset({OPERATOR, ADMIN}),
+    "lead.delete": frozenset({OPERATOR, ADMIN}),
+    "lead.convert": frozenset({MANAGER, ADMIN}),
+    "lead.export": frozenset({OPERATOR, ADMIN}),
+    "contract.add": frozenset({MANAGER, ADMIN}),
+    "contract.change": frozenset({MANAGER, ADMIN}),
+    "contract.delete": frozenset({MANAGER, ADMIN}),
+    "contract.export": frozenset({MANAGER, ADMIN}),
+    "contract.download": frozenset({MANAGER, ADMIN}),
+    "client.change": frozenset({MANAGER, ADMIN}),
+    "client.delete": frozenset({MANAGER, ADMIN}),
+    "client.export": frozenset({MANAGER, ADMIN}),
+    "profile.record": frozenset({ADMIN}),
+    "profile.view": frozenset({ADMIN}),
+    "metrics.view": frozenset({ADMIN}),
+}
+
+ROLE_ACTIONS: Dict[str, FrozenSet[str]] = {
+    role: frozenset(action for action, roles in POLICY.items() if role in roles) for role in User.Role.values
+}
+
+# (роль, имя модели) -> функция пользователя, возвращающая условие видимых строк
+ROW_RULES: Dict[Tuple[str, str], Callable[[Any], Q]] = {}
+
+_CACHE_ATTR = "_crm_permissions"
+
+
+def allowed_actions(user: Any) -> FrozenSet[str]:
+    """Возвращает действия, разрешенные пользователю (пустой набор для анонимного)."""
+    if not user.is_authenticated:
+        return frozenset()
+    return ROLE_ACTIONS.get(user.role, frozenset())
+
+
+def get_permissions(request: HttpRequest) -> FrozenSet[str]:
+    """Возвращает действия, разрешенные пользователю запроса; вычисляются один раз за запрос."""
+    actions = getattr(request, _CACHE_ATTR, None)
+    if actions is None:
+        user = getattr(request, "user", None)
+        actions = allowed_actions(user) if user is not None else frozenset()
+        setattr(request, _CACHE_ATTR, actions)
+    return actions
+
+
+def has_permission(request: HttpRequest, action: str) -> bool:
+    """
+    Проверяет, разрешено ли действие пользователю запроса.
+
+    Исключения:
+        KeyError: Если действие не описано в POLICY
+    """
+    if action not in POLICY:
+        raise KeyError(f"Действие {action} не описано в политике доступа")
+    return action in get_permissions(request)
+
+
+def row_filter(request: HttpRequest, model: Type[Model]) -> Optional[Q]:
+    """Возвращает условие видимых пользователю строк модели или None, если ограничений нет."""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    rule = ROW_RULES.get((user.role, model._meta.model_name))
+    return rule(user) if rule is not None else None
+
+
+def scope_queryset(request: HttpRequest, queryset: QuerySet) -> QuerySet:
+    """Ограничивает queryset строками, видимыми пользователю запроса."""
+    condition = row_filter(request, queryset.model)
+    return queryset if condition is None else queryset.filter(condition)
+
+
+class RolePermissionMixin:
+    """
+    Пускает в представление только роли, которым политика разрешает действие permission.
+
+    Ставится после LoginRequiredMixin. При отказе пишет предупреждение в журнал, показывает
+    permission_denied_message и перенаправляет на permission_denied_url (по умолчанию — список объектов).
+
+    Атрибуты:
+        permission (str): Действие из POLICY
+        permission_denied_message (str): Сообщение пользователю при отказе
+        permission_denied_url (str): Имя URL для перенаправления при отказе
+    """
+
+    permission: str = ""
+    permission_denied_message: str = "У вас недостаточно прав для этого действия."
+    permission_denied_url: Optional[str] = None
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Проверяет права пользователя перед обработкой запроса."""
+        if not has_permission(request, self.permission):
+            log_warning("Пользователь попытался выполнить %s без прав", self.permission, user=request.user)
+            messages.error(request, self.permission_denied_message)
+            url = self.permission_denied_url or f"{self.permission.split('.')[0]}_list"
+            return HttpResponseRedirect(reverse(url))
+        return super().dispatch(request, *args, **kwargs)  # type: ignore[misc]
+
+
+class ScopedQuerysetMixin:
+    """Ограничивает queryset представления строками, видимыми пользователю (ROW_RULES)."""
+
+    def get_queryset(self) -> QuerySet:
+        """Возвращает queryset с условием видимости строк."""
+        return scope_queryset(self.request, super().get_queryset())  # type: ignore[misc]
@@ -0,0 +1,173 @@
+"""
+Профилирование отдельных запросов по требованию администратора.
+
+Администратор CRM (роль ADMIN) включает профилирование запроса заголовком "X-CRM-Profile: 1"
+или параметром "?_profile=1". Такой запрос выполняется под детерминированным профилировщиком cProfile,
+а его SQL-запросы записываются с временем выполнения и местами вызова в коде проекта
+(см. crm.metrics.trace_queries). Отчет сохраняется в каталог CRM_PROFILE_DIR (JSON и дамп .prof
+для snakeviz/pstats), хранятся последние CRM_PROFILE_KEEP отчетов; id отчета возвращается
+в заголовке ответа X-CRM-Profile-Id, а просмотреть его можно на странице crm/profiles/.
+
+Запросы без признака профилирования проверяются одним поиском по заголовкам и строке запроса,
+профилировщик и журнал SQL для них не включаются.
+"""
+
+import cProfile
+from crm.metrics import trace_queries
+from crm.permissions import has_permission
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import uuid
+
+PROFILE_HEADER = "HTTP_X_CRM_PROFILE"
+PROFILE_PARAM = "_profile"
+REPORT_HEADER = "X-CRM-Profile-Id"
+TOP_FUNCTIONS = 40
+
+_REPORT_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+# Профилировщик перехватывает вызовы всего потока (а начиная с Python 3.12 — всего процесса), и один поток
+# может обслуживать несколько запросов: одновременно профилируется только один запрос, остальные получают
+# только журнал SQL.
+_profiler_lock = threading.Lock()
+
+
+def is_requested(request: HttpRequest) -> bool:
+    """Проверяет, запрошено ли профилирование (без разбора строки запроса, если параметра в ней нет)."""
+    if request.META.get(PROFILE_HEADER):
+        return request.META[PROFILE_HEADER] != "0"
+    return f"{PROFILE_PARAM}=" in request.META.get("QUERY_STRING", "") and request.GET.get(PROFILE_PARAM) != "0"
+
+
+def is_allowed(request: HttpRequest) -> bool:
+    """Проверяет, что политика доступа разрешает пользователю профилирование (по умолчанию — администраторам)."""
+    return has_permission(request, "profile.record")
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса; используется как контекстный менеджер вокруг его обработки.
+
+    Атрибуты:
+        profiler (Profile): Профилировщик или None, если он занят другим запросом
+        queries (list): Журнал SQL-запросов (SQL, время, места вызова)
+        duration (float): Время обработки, секунд
+        asynchronous (bool): Запрос обработан в асинхронном режиме: в профиль попал только код,
+            выполненный в потоке профилировщика (синхронные представления и вызовы sync_to_async)
+    """
+
+    def __init__(self, asynchronous: bool = False) -> None:
+        """Инициализирует пустой профиль."""
+        self.asynchronous = asynchronous
+        self.profiler: Optional[cProfile.Profile] = None
+        self.queries: List[Any] = []
+        self.duration = 0.0
+        self._trace: Any = None
+        self._started = 0.0
+
+    def __enter__(self) -> "RequestProfile":
+        """Включает журнал SQL и профилировщик."""
+        self._trace = trace_queries()
+        self.queries = self._trace.__enter__()
+        if _profiler_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Выключает профилировщик и журнал SQL."""
+        self.duration = time.perf_counter() - self._started
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profiler_lock.release()
+        self._trace.__exit__(*exc_info)
+
+    def functions(self) -> str:
+        """Возвращает таблицу самых затратных функций (по накопленному времени)."""
+        if self.profiler is None:
+            return "Профилировщик был занят другим запросом; доступен только журнал SQL."
+        stream = io.StringIO()
+        if self.asynchronous:
+            stream.write(
+                "Асинхронный режим: профиль охватывает синхронные представления и вызовы sync_to_async; "
+                "код корутин в цикле событий в него не попадает.\n"
+            )
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        return stream.getvalue()
+
+    def save(self, request: HttpRequest, response: HttpResponse) -> str:
+        """
+        Сохраняет отчет в CRM_PROFILE_DIR и удаляет самые старые отчеты сверх CRM_PROFILE_KEEP.
+
+        Возвращает:
+            str: id отчета
+        """
+        now = timezone.now()
+        report_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        match = getattr(request, "resolver_match", None)
+        report = {
+            "id": report_id,
+            "created_at": now.isoformat(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": match.view_name if match else None,
+            "user_id": request.user.pk,
+            "status": response.status_code,
+            "duration_ms": round(self.duration * 1000, 2),
+            "sql_count": len(self.queries),
+            "sql_ms": round(sum(duration for _, duration, _ in self.queries) * 1000, 2),
+            "queries": [
+                {"sql": sql, "ms": round(duration * 1000, 3), "stack": stack} for sql, duration, stack in self.queries
+            ],
+            "functions": self.functions(),
+        }
+        os.makedirs(settings.CRM_PROFILE_DIR, exist_ok=True)
+        with open(_path(report_id, "json"), "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False)
+        if self.profiler is not None:
+            self.profiler.dump_stats(_path(report_id, "prof"))
+        for old in _report_ids()[settings.CRM_PROFILE_KEEP :]:
+            for extension in ("json", "prof"):
+                if os.path.exists(_path(old, extension)):
+                    os.remove(_path(old, extension))
+        return report_id
+
+
+def _path(report_id: str, extension: str) -> str:
+    """Возвращает путь файла отчета."""
+    return os.path.join(settings.CRM_PROFILE_DIR, f"{report_id}.{extension}")
+
+
+def _report_ids() -> List[str]:
+    """Возвращает id сохраненных отчетов, от новых к старым."""
+    if not os.path.isdir(settings.CRM_PROFILE_DIR):
+        return []
+    names = os.listdir(settings.CRM_PROFILE_DIR)
+    return sorted((name[:-5] for name in names if name.endswith(".json") and _REPORT_ID.match(name[:-5])), reverse=True)
+
+
+def load_report(report_id: str) -> Optional[Dict[str, Any]]:
+    """Загружает отчет по id (None, если id некорректен или отчета нет)."""
+    if not _REPORT_ID.match(report_id) or not os.path.exists(_path(report_id, "json")):
+        return None
+    with open(_path(report_id, "json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def list_reports() -> List[Dict[str, Any]]:
+    """Возвращает сводки отчетов (без журнала SQL и профиля), от новых к старым."""
+    reports = []
+    for report_id in _report_ids():
+        report = load_report(report_id)
+        if report is not None:
+            reports.append({key: value for key, value in report.items() if key not in ("queries", "functions")})
+    return reports
@@ -0,0 +1,58 @@
+"""
+Обнаружение N+1: повторяющихся SQL-запросов одной формы в пределах HTTP-запроса.
+
+Middleware crm.middleware.RequestMetricsMiddleware после каждого запроса передает его счетчики SQL
+в check_repeated_queries. Запросы приводятся к отпечатку (crm.slowqueries.fingerprint),
+и отпечатки, выполненные не меньше CRM_QUERY_REPEAT_THRESHOLD раз, считаются признаком N+1 —
+обычно это обращение к связанному объекту в цикле шаблона без select_related/prefetch_related.
+В рабочем режиме находка записывается в журнал предупреждений, при CRM_QUERY_REPEAT_RAISE
+(тесты crm.tests.test_query_budgets и команда check_query_budgets, отладка) выбрасывается RepeatedQueriesError.
+"""
+
+from crm.metrics import QueryStats
+from crm.slowqueries import fingerprint
+from django.conf import settings
+from services.logging_utils import log_warning
+from typing import Dict, List, Tuple
+
+class RepeatedQueriesError(Exception):
+    """Запрос выполнил повторяющиеся SQL-запросы одной формы (N+1)."""
+
+
+def repeated_queries(queries: QueryStats, threshold: int) -> List[Tuple[str, int]]:
+    """
+    Возвращает формы SQL, выполненные не меньше threshold раз.
+
+    Возвращает:
+        list: Пары (форма SQL, количество выполнений) по убыванию количества
+    """
+    if queries.count < threshold:
+        return []
+    counts: Dict[str, int] = {}
+    for sql, count in queries.shapes.items():
+        shape = fingerprint(sql)
+        counts[shape] = counts.get(shape, 0) + count
+    return sorted(((shape, count) for shape, count in counts.items() if count >= threshold), key=lambda x: -x[1])
+
+
+def check_repeated_queries(view: str, queries: QueryStats) -> None:
+    """
+    Проверяет SQL-запросы HTTP-запроса на N+1.
+
+    Исключения:
+        RepeatedQueriesError: Если найдены повторы и включен CRM_QUERY_REPEAT_RAISE
+    """
+    threshold = settings.CRM_QUERY_REPEAT_THRESHOLD
+    if threshold <= 0:
+        return
+    found = repeated_queries(queries, threshold)
+    if not found:
+        return
+    if settings.CRM_QUERY_REPEAT_RAISE:
+        details = "; ".join(f"{count} x {shape}" for shape, count in found)
+        raise RepeatedQueriesError(f"Повторяющиеся SQL-запросы в {view}: {details}")
+    log_warning(
+        "Повторяющиеся SQL-запросы (возможен N+1) в %s",
+        view,
+        queries=[{"sql": shape, "count": count} for shape, count in found],
+    )
@@ -0,0 +1,205 @@
+"""
+Чтение с реплик БД с закреплением пользователя за основной БД после записи.
+
+Реплики — все псевдонимы DATABASES, кроме default (см. DB_REPLICAS в настройках). ReplicaRouter
+отправляет на реплику только чтения представлений с ReplicaReadMixin (списки, карточки, статистика,
+выгрузки) в GET-запросах; все записи и остальные чтения идут в default. Чтение остается на основной БД:
+    - после записи в том же запросе;
+    - в течение CRM_REPLICA_PIN_SECONDS после записи в одном из прошлых запросов клиента
+      (cookie ставит crm.middleware.ReplicaPinMiddleware);
+    - внутри транзакции (атомарного блока) основной БД;
+    - при построении результатов для версионируемого кэша (crm.cache): иначе отстающая реплика
+      могла бы сохранить старые данные под уже новой версией.
+
+Реплика используется, только если ее отставание не больше CRM_REPLICA_PIN_SECONDS (тогда после
+окончания закрепления пользователь гарантированно видит свои записи). Отставание проверяется не чаще
+раза в CRM_REPLICA_CHECK_INTERVAL секунд на процесс; недоступная или отстающая реплика пропускается,
+а если подходящих реплик нет, чтение выполняется на основной БД.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PIN_COOKIE = "crm_primary_pin"
+
+# На реплике PostgreSQL: 0, если все полученные изменения применены, иначе возраст последней примененной транзакции
+POSTGRESQL_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+@dataclasses.dataclass
+class RoutingState:
+    """
+    Состояние маршрутизации запроса.
+
+    Атрибуты:
+        replica_reads (bool): Представление разрешило чтение с реплик
+        pinned (bool): Клиент закреплен за основной БД после недавней записи
+        wrote (bool): В запросе была запись
+        primary_only (int): Глубина вложенных блоков primary()
+    """
+
+    replica_reads: bool = False
+    pinned: bool = False
+    wrote: bool = False
+    primary_only: int = 0
+
+
+_state: contextvars.ContextVar[Optional[RoutingState]] = contextvars.ContextVar("crm_routing_state", default=None)
+_health: Dict[str, Tuple[float, Optional[float]]] = {}
+_health_lock = threading.Lock()
+
+
+def replica_aliases() -> List[str]:
+    """Возвращает псевдонимы реплик."""
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def measure_lag(alias: str) -> Optional[float]:
+    """Возвращает отставание реплики в секундах (None, если реплика недоступна)."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(POSTGRESQL_LAG_SQL)
+                lag = cursor.fetchone()[0]
+                return float(lag) if lag is not None else None
+            # Для остальных СУБД (локальная проверка на копии SQLite) отставание не измеряется
+            cursor.execute("SELECT 1")
+            return 0.0
+    except DatabaseError:
+        connection.close()
+        return None
+
+
+def replica_lag(alias: str) -> Optional[float]:
+    """Возвращает отставание реплики из кэша процесса, обновляя его раз в CRM_REPLICA_CHECK_INTERVAL секунд."""
+    now = time.monotonic()
+    with _health_lock:
+        checked = _health.get(alias)
+    if checked is not None and now - checked[0] < settings.CRM_REPLICA_CHECK_INTERVAL:
+        return checked[1]
+    lag = measure_lag(alias)
+    with _health_lock:
+        _health[alias] = (now, lag)
+    return lag
+
+
+def choose_replica() -> Optional[str]:
+    """Возвращает случайную реплику с допустимым отставанием или None."""
+    healthy = [
+        alias
+        for alias in replica_aliases()
+        if (lag := replica_lag(alias)) is not None and lag <= settings.CRM_REPLICA_PIN_SECONDS
+    ]
+    # Распределение чтения между репликами, а не криптография
+    return random.choice(healthy) if healthy else None  # noqa: S311
+
+
+def allow_replica_reads() -> None:
+    """Разрешает чтение с реплик до конца текущего запроса."""
+    state = _state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+@contextlib.contextmanager
+def primary() -> Iterator[None]:
+    """Направляет все чтения внутри блока на основную БД."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    state.primary_only += 1
+    try:
+        yield
+    finally:
+        state.primary_only -= 1
+
+
+@contextlib.contextmanager
+def routing(request: HttpRequest) -> Iterator[RoutingState]:
+    """Открывает состояние маршрутизации запроса; клиент с cookie закрепления читает с основной БД."""
+    state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def _streaming(content: Any, state: RoutingState) -> Iterator[Any]:
+    """Отдает потоковое тело ответа с состоянием маршрутизации запроса (тело читается после выхода из view)."""
+    previous = _state.get()
+    _state.set(state)
+    try:
+        yield from content
+    finally:
+        _state.set(previous)
+
+
+def finish_response(response: HttpResponse, state: RoutingState) -> HttpResponse:
+    """Закрепляет клиента за основной БД после записи и переносит состояние в потоковое тело ответа."""
+    if state.wrote and replica_aliases():
+        response.set_cookie(PIN_COOKIE, "1", max_age=settings.CRM_REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+    if response.streaming and not response.is_async and state.replica_reads:
+        response.streaming_content = _streaming(response.streaming_content, state)
+    return response
+
+
+class ReplicaReadMixin:
+    """
+    Разрешает представлению читать с реплик в GET- и HEAD-запросах.
+
+    Подключается к спискам, карточкам, статистике и выгрузкам — представлениям, которые
+    только читают данные. Формы и обработчики POST всегда работают с основной БД.
+    """
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Разрешает чтение с реплик для безопасных методов и передает запрос дальше."""
+        if request.method in ("GET", "HEAD"):
+            allow_replica_reads()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Маршрутизатор БД: записи и миграции — в default, разрешенные чтения — на реплики."""
+
+    def db_for_read(self, model: Any, **hints: Any) -> str:
+        """Возвращает псевдоним БД для чтения."""
+        state = _state.get()
+        if (
+            state is None
+            or not state.replica_reads
+            or state.pinned
+            or state.wrote
+            or state.primary_only
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return choose_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: Any, **hints: Any) -> str:
+        """Возвращает основную БД и отмечает запись в запросе (последующие чтения — с основной БД)."""
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> bool:
+        """Разрешает связи между объектами любых псевдонимов: реплики содержат те же данные."""
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints: Any) -> bool:
+        """Разрешает миграции только на основной БД; реплики получают схему репликацией."""
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,273 @@
+"""
+Инкрементальное обслуживание сводной статистики кампаний.
+
+Функции модуля применяют к таблицам CampaignStats, CampaignDailyStats и ServiceStats атомарные
+приращения через F()-выражения, а также умеют пересчитать сводки с нуля и найти расхождения
+с исходными данными. Приращение сводки кампании одновременно применяется к сводке ее услуги.
+"""
+
+from crm.aggregates import campaign_stats_values, daily_stats_values, service_stats_values
+from crm.models.campaign_stats import CampaignDailyStats, CampaignStats, ServiceStats
+from crm.models.services import Service
+import datetime
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ZERO = Decimal("0")
+
+STATS_FIELDS = ("lead_count", "client_count", "revenue", "budget")
+
+DAILY_FIELDS = ("lead_count", "conversion_count", "revenue")
+
+SERVICE_STATS_FIELDS = ("campaign_count", "lead_count", "client_count", "revenue")
+
+Bucket = Tuple[int, int, Decimal]
+
+
+def local_day(moment: datetime.datetime) -> datetime.date:
+    """Возвращает день, к которому относится момент времени, в текущем часовом поясе."""
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def apply_campaign_delta(campaign_id: int, leads: int = 0, clients: int = 0, revenue: Decimal = ZERO) -> None:
+    """
+    Применяет приращение к сводке кампании одним UPDATE.
+
+    Если строки сводки еще нет (например, данные загружены до появления таблицы),
+    сводка кампании пересчитывается из исходных таблиц. То же приращение применяется
+    к сводке услуги кампании (еще одним UPDATE, без чтения id услуги).
+    """
+    if not (leads or clients or revenue):
+        return
+    changes = {
+        "lead_count": F("lead_count") + leads,
+        "client_count": F("client_count") + clients,
+        "revenue": F("revenue") + revenue,
+    }
+    if not CampaignStats.objects.filter(campaign_id=campaign_id).update(**changes):
+        rebuild_campaign_stats([campaign_id])
+    if not ServiceStats.objects.filter(service__campaign=campaign_id).update(**changes):
+        rebuild_service_stats(Service.objects.filter(campaign=campaign_id).values_list("pk", flat=True))
+
+
+def apply_service_delta(
+    service_id: int, campaigns: int = 0, leads: int = 0, clients: int = 0, revenue: Decimal = ZERO
+) -> None:
+    """
+    Применяет приращение к сводке услуги одним UPDATE.
+
+    Используется при появлении, удалении и переносе кампаний между услугами; отсутствующая
+    строка сводки пересчитывается из исходных таблиц.
+    """
+    if not (campaigns or leads or clients or revenue):
+        return
+    updated = ServiceStats.objects.filter(service_id=service_id).update(
+        campaign_count=F("campaign_count") + campaigns,
+        lead_count=F("lead_count") + leads,
+        client_count=F("client_count") + clients,
+        revenue=F("revenue") + revenue,
+    )
+    if not updated:
+        rebuild_service_stats([service_id])
+
+
+def apply_daily_delta(
+    campaign_id: int, day: datetime.date, leads: int = 0, conversions: int = 0, revenue: Decimal = ZERO
+) -> None:
+    """
+    Применяет приращение к дневному срезу кампании.
+
+    Отсутствующая строка среза создается с нулевыми значениями (конфликт при параллельной
+    вставке игнорируется), после чего приращение применяется тем же UPDATE.
+    """
+    if not (leads or conversions or revenue):
+        return
+    rows = CampaignDailyStats.objects.filter(campaign_id=campaign_id, date=day)
+    changes = {
+        "lead_count": F("lead_count") + leads,
+        "conversion_count": F("conversion_count") + conversions,
+        "revenue": F("revenue") + revenue,
+    }
+    if not rows.update(**changes):
+        CampaignDailyStats.objects.bulk_create(
+            [CampaignDailyStats(campaign_id=campaign_id, date=day)], ignore_conflicts=True
+        )
+        rows.update(**changes)
+
+
+def record_lead(campaign_id: int, created_at: datetime.datetime, sign: int = 1) -> None:
+    """Учитывает появление (sign=1) или исчезновение (sign=-1) лида в сводке и дневном срезе."""
+    apply_campaign_delta(campaign_id, leads=sign)
+    apply_daily_delta(campaign_id, local_day(created_at), leads=sign)
+
+
+def record_client(campaign_id: int, created_at: datetime.datetime, amount: Decimal, sign: int = 1) -> None:
+    """Учитывает появление (sign=1) или исчезновение (sign=-1) клиента в сводке и дневном срезе."""
+    apply_campaign_delta(campaign_id, clients=sign, revenue=amount * sign)
+    apply_daily_delta(campaign_id, local_day(created_at), conversions=sign, revenue=amount * sign)
+
+
+def apply_bucket_deltas(buckets: Dict[Tuple[int, datetime.date], Bucket], sign: int = 1) -> None:
+    """
+    Применяет сгруппированные приращения массовой операции к сводкам.
+
+    Аргументы:
+        buckets: {(кампания, день): (лиды, конверсии, выручка)}
+        sign: 1 — добавить, -1 — вычесть
+
+    Количество запросов зависит от числа пар (кампания, день), а не от числа строк операции.
+    """
+    totals: Dict[int, List[Any]] = {}
+    for (campaign_id, day), (leads, conversions, revenue) in buckets.items():
+        apply_daily_delta(campaign_id, day, leads * sign, conversions * sign, revenue * sign)
+        total = totals.setdefault(campaign_id, [0, 0, ZERO])
+        total[0] += leads
+        total[1] += conversions
+        total[2] += revenue
+    for campaign_id, (leads, conversions, revenue) in totals.items():
+        apply_campaign_delta(campaign_id, leads * sign, conversions * sign, revenue * sign)
+
+
+def set_campaign_budget(campaign_id: int, budget: Decimal) -> None:
+    """Синхронизирует копию бюджета в сводке кампании, создавая сводку при необходимости."""
+    updated = CampaignStats.objects.filter(campaign_id=campaign_id).update(budget=budget)
+    if not updated:
+        rebuild_campaign_stats([campaign_id])
+
+
+def rebuild_campaign_stats(campaign_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает сводку с нуля и сохраняет ее одним upsert-запросом.
+
+    Возвращает количество пересчитанных кампаний.
+    """
+    computed = campaign_stats_values(campaign_ids)
+    rows = [CampaignStats(campaign_id=pk, **values) for pk, values in computed.items()]
+    CampaignStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["campaign"],
+        update_fields=list(STATS_FIELDS),
+    )
+    return len(rows)
+
+
+def rebuild_service_stats(service_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает сводку услуг с нуля и сохраняет ее одним upsert-запросом.
+
+    Возвращает количество пересчитанных услуг.
+    """
+    computed = service_stats_values(service_ids)
+    rows = [ServiceStats(service_id=pk, **values) for pk, values in computed.items()]
+    ServiceStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["service"],
+        update_fields=list(SERVICE_STATS_FIELDS),
+    )
+    return len(rows)
+
+
+def rebuild_daily_stats(campaign_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает дневные срезы с нуля в одной транзакции.
+
+    Возвращает количество записанных строк срезов.
+    """
+    ids = None if campaign_ids is None else list(campaign_ids)
+    computed = daily_stats_values(ids)
+    existing = CampaignDailyStats.objects.all()
+    if ids is not None:
+        existing = existing.filter(campaign_id__in=ids)
+
+    with transaction.atomic():
+        existing.delete()
+        CampaignDailyStats.objects.bulk_create(
+            (CampaignDailyStats(campaign_id=pk, date=day, **values) for (pk, day), values in computed.items()),
+            batch_size=1000,
+        )
+    return len(computed)
+
+
+def find_campaign_stats_drift(campaign_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Сравнивает сохраненную сводку с пересчитанной по исходным данным.
+
+    Возвращает список расхождений вида {"campaign_id", "field", "stored", "actual"};
+    отсутствующая строка сводки отмечается полем "missing".
+    """
+    computed = campaign_stats_values(campaign_ids)
+    stored = {
+        row["campaign_id"]: row
+        for row in CampaignStats.objects.filter(campaign_id__in=list(computed)).values("campaign_id", *STATS_FIELDS)
+    }
+    drift: List[Dict[str, Any]] = []
+    for pk, actual in computed.items():
+        row = stored.get(pk)
+        if row is None:
+            drift.append({"campaign_id": pk, "field": "missing", "stored": None, "actual": None})
+            continue
+        for field in STATS_FIELDS:
+            if row[field] != actual[field]:
+                drift.append({"campaign_id": pk, "field": field, "stored": row[field], "actual": actual[field]})
+    return drift
+
+
+def find_service_stats_drift(service_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Сравнивает сохраненную сводку услуг с пересчитанной по исходным данным.
+
+    Возвращает список расхождений вида {"service_id", "field", "stored", "actual"};
+    отсутствующая строка сводки отмечается полем "missing".
+    """
+    computed = service_stats_values(service_ids)
+    stored_rows = ServiceStats.objects.filter(service_id__in=list(computed))
+    stored = {row["service_id"]: row for row in stored_rows.values("service_id", *SERVICE_STATS_FIELDS)}
+    drift: List[Dict[str, Any]] = []
+    for pk, actual in computed.items():
+        row = stored.get(pk)
+        if row is None:
+            drift.append({"service_id": pk, "field": "missing", "stored": None, "actual": None})
+            continue
+        for field in SERVICE_STATS_FIELDS:
+            if row[field] != actual[field]:
+                drift.append({"service_id": pk, "field": field, "stored": row[field], "actual": actual[field]})
+    return drift
+
+
+def find_daily_stats_drift(campaign_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Сравнивает сохраненные дневные срезы с пересчитанными по исходным данным.
+
+    Нулевые строки срезов, оставшиеся после удаления данных, расхождением не считаются.
+    """
+    ids = None if campaign_ids is None else list(campaign_ids)
+    computed = daily_stats_values(ids)
+    stored_rows = CampaignDailyStats.objects.all()
+    if ids is not None:
+        stored_rows = stored_rows.filter(campaign_id__in=ids)
+    stored = {
+        (row["campaign_id"], row["date"]): row for row in stored_rows.values("campaign_id", "date", *DAILY_FIELDS)
+    }
+
+    empty = {"lead_count": 0, "conversion_count": 0, "revenue": ZERO}
+    drift: List[Dict[str, Any]] = []
+    for key in computed.keys() | stored.keys():
+        actual = computed.get(key, empty)
+        row = stored.get(key, empty)
+        for field in DAILY_FIELDS:
+            if row[field] != actual[field]:
+                drift.append(
+                    {
+                        "campaign_id": key[0],
+                        "date": key[1],
+                        "field": field,
+                        "stored": row[field],
+                        "actual": actual[field],
+                    }
+                )
+    return drift
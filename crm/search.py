@@ -0,0 +1,100 @@
+"""
+Поиск потенциальных клиентов (лидов) по имени, фрагменту телефона и email.
+
+На PostgreSQL используются объекты, созданные миграцией 0005_lead_search:
+    - GIN-индекс по выражению SEARCH_VECTOR (tsvector имени, email и телефона) для полнотекстового поиска;
+      выражение в запросе совпадает с выражением индекса, поэтому хранимый столбец не нужен;
+    - GIN-индексы pg_trgm по UPPER(full_name), UPPER(phone), UPPER(email), которые обслуживают
+      и нечеткое сравнение (оператор %), и фильтры icontains (Django строит их как UPPER(col) LIKE ...).
+Результаты ранжируются суммой ts_rank и триграммного сходства имени.
+
+На остальных СУБД (SQLite в тестах) используется упрощенный путь на icontains
+с ранжированием по типу совпадения.
+"""
+
+from crm.models.leads import Lead
+from django.db import connections
+from django.db.models import BooleanField, Case, F, FloatField, Q, QuerySet, Value, When
+from django.db.models.expressions import RawSQL
+import re
+from typing import List, Optional
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 50
+
+# То же выражение, что в индексе crm_lead_search_vector_gin (миграция 0005_lead_search): планировщик
+# использует индекс по выражению, только если выражение в запросе совпадает с ним
+SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(\"crm_lead\".\"full_name\", '') || ' ' || coalesce(\"crm_lead\".\"email\", '') "
+    "|| ' ' || coalesce(\"crm_lead\".\"phone\", ''))"
+)
+
+
+def _phone_fragment(query: str) -> str:
+    """Возвращает цифры запроса, если он похож на фрагмент телефона, иначе пустую строку."""
+    digits = re.sub(r"\D", "", query)
+    return digits if len(digits) >= 3 else ""
+
+
+def _text_filter(query: str) -> Q:
+    """Возвращает условие вхождения подстроки в имя, телефон или email."""
+    condition = Q(full_name__icontains=query) | Q(email__icontains=query) | Q(phone__icontains=query)
+    phone = _phone_fragment(query)
+    if phone and phone != query:
+        condition |= Q(phone__icontains=phone)
+    return condition
+
+
+def _postgresql_search(queryset: QuerySet[Lead], query: str) -> QuerySet[Lead]:
+    """Возвращает queryset с полнотекстовым и нечетким поиском и ранжированием на PostgreSQL."""
+    # SEARCH_VECTOR — константа модуля, запрос пользователя передается только параметром
+    matches_document = RawSQL(  # noqa: S611
+        f"{SEARCH_VECTOR} @@ websearch_to_tsquery('simple', %s)", [query], output_field=BooleanField()
+    )
+    similar_name = RawSQL('UPPER("crm_lead"."full_name"::text) %% UPPER(%s)', [query], output_field=BooleanField())
+    rank = RawSQL(  # noqa: S611
+        f"ts_rank({SEARCH_VECTOR}, websearch_to_tsquery('simple', %s))",
+        [query],
+        output_field=FloatField(),
+    )
+    similarity = RawSQL('similarity("crm_lead"."full_name", %s)', [query], output_field=FloatField())
+    return queryset.filter(Q(matches_document) | Q(similar_name) | _text_filter(query)).annotate(
+        search_score=rank + similarity
+    )
+
+
+def _fallback_search(queryset: QuerySet[Lead], query: str) -> QuerySet[Lead]:
+    """Возвращает queryset с поиском по подстроке и ранжированием по типу совпадения."""
+    return queryset.filter(_text_filter(query)).annotate(
+        search_score=Case(
+            When(Q(email__iexact=query) | Q(phone=query), then=Value(3.0)),
+            When(full_name__istartswith=query, then=Value(2.0)),
+            default=Value(1.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_leads(query: str, limit: int = DEFAULT_LIMIT, queryset: Optional[QuerySet[Lead]] = None) -> List[Lead]:
+    """
+    Ищет лидов по имени, фрагменту телефона или email.
+
+    Аргументы:
+        query: Строка поиска
+        limit: Максимальное количество результатов
+        queryset: Исходный queryset (по умолчанию все лиды с кампаниями)
+
+    Возвращает:
+        list: Лиды, отсортированные по убыванию релевантности (атрибут search_score)
+    """
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+    if queryset is None:
+        queryset = Lead.objects.select_related("campaign")
+
+    if connections[queryset.db].vendor == "postgresql":
+        results = _postgresql_search(queryset, query)
+    else:
+        results = _fallback_search(queryset, query)
+    return list(results.order_by(F("search_score").desc(), "-id")[:limit])
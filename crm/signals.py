@@ -0,0 +1,255 @@
+"""
+Обработчики сигналов моделей CRM.
+
+Поддерживают сводную статистику кампаний, ее дневные срезы и сводку услуг в актуальном состоянии:
+при создании, изменении и удалении кампаний, лидов, клиентов и договоров применяется только разница.
+Кроме того, увеличивают версии моделей в кэше результатов (см. crm.cache), записывают события
+создания, изменения и удаления объектов в журнал аудита (см. crm.audit), ведут счетчики ссылок
+договоров на файлы документов (см. crm.documents) и подключают
+учет SQL-запросов к новым соединениям с БД (см. crm.metrics).
+"""
+
+from crm.audit import record
+from crm.cache import bump_model_version_on_commit
+from crm.documents import add_reference, remove_reference
+from crm.metrics import instrument_connection
+from crm.models.audit import AuditEvent
+from crm.models.campaign_stats import CampaignStats
+from crm.models.campaigns import Campaign
+from crm.models.clients import Client
+from crm.models.contracts import Contract
+from crm.models.leads import Lead
+from crm.models.services import Service
+from crm.rollups import (
+    apply_campaign_delta,
+    apply_daily_delta,
+    apply_service_delta,
+    rebuild_service_stats,
+    record_client,
+    record_lead,
+    set_campaign_budget,
+)
+import datetime
+from decimal import Decimal
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from typing import Any, Optional, Tuple
+
+ClientContribution = Tuple[int, Decimal, datetime.datetime]
+CampaignTotals = Tuple[int, int, Decimal]
+
+
+def _client_contribution(client_pk: Any) -> Optional[ClientContribution]:
+    """Возвращает (кампания, сумма договора, дата создания), которые сохраненный клиент вносит в сводку."""
+    if not client_pk:
+        return None
+    return (
+        Client.objects.filter(pk=client_pk).values_list("lead__campaign_id", "contract__amount", "created_at").first()
+    )
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def bump_cache_version(sender: Any, **kwargs: Any) -> None:
+    """Инвалидирует закэшированные результаты, зависящие от измененной модели."""
+    bump_model_version_on_commit(sender)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Campaign)
+@receiver(post_save, sender=Lead)
+@receiver(post_save, sender=Contract)
+@receiver(post_save, sender=Client)
+def audit_saved(sender: Any, instance: Any, created: bool, update_fields: Any = None, **kwargs: Any) -> None:
+    """Записывает создание или изменение объекта в журнал аудита."""
+    if created:
+        record(AuditEvent.Action.CREATE, sender, instance.pk)
+    elif update_fields:
+        record(AuditEvent.Action.UPDATE, sender, instance.pk, fields=sorted(update_fields))
+    else:
+        record(AuditEvent.Action.UPDATE, sender, instance.pk)
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_delete, sender=Lead)
+@receiver(post_delete, sender=Contract)
+@receiver(post_delete, sender=Client)
+def audit_deleted(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Записывает удаление объекта в журнал аудита."""
+    record(AuditEvent.Action.DELETE, sender, instance.pk)
+
+
+def _campaign_totals(campaign_pk: Any) -> CampaignTotals:
+    """Возвращает (лиды, клиенты, выручка), которые кампания вносит в сводку своей услуги."""
+    totals = CampaignStats.objects.filter(campaign_id=campaign_pk).values_list("lead_count", "client_count", "revenue")
+    return totals.first() or (0, 0, Decimal("0"))
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender: Any, instance: Service, created: bool, **kwargs: Any) -> None:
+    """Создает сводку новой услуги."""
+    if created:
+        rebuild_service_stats([instance.pk])
+
+
+@receiver(pre_save, sender=Campaign)
+def campaign_pre_save(sender: Any, instance: Campaign, **kwargs: Any) -> None:
+    """Запоминает прежнюю услугу кампании перед обновлением."""
+    instance._stats_old_service_id = (
+        Campaign.objects.filter(pk=instance.pk).values_list("service_id", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Campaign)
+def campaign_saved(sender: Any, instance: Campaign, created: bool, **kwargs: Any) -> None:
+    """Создает сводку новой кампании, синхронизирует копию бюджета и учитывает кампанию в сводке услуги."""
+    set_campaign_budget(instance.pk, instance.budget)
+    old_service_id = getattr(instance, "_stats_old_service_id", None)
+    if created or old_service_id is None:
+        apply_service_delta(instance.service_id, campaigns=1)
+        return
+    if old_service_id == instance.service_id:
+        return
+
+    leads, clients, revenue = _campaign_totals(instance.pk)
+    apply_service_delta(old_service_id, -1, -leads, -clients, -revenue)
+    apply_service_delta(instance.service_id, 1, leads, clients, revenue)
+
+
+@receiver(pre_delete, sender=Campaign)
+def campaign_pre_delete(sender: Any, instance: Campaign, **kwargs: Any) -> None:
+    """Запоминает вклад удаляемой кампании, пока ее сводка еще не удалена каскадом."""
+    instance._stats_old_totals = _campaign_totals(instance.pk)
+
+
+@receiver(post_delete, sender=Campaign)
+def campaign_deleted(sender: Any, instance: Campaign, **kwargs: Any) -> None:
+    """Вычитает удаленную кампанию из сводки ее услуги."""
+    leads, clients, revenue = getattr(instance, "_stats_old_totals", (0, 0, Decimal("0")))
+    apply_service_delta(instance.service_id, -1, -leads, -clients, -revenue)
+
+
+@receiver(pre_save, sender=Lead)
+def lead_pre_save(sender: Any, instance: Lead, **kwargs: Any) -> None:
+    """Запоминает прежнюю кампанию лида перед обновлением."""
+    instance._stats_old_campaign_id = (
+        Lead.objects.filter(pk=instance.pk).values_list("campaign_id", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Lead)
+def lead_saved(sender: Any, instance: Lead, created: bool, **kwargs: Any) -> None:
+    """Учитывает нового лида или перенос лида (вместе с его клиентом) в другую кампанию."""
+    old_campaign_id = getattr(instance, "_stats_old_campaign_id", None)
+    if created or old_campaign_id is None:
+        record_lead(instance.campaign_id, instance.created_at)
+        return
+    if old_campaign_id == instance.campaign_id:
+        return
+
+    record_lead(old_campaign_id, instance.created_at, sign=-1)
+    record_lead(instance.campaign_id, instance.created_at)
+    client = Client.objects.filter(lead_id=instance.pk).values_list("contract__amount", "created_at").first()
+    if client is not None:
+        record_client(old_campaign_id, client[1], client[0], sign=-1)
+        record_client(instance.campaign_id, client[1], client[0])
+
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted(sender: Any, instance: Lead, **kwargs: Any) -> None:
+    """Уменьшает количество лидов кампании."""
+    record_lead(instance.campaign_id, instance.created_at, sign=-1)
+
+
+@receiver(pre_save, sender=Client)
+def client_pre_save(sender: Any, instance: Client, **kwargs: Any) -> None:
+    """Запоминает прежний вклад клиента в сводку перед обновлением."""
+    instance._stats_old_contribution = _client_contribution(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+def client_saved(sender: Any, instance: Client, **kwargs: Any) -> None:
+    """Переносит вклад клиента в сводку с учетом смены лида или договора."""
+    old = getattr(instance, "_stats_old_contribution", None)
+    new = _client_contribution(instance.pk)
+    if old == new:
+        return
+    if old is not None:
+        record_client(old[0], old[2], old[1], sign=-1)
+    if new is not None:
+        record_client(new[0], new[2], new[1])
+
+
+@receiver(pre_delete, sender=Client)
+def client_pre_delete(sender: Any, instance: Client, **kwargs: Any) -> None:
+    """Запоминает вклад удаляемого клиента, пока связанные строки еще доступны."""
+    instance._stats_old_contribution = _client_contribution(instance.pk)
+
+
+@receiver(post_delete, sender=Client)
+def client_deleted(sender: Any, instance: Client, **kwargs: Any) -> None:
+    """Вычитает вклад удаленного клиента из сводки."""
+    old = getattr(instance, "_stats_old_contribution", None)
+    if old is not None:
+        record_client(old[0], old[2], old[1], sign=-1)
+
+
+@receiver(pre_save, sender=Contract)
+def contract_pre_save(sender: Any, instance: Contract, **kwargs: Any) -> None:
+    """Запоминает прежние сумму и документ договора перед обновлением."""
+    old = Contract.objects.filter(pk=instance.pk).values_list("amount", "document").first() if instance.pk else None
+    instance._stats_old_amount, instance._old_document = old if old is not None else (None, None)
+
+
+@receiver(post_save, sender=Contract)
+def contract_saved(sender: Any, instance: Contract, **kwargs: Any) -> None:
+    """Распределяет изменение суммы договора по кампаниям и дням появления его клиентов."""
+    old_amount = getattr(instance, "_stats_old_amount", None)
+    if old_amount is None:
+        return
+    difference = Decimal(instance.amount) - old_amount
+    if not difference:
+        return
+    per_day = (
+        Client.objects.filter(contract_id=instance.pk)
+        .annotate(day=TruncDate("created_at"))
+        .values("lead__campaign_id", "day")
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+    for row in per_day:
+        apply_campaign_delta(row["lead__campaign_id"], revenue=difference * row["n"])
+        apply_daily_delta(row["lead__campaign_id"], row["day"], revenue=difference * row["n"])
+
+
+@receiver(post_save, sender=Contract)
+def contract_document_saved(sender: Any, instance: Contract, **kwargs: Any) -> None:
+    """Переносит ссылку договора со старого файла документа на новый."""
+    old_document = getattr(instance, "_old_document", None)
+    if instance.document.name != old_document:
+        add_reference(instance.document.name)
+        remove_reference(old_document)
+
+
+@receiver(post_delete, sender=Contract)
+def contract_document_deleted(sender: Any, instance: Contract, **kwargs: Any) -> None:
+    """Снимает ссылку удаленного договора на файл документа."""
+    remove_reference(instance.document.name)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """Подключает учет SQL-запросов к соединению с БД."""
+    instrument_connection(connection)
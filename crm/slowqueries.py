@@ -0,0 +1,120 @@
+"""
+Журнал медленных SQL-запросов.
+
+Обертка выполнения SQL (crm.metrics.sql_wrapper) замеряет каждый запрос и передает в record_slow_query
+запросы не быстрее CRM_SLOW_QUERY_MS. Запись попадает в логгер "slow_query" (JSON-строки в CRM_SLOW_QUERY_LOG)
+вместе с отпечатком запроса, представлением, строкой в crm/views/*.py и шаблоном, из которых он выполнен.
+Для доли CRM_SLOW_QUERY_EXPLAIN_RATE медленных SELECT на PostgreSQL к записи прикладывается
+план EXPLAIN без ANALYZE: он строится планировщиком без выполнения запроса и не удлиняет и без того
+медленный HTTP-запрос. Команда slow_queries суммирует журнал по отпечаткам.
+
+Отпечаток — текст запроса, в котором параметры, числовые и строковые литералы заменены на "?",
+а списки IN (...) свернуты, поэтому запросы одной формы с разными значениями суммируются вместе.
+"""
+
+import contextvars
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from functools import lru_cache
+import hashlib
+import logging
+import os
+import random
+import re
+from services.logging_pipeline import CONTEXT_ATTR
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("slow_query")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_IN_LIST = re.compile(r"IN \((?:\?, )*\?\)")
+_SPACES = re.compile(r"\s+")
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar("crm_explaining", default=False)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """Приводит текст SQL к отпечатку: литералы и параметры заменяются на "?", списки IN сворачиваются."""
+    normalized = _LITERALS.sub("?", _SPACES.sub(" ", sql.strip()))
+    return _IN_LIST.sub("IN (...)", normalized)
+
+
+def fingerprint_id(shape: str) -> str:
+    """Возвращает короткий идентификатор отпечатка."""
+    return hashlib.md5(shape.encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def call_site() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Определяет, откуда выполнен запрос.
+
+    Возвращает:
+        tuple: (строка в crm/views/*.py или, если ее нет, ближайшая строка кода проекта;
+                шаблон и строка в нем) — None, если место не найдено
+    """
+    root = str(settings.BASE_DIR)
+    views_dir = os.path.join(root, "crm", "views")
+    site = project_site = template = None
+    frame = sys._getframe(1)
+    while frame is not None and site is None:
+        filename = frame.f_code.co_filename
+        if template is None and frame.f_code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                template = f"{origin.template_name}:{token.lineno}"
+        if filename.startswith(root) and "site-packages" not in filename and filename != __file__:
+            location = f"{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            if filename.startswith(views_dir):
+                site = location
+            elif project_site is None and not filename.endswith(os.path.join("crm", "metrics.py")):
+                project_site = location
+        frame = frame.f_back
+    return site or project_site, template
+
+
+def explain(connection: Any, sql: str, params: Any) -> Optional[str]:
+    """
+    Возвращает оценочный план EXPLAIN запроса на PostgreSQL.
+
+    Запрос не выполняется повторно (без ANALYZE), поэтому фактических времен и буферов в плане нет.
+    План снимается только для SELECT; ошибка (например, при серверном курсоре) откатывается к точке
+    сохранения и не влияет на транзакцию запроса.
+    """
+    if connection.vendor != "postgresql" or sql.lstrip()[:6].upper() != "SELECT":
+        return None
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {sql}", params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+    except DatabaseError as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        _explaining.reset(token)
+
+
+def record_slow_query(sql: str, params: Any, many: bool, duration: float, context: Dict[str, Any], view: Any) -> None:
+    """Записывает медленный запрос в журнал (запросы самого EXPLAIN не учитываются)."""
+    if _explaining.get():
+        return
+    shape = fingerprint(sql)
+    site, template = call_site()
+    fields: Dict[str, Any] = {
+        "fingerprint": fingerprint_id(shape),
+        "sql": shape,
+        "duration_ms": round(duration * 1000, 3),
+        "alias": context["connection"].alias,
+        "view": view,
+        "call_site": site,
+        "template": template,
+    }
+    # Выборка доли запросов для плана, а не криптография
+    if not many and random.random() < settings.CRM_SLOW_QUERY_EXPLAIN_RATE:  # noqa: S311
+        plan = explain(context["connection"], sql, params)
+        if plan is not None:
+            fields["explain"] = plan
+    logger.warning("Медленный SQL-запрос", extra={CONTEXT_ATTR: fields})
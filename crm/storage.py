@@ -0,0 +1,94 @@
+"""
+Хранилище документов договоров с адресацией по содержимому.
+
+ContentAddressedStorage сохраняет каждый уникальный файл один раз под его SHA-256:
+<каталог upload_to>/<первые два символа хэша>/<хэш><расширение>. Повторная загрузка того же файла
+возвращает имя уже сохраненного. Загрузка читается блоками (крупные файлы Django заранее
+пишет во временный файл, см. FILE_UPLOAD_MAX_MEMORY_SIZE), которые одновременно хэшируются и пишутся
+во временный файл в каталоге хранилища, поэтому документ целиком в памяти не держится.
+
+Число договоров, ссылающихся на файл, хранит модель DocumentBlob (см. crm.documents); файлы,
+на которые больше никто не ссылается, удаляет команда prune_documents.
+"""
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage, storages
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from typing import Optional
+
+CHUNK_SIZE = 64 * 1024
+
+TEMPORARY_PREFIX = ".upload-"
+
+BLOB_NAME_RE = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[0-9a-z]{1,10})?$")
+
+
+def blob_name(directory: str, digest: str, extension: str) -> str:
+    """Возвращает имя файла с хэшем digest в каталоге directory."""
+    return posixpath.join(directory, digest[:2], digest + extension)
+
+
+def is_blob_name(name: str) -> bool:
+    """Проверяет, что имя файла образовано хэшем содержимого (а не сохранено до перехода на хранилище)."""
+    return BLOB_NAME_RE.search(name) is not None
+
+
+def document_storage() -> Storage:
+    """Возвращает хранилище документов договоров (STORAGES["documents"])."""
+    return storages["documents"]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором одинаковые файлы хранятся в одном экземпляре под хэшем содержимого."""
+
+    def get_available_name(self, name: str, max_length: Optional[int] = None) -> str:
+        """Возвращает имя без изменений: итоговое имя определяется содержимым в _save."""
+        return name
+
+    def _save(self, name: str, content: File) -> str:
+        """
+        Сохраняет файл под хэшем содержимого.
+
+        Аргументы:
+            name (str): Предлагаемое имя (используются каталог и расширение)
+            content (File): Содержимое
+
+        Возвращает:
+            str: Имя файла в хранилище
+        """
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r"\.[0-9a-z]{1,10}", extension):
+            extension = ""
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(dir=self.path(directory), prefix=TEMPORARY_PREFIX)
+        try:
+            with os.fdopen(descriptor, "wb") as out:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            stored = blob_name(directory, digest.hexdigest(), extension)
+            path = self.path(stored)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(temporary)
+                # Свежее время изменения защищает файл от удаления prune_documents, пока договор не сохранен
+                os.utime(path)
+            else:
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporary, self.file_permissions_mode)
+                # Атомарно: параллельная загрузка того же файла заменит его идентичным содержимым
+                os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return stored
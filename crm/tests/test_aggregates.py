@@ -0,0 +1,105 @@
+"""Тесты агрегирующих запросов статистики кампаний (crm.aggregates) против наивного пересчета."""
+
+from crm.aggregates import campaign_stats_queryset, campaign_stats_values
+from crm.models import Campaign, Client, Contract, Lead, LeadArchive, Service
+import datetime
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from typing import Any, Dict
+
+def naive_stats(campaign: Campaign) -> Dict[str, Any]:
+    """Считает показатели кампании отдельными запросами и суммированием в Python."""
+    clients = list(Client.objects.filter(lead__campaign=campaign).select_related("contract"))
+    revenue = sum((client.contract.amount for client in clients), Decimal("0"))
+    return {
+        "lead_count": Lead.objects.filter(campaign=campaign).count()
+        + LeadArchive.objects.filter(campaign=campaign).count(),
+        "client_count": len(clients),
+        "revenue": revenue,
+        "budget": campaign.budget,
+    }
+
+
+class CampaignStatsTests(TestCase):
+    """Сверка campaign_stats_values и campaign_stats_queryset с наивной реализацией."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создает кампании с разным составом лидов, клиентов, договоров и архива."""
+        service = Service.objects.create(name="Service", description="", price=1000)
+        today = datetime.date.today()
+        contracts = [
+            Contract.objects.create(
+                name=f"Contract {amount}",
+                service=service,
+                document="contracts/test.pdf",
+                start_date=today,
+                end_date=today + datetime.timedelta(days=365),
+                amount=amount,
+            )
+            for amount in (Decimal("100.00"), Decimal("250.50"), Decimal("999.99"))
+        ]
+        cls.campaigns = [
+            Campaign.objects.create(name=name, service=service, channel="test", budget=budget)
+            for name, budget in (("Many", 300), ("Empty", 50), ("No clients", 0), ("Archived", 10))
+        ]
+        many, _, no_clients, archived = cls.campaigns
+
+        def lead(campaign: Campaign, n: int) -> Lead:
+            return Lead.objects.create(
+                full_name=f"Lead {campaign.name} {n}",
+                phone=f"+7900{campaign.pk:03d}{n:04d}",
+                email=f"lead{campaign.pk}-{n}@example.com",
+                campaign=campaign,
+            )
+
+        # Несколько клиентов на одном договоре и несколько договоров на кампанию: проверка на размножение строк
+        many_leads = [lead(many, n) for n in range(5)]
+        for n, contract in enumerate([contracts[0], contracts[0], contracts[1], contracts[2]]):
+            Client.objects.create(lead=many_leads[n], contract=contract)
+        for n in range(3):
+            lead(no_clients, n)
+        archived_lead = lead(archived, 0)
+        Client.objects.create(lead=archived_lead, contract=contracts[1])
+        now = timezone.now()
+        LeadArchive.objects.bulk_create(
+            LeadArchive(
+                id=10_000 + n,
+                full_name=f"Archived {n}",
+                phone="+79000000000",
+                email=f"archived{n}@example.com",
+                campaign=archived,
+                created_at=now - datetime.timedelta(days=400),
+                updated_at=now - datetime.timedelta(days=400),
+                archived_at=now,
+            )
+            for n in range(4)
+        )
+
+    def test_values_match_naive_reference(self) -> None:
+        """Показатели всех кампаний совпадают с наивным пересчетом, включая пустые и архивные."""
+        with self.assertNumQueries(1):
+            stats = campaign_stats_values()
+        self.assertEqual(set(stats), {campaign.pk for campaign in self.campaigns})
+        for campaign in self.campaigns:
+            with self.subTest(campaign=campaign.name):
+                self.assertEqual(stats[campaign.pk], naive_stats(campaign))
+
+    def test_expected_totals(self) -> None:
+        """Проверяет рассчитанные вручную значения для граничных случаев."""
+        stats = campaign_stats_values()
+        many, empty, no_clients, archived = (stats[campaign.pk] for campaign in self.campaigns)
+        self.assertEqual((many["lead_count"], many["client_count"], many["revenue"]), (5, 4, Decimal("1450.49")))
+        self.assertEqual((empty["lead_count"], empty["client_count"], empty["revenue"]), (0, 0, Decimal("0")))
+        self.assertEqual((no_clients["lead_count"], no_clients["client_count"]), (3, 0))
+        self.assertEqual((archived["lead_count"], archived["client_count"]), (5, 1))
+
+    def test_queryset_roi_and_filter(self) -> None:
+        """ROI равен выручке за вычетом бюджета ровно один раз; фильтр по id ограничивает выборку."""
+        ids = [self.campaigns[0].pk, self.campaigns[1].pk]
+        rows = {campaign.pk: campaign for campaign in campaign_stats_queryset(ids)}
+        self.assertEqual(set(rows), set(ids))
+        for campaign in rows.values():
+            reference = naive_stats(campaign)
+            self.assertEqual(campaign.roi, reference["revenue"] - reference["budget"])
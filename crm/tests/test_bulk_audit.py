@@ -0,0 +1,58 @@
+"""Тесты событий аудита массовой записи лидов: приема (crm.ingest), импорта (crm.imports) и архивирования."""
+
+from crm.archive import archive_leads
+from crm.audit import history
+from crm.imports import import_leads
+from crm.ingest import write_batch
+from crm.models import AuditEvent, Campaign, Lead, Service
+import datetime
+from django.test import TestCase
+from django.utils import timezone
+import io
+
+class BulkAuditTests(TestCase):
+    """У каждого лида, созданного или архивированного массово, есть свое событие в журнале."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создает кампанию для лидов."""
+        service = Service.objects.create(name="Service", description="", price=1000)
+        cls.campaign = Campaign.objects.create(name="Campaign", service=service, channel="test", budget=0)
+
+    def test_ingest_records_created_leads(self) -> None:
+        """Прием пишет событие создания только для вставленных лидов, без автора."""
+        item = {"external_id": "ext-1", "full_name": "Lead", "phone": "1", "email": "l@example.com"}
+        with self.captureOnCommitCallbacks(execute=True):
+            statuses = write_batch([{**item, "campaign": self.campaign.pk}, {**item, "campaign": self.campaign.pk}])
+        self.assertEqual(statuses, ["created", "duplicate"])
+        lead = Lead.objects.get(external_id="ext-1")
+        events = list(history(Lead, lead.pk))
+        self.assertEqual([(event.action, event.actor_id) for event in events], [(AuditEvent.Action.CREATE, None)])
+        self.assertEqual(events[0].details, {"source": "ingest"})
+
+    def test_import_records_each_lead(self) -> None:
+        """Импорт CSV пишет событие создания каждого лида."""
+        csv = f"full_name,phone,email,campaign\nA,+79000000001,a@example.com,{self.campaign.pk}\n" + (
+            f"B,+79000000002,b@example.com,{self.campaign.name}\n"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_leads(io.StringIO(csv), use_copy=False)
+        self.assertEqual(report.created, 2)
+        for lead in Lead.objects.all():
+            with self.subTest(lead=lead.full_name):
+                self.assertEqual([event.action for event in history(Lead, lead.pk)], [AuditEvent.Action.CREATE])
+
+    def test_archive_records_each_lead(self) -> None:
+        """Архивирование пишет событие по каждому перенесенному лиду."""
+        old = timezone.now() - datetime.timedelta(days=400)
+        leads = [
+            Lead.objects.create(full_name=f"Old {n}", phone=str(n), email=f"old{n}@example.com", campaign=self.campaign)
+            for n in range(3)
+        ]
+        Lead.objects.filter(pk__in=[lead.pk for lead in leads]).update(created_at=old)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = archive_leads(old + datetime.timedelta(days=1), batch_size=2)
+        self.assertEqual(moved, 3)
+        for lead in leads:
+            with self.subTest(lead=lead.pk):
+                self.assertIn(AuditEvent.Action.ARCHIVE, [event.action for event in history(Lead, lead.pk)])
@@ -0,0 +1,65 @@
+"""Тесты курсорной пагинации (crm.pagination)."""
+
+from crm.models import Campaign, Lead, Service
+from crm.pagination import keyset_filter, paginate_keyset
+import datetime
+from django.test import TestCase
+from django.utils import timezone
+from typing import List, Optional
+
+FIELDS = ("-created_at", "-id")
+
+
+class KeysetPaginationTests(TestCase):
+    """Обход страниц вперед и назад совпадает с полной сортировкой."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создает лидов с совпадающими датами и датами в пределах одной миллисекунды."""
+        service = Service.objects.create(name="Service", description="", price=1000)
+        campaign = Campaign.objects.create(name="Campaign", service=service, channel="test", budget=0)
+        base = timezone.now().replace(microsecond=500000)
+        offsets = [0, 0, 0, 10, 20, 30, 1000, 1000, 2000, 5000, 5000, 5001, 9000]
+        for n, microseconds in enumerate(offsets):
+            lead = Lead.objects.create(
+                full_name=f"Lead {n}", phone=f"+7900000{n:04d}", email=f"lead{n}@example.com", campaign=campaign
+            )
+            created_at = base - datetime.timedelta(microseconds=microseconds)
+            Lead.objects.filter(pk=lead.pk).update(created_at=created_at)
+        cls.expected = list(Lead.objects.order_by(*FIELDS).values_list("pk", flat=True))
+
+    def walk(self, page_size: int) -> List[int]:
+        """Проходит все страницы вперед и возвращает id в порядке показа."""
+        seen: List[int] = []
+        cursor: Optional[str] = None
+        while True:
+            page = paginate_keyset(Lead.objects.all(), FIELDS, page_size, cursor)
+            seen += [lead.pk for lead in page]
+            if page.next_cursor is None:
+                return seen
+            cursor = page.next_cursor
+
+    def test_forward_walk_matches_ordering(self) -> None:
+        """Ни одна строка не пропущена и не повторена при любом размере страницы."""
+        for page_size in (1, 2, 3, 5):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.walk(page_size), self.expected)
+
+    def test_backward_walk_matches_ordering(self) -> None:
+        """Переходы назад от последней страницы восстанавливают тот же порядок."""
+        cursor: Optional[str] = None
+        while True:
+            page = paginate_keyset(Lead.objects.all(), FIELDS, 3, cursor)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        seen = [lead.pk for lead in page]
+        while page.previous_cursor is not None:
+            page = paginate_keyset(Lead.objects.all(), FIELDS, 3, page.previous_cursor)
+            seen = [lead.pk for lead in page] + seen
+        self.assertEqual(seen, self.expected)
+
+    def test_filter_has_leading_range_bound(self) -> None:
+        """Условие начинается с нестрогой границы по первому полю ключа (поиск по индексу)."""
+        condition = keyset_filter(FIELDS, [timezone.now(), 10], forward=True)
+        self.assertEqual(condition.children[0], ("created_at__lte", condition.children[0][1]))
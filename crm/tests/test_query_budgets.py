@@ -0,0 +1,144 @@
+"""
+Бюджеты SQL-запросов представлений: число запросов не должно расти с числом строк.
+
+Каждый маршрут crm/urls.py запрашивается на малом и большом наборе синтетических данных;
+число SQL-запросов должно совпасть, а повторы запросов одной формы (N+1) приводят к RepeatedQueriesError
+(CRM_QUERY_REPEAT_RAISE, см. crm.querybudget). Каждый ответ должен быть успешным (200): иначе
+сравнивались бы запросы страницы ошибки. Маршруты только для POST (POST_ONLY) не запрашиваются.
+Запускается и командой check_query_budgets.
+"""
+
+from crm.exports import EXPORTS
+from crm.models import Campaign, Client, Contract, Lead, Service
+from crm.querybudget import RepeatedQueriesError
+from crm.urls import urlpatterns
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, Tuple
+
+SMALL = 3
+LARGE = 30
+
+MODELS = {"service": Service, "campaign": Campaign, "lead": Lead, "contract": Contract, "client": Client}
+SEARCH_VIEWS = ("lead_list", "lead_search")
+POST_ONLY = ("lead_ingest", "lead_bulk")
+
+# Документ опорного договора сохраняется во временный MEDIA_ROOT, удаляемый после тестов
+MEDIA_ROOT = tempfile.mkdtemp(prefix="querybudget-")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    CRM_METRICS_DIR="",
+    CRM_QUERY_REPEAT_RAISE=True,
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class QueryBudgetTests(TestCase):
+    """Сравнение числа SQL-запросов каждого представления на SMALL и LARGE строках на модель."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Создает администратора и опорные объекты, к которым привязываются синтетические строки."""
+        cls.addClassCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        cls.user = get_user_model().objects.create_user(username="querybudget", role="ADMIN")
+        cls.today = datetime.date.today()
+        service = Service.objects.create(name="Synthetic service", description="Query budget check", price=1000)
+        campaign = Campaign.objects.create(name="Synthetic", service=service, channel="google", budget=1000)
+        contract = cls.create_contract(service, "Synthetic contract")
+        # Файл нужен только опорному договору: его документ запрашивает contract_document
+        contract.document.save("synthetic.pdf", ContentFile(b"%PDF-1.4 synthetic"))
+        # Опорный лид остается неконвертированным для страницы конвертации
+        lead = Lead.objects.create(
+            full_name="Synthetic lead", phone="+79000000000", email="synthetic@example.com", campaign=campaign
+        )
+        cls.anchors: Dict[Any, Any] = {Service: service, Campaign: campaign, Contract: contract, Lead: lead}
+        cls.rows = 1
+
+    @classmethod
+    def create_contract(cls, service: Service, name: str) -> Contract:
+        """Создает договор на год с фиктивным документом."""
+        return Contract.objects.create(
+            name=name,
+            service=service,
+            document="contracts/synthetic.pdf",
+            start_date=cls.today,
+            end_date=cls.today + datetime.timedelta(days=365),
+            amount=1000,
+        )
+
+    def grow(self, size: int) -> None:
+        """Добавляет синтетические строки до size на модель; связанные строки привязываются к опорным объектам."""
+        service, campaign, contract = self.anchors[Service], self.anchors[Campaign], self.anchors[Contract]
+        for n in range(self.rows, size):
+            Service.objects.create(name=f"Synthetic service {n}", description="Query budget check", price=1000)
+            Campaign.objects.create(name=f"Synthetic {n}", service=service, channel="google", budget=1000)
+            self.create_contract(service, f"Synthetic contract {n}")
+            lead = Lead.objects.create(
+                full_name=f"Synthetic lead {n}",
+                phone=f"+7900{n:07d}",
+                email=f"synthetic{n}@example.com",
+                campaign=campaign,
+            )
+            client = Client.objects.create(lead=lead, contract=contract)
+            self.anchors.setdefault(Client, client)
+        self.rows = size
+
+    def urls(self) -> Iterator[Tuple[str, str]]:
+        """Возвращает пары (метка, URL) для всех маршрутов crm/urls.py, кроме POST_ONLY."""
+        for pattern in urlpatterns:
+            name = pattern.name
+            if name in POST_ONLY:
+                continue
+            converters = pattern.pattern.converters
+            if "dataset" in converters:
+                for dataset in EXPORTS:
+                    yield f"{name}:{dataset}", reverse(name, args=[dataset])
+            elif "pk" in converters:
+                model = MODELS[name.split("_")[0]]
+                yield name, reverse(name, args=[self.anchors[model].pk])
+            elif converters:
+                continue  # маршруты с параметрами, для которых нет синтетических данных (отчеты профилирования)
+            else:
+                yield name, reverse(name)
+                if name in SEARCH_VIEWS:
+                    yield f"{name}?q", f"{reverse(name)}?q=Synthetic"
+
+    def measure(self) -> Dict[str, Tuple[int, Any]]:
+        """Запрашивает все URL (дочитывая потоковые ответы) и возвращает {метка: (статус, число SQL или "N+1")}."""
+        results: Dict[str, Tuple[int, Any]] = {}
+        for label, url in self.urls():
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+            except RepeatedQueriesError as e:
+                results[label] = (500, f"N+1: {e}")
+                continue
+            results[label] = (response.status_code, len(queries.captured_queries))
+        return results
+
+    def test_views_issue_constant_number_of_queries(self) -> None:
+        """Число SQL-запросов каждого представления не зависит от числа строк и не содержит N+1."""
+        # Опорные объекты уровня класса копируются: grow дополняет их только в пределах теста
+        self.anchors = dict(self.anchors)
+        self.client.force_login(self.user)
+        self.grow(SMALL)
+        small = self.measure()
+        self.grow(LARGE)
+        large = self.measure()
+
+        self.assertEqual(set(small), set(large))
+        for label, (status, count) in small.items():
+            with self.subTest(view=label):
+                self.assertIsInstance(count, int, count)
+                self.assertEqual(status, 200)
+                self.assertEqual(large[label][0], 200)
+                self.assertEqual(count, large[label][1], f"queries {count} -> {large[label][1]}")
@@ -1,4 +1,4 @@
-from .views import campaigns, clients, contracts, leads, services, stats
+from .views import campaigns, clients, contracts, exports, ingest, leads, metrics, profiles, services, stats
 from django.urls import path
 
 urlpatterns = [
@@ -16,6 +16,10 @@ urlpatterns = [
     path("campaigns/<int:pk>/delete/", campaigns.CampaignDeleteView.as_view(), name="campaign_delete"),
     # Leads
     path("leads/", leads.LeadListView.as_view(), name="lead_list"),
+    path("leads/ingest/", ingest.LeadIngestView.as_view(), name="lead_ingest"),
+    path("leads/bulk/", leads.LeadBulkActionView.as_view(), name="lead_bulk"),
+    path("leads/import/", leads.LeadImportView.as_view(), name="lead_import"),
+    path("leads/search/", leads.LeadSearchView.as_view(), name="lead_search"),
     path("leads/<int:pk>/", leads.LeadDetailView.as_view(), name="lead_detail"),
     path("leads/create/", leads.LeadCreateView.as_view(), name="lead_create"),
     path("leads/<int:pk>/update/", leads.LeadUpdateView.as_view(), name="lead_update"),
@@ -25,6 +29,7 @@ urlpatterns = [
     path("contracts/", contracts.ContractListView.as_view(), name="contract_list"),
     path("contracts/<int:pk>/", contracts.ContractDetailView.as_view(), name="contract_detail"),
     path("contracts/create/", contracts.ContractCreateView.as_view(), name="contract_create"),
+    path("contracts/<int:pk>/document/", contracts.ContractDocumentView.as_view(), name="contract_document"),
     path("contracts/<int:pk>/update/", contracts.ContractUpdateView.as_view(), name="contract_update"),
     path("contracts/<int:pk>/delete/", contracts.ContractDeleteView.as_view(), name="contract_delete"),
     # Clients
@@ -34,4 +39,11 @@ urlpatterns = [
     path("clients/<int:pk>/delete/", clients.ClientDeleteView.as_view(), name="client_delete"),
     # Stats
     path("stats/", stats.CampaignStatsView.as_view(), name="campaign_stats"),
+    # Exports
+    path("export/<str:dataset>/", exports.ExportView.as_view(), name="export"),
+    # Metrics
+    path("metrics/", metrics.MetricsView.as_view(), name="metrics"),
+    # Profiles
+    path("profiles/", profiles.ProfileListView.as_view(), name="profile_list"),
+    path("profiles/<str:report_id>/", profiles.ProfileDetailView.as_view(), name="profile_detail"),
 ]
@@ -2,6 +2,13 @@
 
 from crm.forms import CampaignForm
 from crm.models.campaigns import Campaign
+from crm.models.clients import Client
+from crm.models.contracts import Contract
+from crm.models.leads import Lead
+from crm.models.services import Service
+from crm.pagination import KeysetPaginationMixin
+from crm.permissions import RolePermissionMixin, ScopedQuerysetMixin
+from crm.replicas import ReplicaReadMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet
@@ -12,29 +19,33 @@ from django.views.generic import CreateView, DeleteView, DetailView, ListView, U
 from services.logging_utils import log_error, log_success, log_warning
 from typing import Any, Type
 
-class CampaignListView(LoginRequiredMixin, ListView):
+class CampaignListView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, KeysetPaginationMixin, ListView):
     """
     Представление для отображения списка маркетинговых кампаний.
 
     Доступно только для авторизованных пользователей.
+    Страницы выбираются курсором по (created_at, id) и кэшируются.
+    Счетчики лидов, клиентов и выручки читаются из сводки CampaignStats тем же запросом.
     """
 
     model: Type[Campaign] = Campaign
     template_name: str = "crm/campaign_list.html"
     context_object_name: str = "campaigns"
-    queryset: QuerySet[Campaign] = Campaign.objects.all()
+    queryset: QuerySet[Campaign] = Campaign.objects.select_related("service", "stats")
+    page_cache_name = "campaign_list"
+    page_cache_depends_on = (Campaign, Service, Lead, Client, Contract)
 
     def get_queryset(self) -> QuerySet[Campaign]:
         """Возвращает queryset кампаний с обработкой возможных ошибок."""
         try:
             return super().get_queryset()
         except Exception as e:
-            log_error(f"Ошибка при получении списка кампаний пользователем {self.request.user}: {str(e)}")
+            log_error("Ошибка при получении списка кампаний: %s", e, user=self.request.user)
             messages.error(self.request, "Произошла ошибка при загрузке списка кампаний.")
             return Campaign.objects.none()
 
 
-class CampaignDetailView(LoginRequiredMixin, DetailView):
+class CampaignDetailView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для детального просмотра информации о кампании.
 
@@ -49,15 +60,15 @@ class CampaignDetailView(LoginRequiredMixin, DetailView):
         """Обрабатывает GET-запрос с логированием и обработкой ошибок."""
         try:
             response = super().get(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} просмотрел кампанию {self.object.name}")
+            log_success("Пользователь просмотрел кампанию", user=request.user, obj=self.object)
             return response
         except Exception as e:
-            log_error(f"Ошибка при просмотре кампании пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при просмотре кампании: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при загрузке данных кампании.")
             return HttpResponseRedirect(reverse("campaign_list"))
 
 
-class CampaignCreateView(LoginRequiredMixin, CreateView):
+class CampaignCreateView(LoginRequiredMixin, RolePermissionMixin, CreateView):
     """
     Представление для создания новой кампании.
 
@@ -68,30 +79,24 @@ class CampaignCreateView(LoginRequiredMixin, CreateView):
     form_class: Type[CampaignForm] = CampaignForm
     template_name: str = "crm/campaign_form.html"
     success_url: str = reverse_lazy("campaign_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался создать кампанию без прав")
-            messages.error(request, "У вас недостаточно прав для создания кампаний.")
-            return HttpResponseRedirect(reverse("campaign_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "campaign.add"
+    permission_denied_message = "У вас недостаточно прав для создания кампаний."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного создания."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} создал кампанию: {self.object.name}")
+        log_success("Пользователь создал кампанию", user=self.request.user, obj=self.object)
         messages.success(self.request, "Кампания успешно создана!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог создать кампанию: {form.errors}")
+        log_warning("Пользователь не смог создать кампанию", user=self.request.user, errors=form.errors.get_json_data())
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class CampaignUpdateView(LoginRequiredMixin, UpdateView):
+class CampaignUpdateView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, UpdateView):
     """
     Представление для редактирования существующей кампании.
 
@@ -102,32 +107,29 @@ class CampaignUpdateView(LoginRequiredMixin, UpdateView):
     form_class: Type[CampaignForm] = CampaignForm
     template_name: str = "crm/campaign_form.html"
     success_url: str = reverse_lazy("campaign_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался редактировать кампанию без прав")
-            messages.error(request, "У вас недостаточно прав для редактирования кампаний.")
-            return HttpResponseRedirect(reverse("campaign_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "campaign.change"
+    permission_denied_message = "У вас недостаточно прав для редактирования кампаний."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного обновления."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} обновил кампанию: {self.object.name}")
+        log_success("Пользователь обновил кампанию", user=self.request.user, obj=self.object)
         messages.success(self.request, "Кампания успешно обновлена!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
         log_warning(
-            f"Пользователь {self.request.user} не смог обновить кампанию {self.get_object().name}: {form.errors}"
+            "Пользователь не смог обновить кампанию",
+            user=self.request.user,
+            obj=self.object,
+            errors=form.errors.get_json_data(),
         )
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class CampaignDeleteView(LoginRequiredMixin, DeleteView):
+class CampaignDeleteView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DeleteView):
     """
     Представление для удаления кампании.
 
@@ -137,25 +139,18 @@ class CampaignDeleteView(LoginRequiredMixin, DeleteView):
     model: Type[Campaign] = Campaign
     template_name: str = "crm/campaign_confirm_delete.html"
     success_url: str = reverse_lazy("campaign_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался удалить кампанию без прав")
-            messages.error(request, "У вас недостаточно прав для удаления кампаний.")
-            return HttpResponseRedirect(reverse("campaign_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "campaign.delete"
+    permission_denied_message = "У вас недостаточно прав для удаления кампаний."
 
     def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """Обрабатывает удаление кампании с логированием."""
         try:
             campaign = self.get_object()
-            campaign_name = campaign.name
             response = super().delete(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} удалил кампанию: {campaign_name}")
+            log_success("Пользователь удалил кампанию", user=request.user, obj=campaign)
             messages.success(request, "Кампания успешно удалена!")
             return response
         except Exception as e:
-            log_error(f"Ошибка при удалении кампании пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при удалении кампании: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при удалении кампании.")
             return HttpResponseRedirect(reverse("campaign_list"))
@@ -2,6 +2,9 @@
 
 from crm.forms import ClientForm
 from crm.models.clients import Client
+from crm.pagination import KeysetPaginationMixin
+from crm.permissions import RolePermissionMixin, ScopedQuerysetMixin
+from crm.replicas import ReplicaReadMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet
@@ -12,29 +15,30 @@ from django.views.generic import DeleteView, DetailView, ListView, UpdateView
 from services.logging_utils import log_error, log_success, log_warning
 from typing import Any, Type
 
-class ClientListView(LoginRequiredMixin, ListView):
+class ClientListView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, KeysetPaginationMixin, ListView):
     """
     Представление для отображения списка клиентов.
 
     Доступно только для авторизованных пользователей.
+    Страницы выбираются курсором по (created_at, id).
     """
 
     model: Type[Client] = Client
     template_name: str = "crm/client_list.html"
     context_object_name: str = "clients"
-    queryset: QuerySet[Client] = Client.objects.select_related("lead")
+    queryset: QuerySet[Client] = Client.objects.select_related("lead", "contract")
 
     def get_queryset(self) -> QuerySet[Client]:
         """Возвращает queryset клиентов с обработкой возможных ошибок."""
         try:
             return super().get_queryset()
         except Exception as e:
-            log_error(f"Ошибка при загрузке списка клиентов пользователем {self.request.user}: {str(e)}")
+            log_error("Ошибка при загрузке списка клиентов: %s", e, user=self.request.user)
             messages.error(self.request, "Произошла ошибка при загрузке списка клиентов.")
             return Client.objects.none()
 
 
-class ClientDetailView(LoginRequiredMixin, DetailView):
+class ClientDetailView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для детального просмотра информации о клиенте.
 
@@ -51,15 +55,15 @@ class ClientDetailView(LoginRequiredMixin, DetailView):
             response = super().get(request, *args, **kwargs)
             client = self.object
             # Используем строковое представление клиента или конкретные поля
-            log_success(f"Пользователь {request.user} просмотрел клиента {client}")
+            log_success("Пользователь просмотрел клиента", user=request.user, obj=client)
             return response
         except Exception as e:
-            log_error(f"Ошибка при просмотре клиента пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при просмотре клиента: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при загрузке данных клиента.")
             return HttpResponseRedirect(reverse("client_list"))
 
 
-class ClientUpdateView(LoginRequiredMixin, UpdateView):
+class ClientUpdateView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, UpdateView):
     """
     Представление для редактирования данных клиента.
 
@@ -71,31 +75,27 @@ class ClientUpdateView(LoginRequiredMixin, UpdateView):
     template_name: str = "crm/client_form.html"
     context_object_name: str = "client"
     success_url: str = reverse_lazy("client_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался редактировать клиента без прав")
-            messages.error(request, "У вас недостаточно прав для редактирования клиентов.")
-            return HttpResponseRedirect(reverse("client_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "client.change"
+    permission_denied_message = "У вас недостаточно прав для редактирования клиентов."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного обновления."""
         response = super().form_valid(form)
         client = self.object
-        log_success(f"Пользователь {self.request.user} обновил данные клиента {client}")
+        log_success("Пользователь обновил данные клиента", user=self.request.user, obj=client)
         messages.success(self.request, "Данные клиента успешно обновлены!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог обновить данные клиента: {form.errors}")
+        log_warning(
+            "Пользователь не смог обновить данные клиента", user=self.request.user, errors=form.errors.get_json_data()
+        )
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class ClientDeleteView(LoginRequiredMixin, DeleteView):
+class ClientDeleteView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DeleteView):
     """
     Представление для удаления клиента.
 
@@ -107,14 +107,8 @@ class ClientDeleteView(LoginRequiredMixin, DeleteView):
     template_name: str = "crm/client_confirm_delete.html"
     success_url: str = reverse_lazy("client_list")
     context_object_name: str = "client"
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался удалить клиента без прав")
-            messages.error(request, "У вас недостаточно прав для удаления клиентов.")
-            return HttpResponseRedirect(reverse("client_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "client.delete"
+    permission_denied_message = "У вас недостаточно прав для удаления клиентов."
 
     def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """Обрабатывает удаление клиента с обновлением связанного лида и логированием."""
@@ -128,14 +122,14 @@ class ClientDeleteView(LoginRequiredMixin, DeleteView):
             if lead:
                 lead.is_converted = False
                 lead.save()
-                log_success(f"Пользователь {request.user} удалил клиента {client} и сбросил статус лида")
+                log_success("Пользователь удалил клиента и сбросил статус лида", user=request.user, obj=client)
                 messages.success(request, "Клиент успешно удален! Статус лида сброшен.")
             else:
-                log_success(f"Пользователь {request.user} удалил клиента {client} (без связанного лида)")
+                log_success("Пользователь удалил клиента (без связанного лида)", user=request.user, obj=client)
                 messages.success(request, "Клиент успешно удален!")
 
             return response
         except Exception as e:
-            log_error(f"Ошибка при удалении клиента пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при удалении клиента: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при удалении клиента.")
             return HttpResponseRedirect(reverse("client_list"))
@@ -1,22 +1,30 @@
 """Views для работы с договорами."""
 
+from crm.downloads import serve_file
 from crm.forms import ContractForm
 from crm.models.contracts import Contract
+from crm.pagination import KeysetPaginationMixin
+from crm.permissions import RolePermissionMixin, ScopedQuerysetMixin
+from crm.replicas import ReplicaReadMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet
 from django.forms import BaseModelForm
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
 from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
+from django.views.generic.detail import SingleObjectMixin
+import os
 from services.logging_utils import log_error, log_success, log_warning
 from typing import Any, Type
 
-class ContractListView(LoginRequiredMixin, ListView):
+class ContractListView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, KeysetPaginationMixin, ListView):
     """
     Представление для отображения списка договоров.
 
     Доступно только для авторизованных пользователей.
+    Страницы выбираются курсором по (created_at, id).
     """
 
     model: Type[Contract] = Contract
@@ -27,14 +35,14 @@ class ContractListView(LoginRequiredMixin, ListView):
         """Возвращает оптимизированный queryset договоров с обработкой ошибок."""
         try:
             # Используем только существующие связи (service)
-            return Contract.objects.select_related("service")
+            return super().get_queryset().select_related("service")
         except Exception as e:
-            log_error(f"Ошибка при загрузке списка договоров пользователем {self.request.user}: {str(e)}")
+            log_error("Ошибка при загрузке списка договоров: %s", e, user=self.request.user)
             messages.error(self.request, "Произошла ошибка при загрузке списка договоров.")
             return Contract.objects.none()
 
 
-class ContractDetailView(LoginRequiredMixin, DetailView):
+class ContractDetailView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для детального просмотра договора.
 
@@ -49,15 +57,47 @@ class ContractDetailView(LoginRequiredMixin, DetailView):
         """Обрабатывает GET-запрос с логированием и обработкой ошибок."""
         try:
             response = super().get(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} просмотрел договор {self.object}")
+            log_success("Пользователь просмотрел договор", user=request.user, obj=self.object)
             return response
         except Exception as e:
-            log_error(f"Ошибка при просмотре договора пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при просмотре договора: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при загрузке данных договора.")
             return HttpResponseRedirect(reverse("contract_list"))
 
 
-class ContractCreateView(LoginRequiredMixin, CreateView):
+class ContractDocumentView(
+    LoginRequiredMixin, RolePermissionMixin, ReplicaReadMixin, ScopedQuerysetMixin, SingleObjectMixin, View
+):
+    """
+    Представление для скачивания документа договора.
+
+    Доступно только для менеджеров и администраторов. Файл отдает веб-сервер (X-Accel-Redirect, X-Sendfile)
+    или, без прокси, сам Django потоково с поддержкой Range и ETag (см. crm.downloads).
+    """
+
+    model: Type[Contract] = Contract
+    permission = "contract.download"
+    permission_denied_message = "У вас недостаточно прав для скачивания документов договоров."
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Проверяет наличие документа и передает его отдачу crm.downloads.serve_file."""
+        contract = self.get_object()
+        if not contract.document:
+            raise Http404("У договора нет документа.")
+        # Файлы хранятся под хэшем содержимого: браузеру отдается название договора
+        extension = os.path.splitext(contract.document.name)[1]
+        response = serve_file(request, contract.document, filename=f"{contract.name}{extension}")
+        if response.status_code in (200, 206):
+            log_success(
+                "Пользователь скачал документ договора",
+                user=request.user,
+                obj=contract,
+                range=request.headers.get("Range", ""),
+            )
+        return response
+
+
+class ContractCreateView(LoginRequiredMixin, RolePermissionMixin, CreateView):
     """
     Представление для создания нового договора.
 
@@ -68,14 +108,8 @@ class ContractCreateView(LoginRequiredMixin, CreateView):
     form_class: Type[ContractForm] = ContractForm
     template_name: str = "crm/contract_form.html"
     success_url: str = reverse_lazy("contract_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался создать договор без прав")
-            messages.error(request, "У вас недостаточно прав для создания договоров.")
-            return HttpResponseRedirect(reverse("contract_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "contract.add"
+    permission_denied_message = "У вас недостаточно прав для создания договоров."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного создания."""
@@ -84,18 +118,18 @@ class ContractCreateView(LoginRequiredMixin, CreateView):
         contract.save()
         form.save_m2m()  # Сохраняем связи many-to-many
 
-        log_success(f"Пользователь {self.request.user} создал договор {contract}")
+        log_success("Пользователь создал договор", user=self.request.user, obj=contract)
         messages.success(self.request, "Договор успешно создан!")
         return super().form_valid(form)
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог создать договор: {form.errors}")
+        log_warning("Пользователь не смог создать договор", user=self.request.user, errors=form.errors.get_json_data())
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class ContractUpdateView(LoginRequiredMixin, UpdateView):
+class ContractUpdateView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, UpdateView):
     """
     Представление для редактирования договора.
 
@@ -106,30 +140,29 @@ class ContractUpdateView(LoginRequiredMixin, UpdateView):
     form_class: Type[ContractForm] = ContractForm
     template_name: str = "crm/contract_form.html"
     success_url: str = reverse_lazy("contract_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался редактировать договор без прав")
-            messages.error(request, "У вас недостаточно прав для редактирования договоров.")
-            return HttpResponseRedirect(reverse("contract_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "contract.change"
+    permission_denied_message = "У вас недостаточно прав для редактирования договоров."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного обновления."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} обновил договор {self.object}")
+        log_success("Пользователь обновил договор", user=self.request.user, obj=self.object)
         messages.success(self.request, "Договор успешно обновлен!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог обновить договор {self.object}: {form.errors}")
+        log_warning(
+            "Пользователь не смог обновить договор",
+            user=self.request.user,
+            obj=self.object,
+            errors=form.errors.get_json_data(),
+        )
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class ContractDeleteView(LoginRequiredMixin, DeleteView):
+class ContractDeleteView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DeleteView):
     """
     Представление для удаления договора.
 
@@ -139,25 +172,18 @@ class ContractDeleteView(LoginRequiredMixin, DeleteView):
     model: Type[Contract] = Contract
     template_name: str = "crm/contract_confirm_delete.html"
     success_url: str = reverse_lazy("contract_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался удалить договор без прав")
-            messages.error(request, "У вас недостаточно прав для удаления договоров.")
-            return HttpResponseRedirect(reverse("contract_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "contract.delete"
+    permission_denied_message = "У вас недостаточно прав для удаления договоров."
 
     def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """Обрабатывает удаление договора с логированием."""
         try:
             contract = self.get_object()
-            contract_str = str(contract)
             response = super().delete(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} удалил договор {contract_str}")
+            log_success("Пользователь удалил договор", user=request.user, obj=contract)
             messages.success(request, "Договор успешно удален!")
             return response
         except Exception as e:
-            log_error(f"Ошибка при удалении договора пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при удалении договора: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при удалении договора.")
             return HttpResponseRedirect(reverse("contract_list"))
@@ -0,0 +1,63 @@
+"""Views для потоковой выгрузки данных CRM."""
+
+from crm.exports import EXPORTS, FORMATS, stream_export
+from crm.forms import ExportFilterForm
+from crm.permissions import has_permission, row_filter
+from crm.replicas import ReplicaReadMixin
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+from services.logging_utils import log_success, log_warning
+from typing import Any
+
+class ExportView(LoginRequiredMixin, ReplicaReadMixin, View):
+    """
+    Представление для выгрузки лидов, клиентов или договоров в CSV/JSON Lines.
+
+    Ответ формируется потоково (StreamingHttpResponse), при gzip=1 сжимается на лету.
+    Параметры GET: format (csv, jsonl), gzip, date_from, date_to, campaign.
+    Права на наборы и видимость строк задаются политикой доступа (crm.permissions): лиды доступны операторам,
+    клиенты и договоры — менеджерам; администраторам — все наборы.
+    """
+
+    def get(self, request: HttpRequest, dataset: str, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Отдает выгрузку набора dataset с учетом фильтров."""
+        spec = EXPORTS.get(dataset)
+        if spec is None:
+            raise Http404("Неизвестный набор данных для выгрузки.")
+        if not has_permission(request, spec.permission):
+            log_warning("Пользователь попытался выгрузить %s без прав", dataset, user=request.user)
+            messages.error(request, "У вас недостаточно прав для выгрузки этих данных.")
+            return HttpResponseRedirect(reverse("home"))
+
+        form = ExportFilterForm(request.GET)
+        if not form.is_valid():
+            log_warning(
+                "Пользователь запросил выгрузку %s с ошибками",
+                dataset,
+                user=request.user,
+                errors=form.errors.get_json_data(),
+            )
+            return HttpResponse(form.errors.as_text(), status=400, content_type="text/plain; charset=utf-8")
+
+        fmt = form.cleaned_data["format"] or "csv"
+        compress = form.cleaned_data["gzip"]
+        response = StreamingHttpResponse(
+            stream_export(
+                dataset,
+                fmt=fmt,
+                compress=compress,
+                date_from=form.cleaned_data["date_from"],
+                date_to=form.cleaned_data["date_to"],
+                campaign_id=form.cleaned_data["campaign"],
+                condition=row_filter(request, spec.model),
+            ),
+            content_type="application/gzip" if compress else f"{FORMATS[fmt]}; charset=utf-8",
+        )
+        filename = f"{dataset}-{timezone.localdate():%Y%m%d}.{fmt}" + (".gz" if compress else "")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        log_success("Пользователь начал выгрузку %s", dataset, user=request.user, params=request.GET.urlencode())
+        return response
@@ -0,0 +1,72 @@
+"""Views для приема лидов от рекламных систем."""
+
+from crm.ingest import CREATED, DUPLICATE, get_buffer, validate_lead
+from django.conf import settings
+from django.http import HttpRequest, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import json
+from services.logging_utils import log_error, log_success, log_warning
+from services.utils import has_bearer_token
+from typing import Any, Dict, List
+
+@method_decorator(csrf_exempt, name="dispatch")
+class LeadIngestView(View):
+    """
+    Асинхронный JSON-эндпоинт приема лидов.
+
+    Принимает один лид или пакет (список либо {"leads": [...]}) с полями
+    external_id, full_name, phone, email, campaign (id). Авторизация — заголовок
+    "Authorization: Bearer <токен>" с одним из токенов CRM_INGEST_TOKENS.
+    В ответе — итоги и статус каждого лида по его позиции в запросе.
+    """
+
+    async def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        """Проверяет и принимает лиды."""
+        if not has_bearer_token(request, settings.CRM_INGEST_TOKENS):
+            log_warning(
+                "Отклонен запрос приема лидов без действительного токена", remote_addr=request.META.get("REMOTE_ADDR")
+            )
+            return JsonResponse({"error": "Недействительный токен."}, status=401)
+
+        try:
+            payload = json.loads(request.body)
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({"error": "Тело запроса должно быть JSON."}, status=400)
+        leads = payload.get("leads") if isinstance(payload, dict) and "leads" in payload else payload
+        if not isinstance(leads, list):
+            leads = [leads]
+        if len(leads) > settings.CRM_INGEST_MAX_LEADS:
+            return JsonResponse({"error": f"Не более {settings.CRM_INGEST_MAX_LEADS} лидов в запросе."}, status=413)
+
+        results: List[Dict[str, Any]] = [{"index": index} for index in range(len(leads))]
+        valid: List[Dict[str, Any]] = []
+        positions: List[int] = []
+        for index, data in enumerate(leads):
+            values, errors = validate_lead(data)
+            if values is None:
+                results[index].update(status="invalid", errors=errors)
+            else:
+                valid.append(values)
+                positions.append(index)
+
+        try:
+            statuses = await get_buffer().submit(valid) if valid else []
+        except Exception as e:
+            log_error("Ошибка при приеме лидов: %s", e)
+            return JsonResponse({"error": "Произошла ошибка при сохранении лидов."}, status=503)
+
+        for index, status in zip(positions, statuses, strict=True):
+            results[index].update(status=status, external_id=leads[index]["external_id"])
+        created, duplicates = statuses.count(CREATED), statuses.count(DUPLICATE)
+        log_success("Прием лидов", received=len(leads), created=created, duplicates=duplicates)
+        return JsonResponse(
+            {
+                "received": len(leads),
+                "created": created,
+                "duplicates": duplicates,
+                "rejected": len(leads) - created - duplicates,
+                "results": results,
+            }
+        )
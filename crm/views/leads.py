@@ -1,24 +1,35 @@
 """Views для работы с потенциальными клиентами (лидами)."""
 
-from crm.forms import ClientForm, LeadForm
+from crm.audit import record
+from crm.bulk import bulk_convert_leads, bulk_delete_leads, bulk_reassign_leads
+from crm.forms import ClientForm, LeadBulkActionForm, LeadForm, LeadImportForm
+from crm.imports import import_leads
+from crm.models.audit import AuditEvent
 from crm.models.contracts import Contract
 from crm.models.leads import Lead
+from crm.pagination import KeysetPaginationMixin
+from crm.permissions import RolePermissionMixin, ScopedQuerysetMixin, has_permission, row_filter, scope_queryset
+from crm.replicas import ReplicaReadMixin
+from crm.search import search_leads
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet
 from django.forms import BaseModelForm
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
-from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
+from django.views import View
+from django.views.generic import CreateView, DeleteView, DetailView, FormView, ListView, UpdateView
+import io
 from services.logging_utils import log_error, log_success, log_warning
-from typing import Any, Dict, Type
+from typing import Any, Dict, List, Optional, Type, Union
 
-class LeadListView(LoginRequiredMixin, ListView):
+class LeadListView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, KeysetPaginationMixin, ListView):
     """
     Представление для отображения списка потенциальных клиентов (лидов).
 
     Доступно только для авторизованных пользователей.
+    Страницы выбираются курсором по (created_at, id).
     """
 
     model: Type[Lead] = Lead
@@ -26,17 +37,123 @@ class LeadListView(LoginRequiredMixin, ListView):
     context_object_name: str = "leads"
     queryset = Lead.objects.select_related("campaign")  # Оптимизация: уменьшаем количество запросов к БД
 
-    def get_queryset(self) -> QuerySet[Lead]:
-        """Возвращает queryset лидов с обработкой возможных ошибок."""
+    def get_search_query(self) -> str:
+        """Возвращает строку поиска из GET-параметра q."""
+        return self.request.GET.get("q", "").strip()
+
+    def get_paginate_by(self, queryset: Any) -> Optional[int]:
+        """Отключает пагинацию для результатов поиска: они ограничены и ранжированы."""
+        return None if self.get_search_query() else super().get_paginate_by(queryset)
+
+    def get_queryset(self) -> Union[QuerySet[Lead], List[Lead]]:
+        """Возвращает queryset лидов или результаты поиска с обработкой возможных ошибок."""
         try:
+            query = self.get_search_query()
+            if query:
+                return search_leads(query, queryset=super().get_queryset())
             return super().get_queryset()
         except Exception as e:
-            log_error(f"Ошибка при загрузке списка лидов пользователем {self.request.user}: {str(e)}")
+            log_error("Ошибка при загрузке списка лидов: %s", e, user=self.request.user)
             messages.error(self.request, "Произошла ошибка при загрузке списка потенциальных клиентов.")
             return Lead.objects.none()
 
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        """Добавляет в контекст строку поиска."""
+        context: Dict[str, Any] = super().get_context_data(**kwargs)
+        context["search_query"] = self.get_search_query()
+        context["bulk_form"] = LeadBulkActionForm()
+        return context
+
+
+class LeadSearchView(LoginRequiredMixin, ReplicaReadMixin, View):
+    """
+    JSON-эндпоинт быстрого поиска лидов по имени, фрагменту телефона или email.
+
+    Доступно только для авторизованных пользователей.
+    """
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        """Возвращает ранжированный список найденных лидов."""
+        try:
+            queryset = scope_queryset(request, Lead.objects.select_related("campaign"))
+            leads = search_leads(request.GET.get("q", ""), queryset=queryset)
+        except Exception as e:
+            log_error("Ошибка при поиске лидов: %s", e, user=request.user)
+            return JsonResponse({"error": "Произошла ошибка при поиске."}, status=500)
+        results = [
+            {
+                "id": lead.pk,
+                "full_name": lead.full_name,
+                "phone": lead.phone,
+                "email": lead.email,
+                "campaign": lead.campaign.name,
+                "is_converted": lead.is_converted,
+                "score": round(lead.search_score, 4),
+                "url": reverse("lead_detail", kwargs={"pk": lead.pk}),
+            }
+            for lead in leads
+        ]
+        return JsonResponse({"results": results})
+
+
+class LeadBulkActionView(LoginRequiredMixin, View):
+    """
+    Представление для массовых действий над выбранными лидами.
+
+    Права на действия задаются политикой доступа (crm.permissions): конвертация — как у одиночной
+    конвертации, перенос в другую кампанию — как у редактирования, удаление — как у удаления лида.
+    Лиды вне видимости пользователя отбрасываются. Каждое действие выполняется в одной транзакции.
+    """
+
+    PERMISSIONS: Dict[str, str] = {
+        "convert": "lead.convert",
+        "reassign": "lead.change",
+        "delete": "lead.delete",
+    }
+
+    def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Проверяет форму и права пользователя и выполняет выбранное действие."""
+        form = LeadBulkActionForm(request.POST)
+        if not form.is_valid():
+            log_warning(
+                "Пользователь отправил некорректное массовое действие",
+                user=request.user,
+                errors=form.errors.get_json_data(),
+            )
+            for errors in form.errors.values():
+                messages.error(request, " ".join(errors))
+            return HttpResponseRedirect(reverse("lead_list"))
+
+        action, lead_ids = form.cleaned_data["action"], form.cleaned_data["leads"]
+        if not has_permission(request, self.PERMISSIONS[action]):
+            log_warning("Пользователь попытался выполнить массовое действие %s без прав", action, user=request.user)
+            messages.error(request, "У вас недостаточно прав для этого действия.")
+            return HttpResponseRedirect(reverse("lead_list"))
+
+        condition = row_filter(request, Lead)
+        if condition is not None:
+            lead_ids = list(Lead.objects.filter(condition, pk__in=lead_ids).values_list("pk", flat=True))
+
+        try:
+            if action == "convert":
+                count = bulk_convert_leads(lead_ids, form.cleaned_data["contract"])
+                messages.success(request, f"Конвертировано потенциальных клиентов: {count}.")
+            elif action == "reassign":
+                count = bulk_reassign_leads(lead_ids, form.cleaned_data["campaign"])
+                messages.success(request, f"Перенесено потенциальных клиентов: {count}.")
+            else:
+                count, skipped = bulk_delete_leads(lead_ids)
+                messages.success(request, f"Удалено потенциальных клиентов: {count}.")
+                if skipped:
+                    messages.warning(request, f"Пропущено (уже клиенты или не найдены): {skipped}.")
+            log_success("Пользователь выполнил массовое действие %s", action, user=request.user, count=count)
+        except Exception as e:
+            log_error("Ошибка при массовом действии %s: %s", action, e, user=request.user)
+            messages.error(request, "Произошла ошибка при выполнении массового действия.")
+        return HttpResponseRedirect(reverse("lead_list"))
+
 
-class LeadDetailView(LoginRequiredMixin, DetailView):
+class LeadDetailView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для детального просмотра информации о потенциальном клиенте (лиде).
 
@@ -51,15 +168,15 @@ class LeadDetailView(LoginRequiredMixin, DetailView):
         """Обрабатывает GET-запрос с логированием и обработкой ошибок."""
         try:
             response = super().get(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} просмотрел лида {self.object}")
+            log_success("Пользователь просмотрел лида", user=request.user, obj=self.object)
             return response
         except Exception as e:
-            log_error(f"Ошибка при просмотре лида пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при просмотре лида: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при загрузке данных потенциального клиента.")
             return HttpResponseRedirect(reverse("lead_list"))
 
 
-class LeadCreateView(LoginRequiredMixin, CreateView):
+class LeadCreateView(LoginRequiredMixin, RolePermissionMixin, CreateView):
     """
     Представление для создания нового лида.
 
@@ -70,30 +187,68 @@ class LeadCreateView(LoginRequiredMixin, CreateView):
     form_class: Type[LeadForm] = LeadForm
     template_name: str = "crm/lead_form.html"
     success_url = reverse_lazy("lead_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_operator or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался создать лид без прав")
-            messages.error(request, "У вас недостаточно прав для создания потенциальных клиентов.")
-            return HttpResponseRedirect(reverse("lead_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "lead.add"
+    permission_denied_message = "У вас недостаточно прав для создания потенциальных клиентов."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного создания."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} создал новый лид: {self.object}")
+        log_success("Пользователь создал новый лид", user=self.request.user, obj=self.object)
         messages.success(self.request, "Потенциальный клиент успешно создан!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог создать лид: {form.errors}")
+        log_warning("Пользователь не смог создать лид", user=self.request.user, errors=form.errors.get_json_data())
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class LeadUpdateView(LoginRequiredMixin, UpdateView):
+class LeadImportView(LoginRequiredMixin, RolePermissionMixin, FormView):
+    """
+    Представление для массовой загрузки лидов из CSV-файла.
+
+    Файл обрабатывается потоково (см. crm.imports), после загрузки показывается отчет
+    с количеством созданных лидов и ошибками по строкам.
+    Доступно только для операторов и администраторов.
+    """
+
+    form_class: Type[LeadImportForm] = LeadImportForm
+    template_name: str = "crm/lead_import.html"
+    permission = "lead.import"
+    permission_denied_message = "У вас недостаточно прав для импорта потенциальных клиентов."
+
+    def form_valid(self, form: LeadImportForm) -> HttpResponse:
+        """Импортирует загруженный файл и показывает отчет."""
+        upload = form.cleaned_data["file"]
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            report = import_leads(stream)
+        except (ValueError, UnicodeDecodeError) as e:
+            log_warning("Некорректный файл лидов %s: %s", upload.name, e, user=self.request.user)
+            form.add_error("file", f"Не удалось прочитать файл: {str(e)}")
+            return self.form_invalid(form)
+        except Exception as e:
+            log_error("Ошибка при импорте лидов: %s", e, user=self.request.user)
+            messages.error(self.request, "Произошла ошибка при импорте потенциальных клиентов.")
+            return HttpResponseRedirect(reverse("lead_import"))
+
+        record(AuditEvent.Action.IMPORT, Lead, None, file=upload.name, created=report.created, failed=report.failed)
+        log_success(
+            "Пользователь импортировал лиды из %s",
+            upload.name,
+            user=self.request.user,
+            created=report.created,
+            failed=report.failed,
+        )
+        if report.failed:
+            messages.warning(self.request, f"Создано лидов: {report.created}, отклонено строк: {report.failed}.")
+        else:
+            messages.success(self.request, f"Создано лидов: {report.created}.")
+        return self.render_to_response(self.get_context_data(form=self.form_class(), report=report))
+
+
+class LeadUpdateView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, UpdateView):
     """
     Представление для редактирования лида.
 
@@ -104,30 +259,29 @@ class LeadUpdateView(LoginRequiredMixin, UpdateView):
     form_class: Type[LeadForm] = LeadForm
     template_name: str = "crm/lead_form.html"
     success_url = reverse_lazy("lead_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_operator or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался редактировать лид без прав")
-            messages.error(request, "У вас недостаточно прав для редактирования потенциальных клиентов.")
-            return HttpResponseRedirect(reverse("lead_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "lead.change"
+    permission_denied_message = "У вас недостаточно прав для редактирования потенциальных клиентов."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного обновления."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} обновил лида {self.object}")
+        log_success("Пользователь обновил лида", user=self.request.user, obj=self.object)
         messages.success(self.request, "Данные потенциального клиента успешно обновлены!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог обновить лида {self.object}: {form.errors}")
+        log_warning(
+            "Пользователь не смог обновить лида",
+            user=self.request.user,
+            obj=self.object,
+            errors=form.errors.get_json_data(),
+        )
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class LeadDeleteView(LoginRequiredMixin, DeleteView):
+class LeadDeleteView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DeleteView):
     """
     Представление для удаления лида.
 
@@ -137,31 +291,24 @@ class LeadDeleteView(LoginRequiredMixin, DeleteView):
     model: Type[Lead] = Lead
     template_name: str = "crm/lead_confirm_delete.html"
     success_url: str = reverse_lazy("lead_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_operator or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался удалить лид без прав")
-            messages.error(request, "У вас недостаточно прав для удаления потенциальных клиентов.")
-            return HttpResponseRedirect(reverse("lead_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "lead.delete"
+    permission_denied_message = "У вас недостаточно прав для удаления потенциальных клиентов."
 
     def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """Обрабатывает удаление лида с логированием."""
         try:
             lead = self.get_object()
-            lead_str = str(lead)
             response = super().delete(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} удалил лида {lead_str}")
+            log_success("Пользователь удалил лида", user=request.user, obj=lead)
             messages.success(request, "Потенциальный клиент успешно удален!")
             return response
         except Exception as e:
-            log_error(f"Ошибка при удалении лида пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при удалении лида: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при удалении потенциального клиента.")
             return HttpResponseRedirect(reverse("lead_list"))
 
 
-class LeadConvertView(LoginRequiredMixin, DetailView):
+class LeadConvertView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для конвертации лида в активного клиента.
 
@@ -171,19 +318,13 @@ class LeadConvertView(LoginRequiredMixin, DetailView):
     model: Type[Lead] = Lead
     template_name: str = "crm/lead_convert.html"
     context_object_name: str = "lead"
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_manager or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался конвертировать лид без прав")
-            messages.error(request, "У вас недостаточно прав для конвертации потенциальных клиентов.")
-            return HttpResponseRedirect(reverse("lead_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "lead.convert"
+    permission_denied_message = "У вас недостаточно прав для конвертации потенциальных клиентов."
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         """Добавляет в контекст список договоров и форму для создания клиента."""
         context: Dict[str, Any] = super().get_context_data(**kwargs)
-        context["contracts"] = Contract.objects.all()
+        context["contracts"] = scope_queryset(self.request, Contract.objects.all())
         context["form"] = ClientForm(initial={"lead": self.object})
         return context
 
@@ -200,16 +341,22 @@ class LeadConvertView(LoginRequiredMixin, DetailView):
 
                 lead.is_converted = True
                 lead.save()
+                record(AuditEvent.Action.CONVERT, Lead, lead.pk, client_id=client.pk, contract_id=client.contract_id)
 
-                log_success(f"Пользователь {request.user} конвертировал лида {lead} в клиента {client}")
+                log_success("Пользователь конвертировал лида в клиента", user=request.user, obj=client, lead_id=lead.pk)
                 messages.success(request, "Потенциальный клиент успешно конвертирован в активного клиента!")
                 return redirect("client_list")
 
-            log_warning(f"Пользователь {request.user} не смог конвертировать лида {lead}: {form.errors}")
+            log_warning(
+                "Пользователь не смог конвертировать лида",
+                user=request.user,
+                obj=lead,
+                errors=form.errors.get_json_data(),
+            )
             messages.error(request, "Ошибка при конвертации. Проверьте данные формы.")
             return self.render_to_response(self.get_context_data(form=form))
 
         except Exception as e:
-            log_error(f"Ошибка при конвертации лида пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при конвертации лида: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при конвертации потенциального клиента.")
             return HttpResponseRedirect(reverse("lead_detail", kwargs={"pk": lead.pk}))
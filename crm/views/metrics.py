@@ -0,0 +1,27 @@
+"""Views для метрик запросов."""
+
+from crm.metrics import CONTENT_TYPE, collect, render_prometheus
+from crm.permissions import has_permission
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.views import View
+from services.logging_utils import log_warning
+from services.utils import has_bearer_token
+from typing import Any
+
+class MetricsView(View):
+    """
+    Эндпоинт метрик в текстовом формате Prometheus.
+
+    Доступен администраторам CRM (по сессии) и сборщику метрик по заголовку
+    "Authorization: Bearer <токен>" с одним из токенов CRM_METRICS_TOKENS.
+    """
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Возвращает метрики всех воркеров."""
+        if not (has_bearer_token(request, settings.CRM_METRICS_TOKENS) or has_permission(request, "metrics.view")):
+            log_warning(
+                "Отклонен запрос метрик без прав", user=request.user, remote_addr=request.META.get("REMOTE_ADDR")
+            )
+            return HttpResponse("Недостаточно прав.", status=403, content_type="text/plain; charset=utf-8")
+        return HttpResponse(render_prometheus(collect()), content_type=CONTENT_TYPE)
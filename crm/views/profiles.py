@@ -0,0 +1,56 @@
+"""Views для просмотра отчетов профилирования запросов."""
+
+from crm.permissions import RolePermissionMixin
+from crm.profiling import PROFILE_PARAM, list_reports, load_report
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404
+from django.views.generic import TemplateView
+from services.logging_utils import log_error
+from typing import Any, Dict
+
+class ProfileListView(LoginRequiredMixin, RolePermissionMixin, TemplateView):
+    """
+    Представление для отображения списка отчетов профилирования.
+
+    Доступно только администраторам.
+    """
+
+    template_name = "crm/profile_list.html"
+    permission = "profile.view"
+    permission_denied_message = "У вас недостаточно прав для просмотра отчетов профилирования."
+    permission_denied_url = "home"
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        """Добавляет в контекст сводки отчетов."""
+        context: Dict[str, Any] = super().get_context_data(**kwargs)
+        context["profile_param"] = PROFILE_PARAM
+        try:
+            context["reports"] = list_reports()
+        except OSError as e:
+            log_error("Ошибка при чтении отчетов профилирования: %s", e, user=self.request.user)
+            messages.error(self.request, "Не удалось прочитать отчеты профилирования.")
+            context["reports"] = []
+        return context
+
+
+class ProfileDetailView(LoginRequiredMixin, RolePermissionMixin, TemplateView):
+    """
+    Представление для отображения отчета профилирования: SQL-запросы с местами вызова и профиль функций.
+
+    Доступно только администраторам.
+    """
+
+    template_name = "crm/profile_detail.html"
+    permission = "profile.view"
+    permission_denied_message = "У вас недостаточно прав для просмотра отчетов профилирования."
+    permission_denied_url = "home"
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        """Добавляет в контекст отчет."""
+        context: Dict[str, Any] = super().get_context_data(**kwargs)
+        report = load_report(kwargs["report_id"])
+        if report is None:
+            raise Http404("Отчет не найден")
+        context["report"] = report
+        return context
@@ -1,7 +1,14 @@
 """Views для работы с услугами."""
 
 from crm.forms import ServiceForm
+from crm.models.campaigns import Campaign
+from crm.models.clients import Client
+from crm.models.contracts import Contract
+from crm.models.leads import Lead
 from crm.models.services import Service
+from crm.pagination import KeysetPaginationMixin
+from crm.permissions import RolePermissionMixin, ScopedQuerysetMixin
+from crm.replicas import ReplicaReadMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet
@@ -13,29 +20,35 @@ from django.views.generic import CreateView, DeleteView, DetailView, ListView, U
 from services.logging_utils import log_error, log_success, log_warning
 from typing import Any, Type
 
-class ServiceListView(LoginRequiredMixin, ListView):
+class ServiceListView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, KeysetPaginationMixin, ListView):
     """
     Представление для отображения списка услуг.
 
     Доступно только для авторизованных пользователей.
+    Страницы выбираются курсором по (name, id) и кэшируются.
+    Счетчики кампаний, лидов, клиентов и выручки читаются из сводки ServiceStats тем же запросом.
     """
 
     model: Type[Service] = Service
     template_name: str = "crm/service_list.html"
     context_object_name: str = "services"
+    queryset: QuerySet[Service] = Service.objects.select_related("stats")
     paginate_by = 20  # Оптимизация: добавляем пагинацию для больших списков
+    keyset_fields = ("name", "id")
+    page_cache_name = "service_list"
+    page_cache_depends_on = (Service, Campaign, Lead, Client, Contract)
 
     def get_queryset(self) -> QuerySet[Service]:
         """Возвращает оптимизированный queryset услуг с обработкой ошибок."""
         try:
-            return Service.objects.all().order_by("name")
+            return super().get_queryset().order_by("name")
         except Exception as e:
-            log_error(f"Ошибка при загрузке списка услуг пользователем {self.request.user}: {str(e)}")
+            log_error("Ошибка при загрузке списка услуг: %s", e, user=self.request.user)
             messages.error(self.request, "Произошла ошибка при загрузке списка услуг.")
             return Service.objects.none()
 
 
-class ServiceDetailView(LoginRequiredMixin, DetailView):
+class ServiceDetailView(LoginRequiredMixin, ReplicaReadMixin, ScopedQuerysetMixin, DetailView):
     """
     Представление для детального просмотра услуги.
 
@@ -50,15 +63,15 @@ class ServiceDetailView(LoginRequiredMixin, DetailView):
         """Обрабатывает GET-запрос с логированием и обработкой ошибок."""
         try:
             response = super().get(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} просмотрел услугу {self.object.name}")
+            log_success("Пользователь просмотрел услугу", user=request.user, obj=self.object)
             return response
         except Exception as e:
-            log_error(f"Ошибка при просмотре услуги пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при просмотре услуги: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при загрузке данных услуги.")
             return HttpResponseRedirect(reverse("service_list"))
 
 
-class ServiceCreateView(LoginRequiredMixin, CreateView):
+class ServiceCreateView(LoginRequiredMixin, RolePermissionMixin, CreateView):
     """
     Представление для создания новой услуги.
 
@@ -69,30 +82,24 @@ class ServiceCreateView(LoginRequiredMixin, CreateView):
     form_class: Type[ServiceForm] = ServiceForm
     template_name: str = "crm/service_form.html"
     success_url: str = reverse_lazy("service_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался создать услугу без прав")
-            messages.error(request, "У вас недостаточно прав для создания услуг.")
-            return HttpResponseRedirect(reverse("service_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "service.add"
+    permission_denied_message = "У вас недостаточно прав для создания услуг."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного создания."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} создал новую услугу: {self.object.name}")
+        log_success("Пользователь создал новую услугу", user=self.request.user, obj=self.object)
         messages.success(self.request, "Услуга успешно создана!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог создать услугу: {form.errors}")
+        log_warning("Пользователь не смог создать услугу", user=self.request.user, errors=form.errors.get_json_data())
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class ServiceUpdateView(LoginRequiredMixin, UpdateView):
+class ServiceUpdateView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, UpdateView):
     """
     Представление для редактирования услуги.
 
@@ -103,30 +110,29 @@ class ServiceUpdateView(LoginRequiredMixin, UpdateView):
     form_class: Type[ServiceForm] = ServiceForm
     template_name: str = "crm/service_form.html"
     success_url: str = reverse_lazy("service_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался редактировать услугу без прав")
-            messages.error(request, "У вас недостаточно прав для редактирования услуг.")
-            return HttpResponseRedirect(reverse("service_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "service.change"
+    permission_denied_message = "У вас недостаточно прав для редактирования услуг."
 
     def form_valid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает валидную форму с логированием успешного обновления."""
         response = super().form_valid(form)
-        log_success(f"Пользователь {self.request.user} обновил услугу {self.object.name}")
+        log_success("Пользователь обновил услугу", user=self.request.user, obj=self.object)
         messages.success(self.request, "Услуга успешно обновлена!")
         return response
 
     def form_invalid(self, form: BaseModelForm) -> HttpResponse:
         """Обрабатывает невалидную форму с логированием ошибок."""
-        log_warning(f"Пользователь {self.request.user} не смог обновить услугу {self.object.name}: {form.errors}")
+        log_warning(
+            "Пользователь не смог обновить услугу",
+            user=self.request.user,
+            obj=self.object,
+            errors=form.errors.get_json_data(),
+        )
         messages.error(self.request, "Исправьте ошибки в форме.")
         return super().form_invalid(form)
 
 
-class ServiceDeleteView(LoginRequiredMixin, DeleteView):
+class ServiceDeleteView(LoginRequiredMixin, RolePermissionMixin, ScopedQuerysetMixin, DeleteView):
     """
     Представление для удаления услуги.
 
@@ -136,25 +142,18 @@ class ServiceDeleteView(LoginRequiredMixin, DeleteView):
     model: Type[Service] = Service
     template_name: str = "crm/service_confirm_delete.html"
     success_url: str = reverse_lazy("service_list")
-
-    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        """Проверяет права пользователя перед обработкой запроса."""
-        if not (request.user.is_marketer or request.user.is_admin):
-            log_warning(f"Пользователь {request.user} попытался удалить услугу без прав")
-            messages.error(request, "У вас недостаточно прав для удаления услуг.")
-            return HttpResponseRedirect(reverse("service_list"))
-        return super().dispatch(request, *args, **kwargs)
+    permission = "service.delete"
+    permission_denied_message = "У вас недостаточно прав для удаления услуг."
 
     def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """Обрабатывает удаление услуги с логированием."""
         try:
             service = self.get_object()
-            service_name = service.name
             response = super().delete(request, *args, **kwargs)
-            log_success(f"Пользователь {request.user} удалил услугу {service_name}")
+            log_success("Пользователь удалил услугу", user=request.user, obj=service)
             messages.success(request, "Услуга успешно удалена!")
             return response
         except Exception as e:
-            log_error(f"Ошибка при удалении услуги пользователем {request.user}: {str(e)}")
+            log_error("Ошибка при удалении услуги: %s", e, user=request.user)
             messages.error(request, "Произошла ошибка при удалении услуги.")
             return HttpResponseRedirect(reverse("service_detail", kwargs={"pk": self.get_object().pk}))
@@ -1,30 +1,41 @@
 """Views для работы со статистикой."""
 
+from crm.aggregates import campaign_timeseries
+from crm.cache import cached_result
+from crm.forms import StatsFilterForm
+from crm.models.campaign_stats import CampaignStats
 from crm.models.campaigns import Campaign
 from crm.models.clients import Client
+from crm.models.contracts import Contract
 from crm.models.leads import Lead
+from crm.models.services import Service
+from crm.replicas import ReplicaReadMixin
+import datetime
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, F, Prefetch, Sum
+from django.utils import timezone
 from django.views.generic import TemplateView
 from services.logging_utils import log_error, log_success
 from typing import Any, Dict
 
-class CampaignStatsView(LoginRequiredMixin, TemplateView):
+class CampaignStatsView(LoginRequiredMixin, ReplicaReadMixin, TemplateView):
     """
     Представление для отображения статистики по маркетинговым кампаниям.
 
-    Показывает количество лидов, конвертированных клиентов и ROI для каждой кампании.
+    Показывает количество лидов, конвертированных клиентов и ROI для каждой кампании,
+    а также ряды по дням, неделям или месяцам за выбранный диапазон дат.
     Доступно только для авторизованных пользователей.
     """
 
     template_name = "crm/campaign_stats.html"
+    default_period_days: int = 30
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         """
         Формирует контекст данных для отображения статистики кампаний.
 
-        Включает оптимизированные запросы к базе данных и обработку ошибок.
+        Итоги читаются из сводки CampaignStats, ряды — из дневных срезов CampaignDailyStats;
+        обе таблицы поддерживаются сигналами и командой rebuild_campaign_stats.
 
         Возвращает:
             dict: Контекст данных с информацией о кампаниях и их статистике
@@ -32,49 +43,48 @@ class CampaignStatsView(LoginRequiredMixin, TemplateView):
         context: Dict[str, Any] = super().get_context_data(**kwargs)
         user = self.request.user
 
+        filter_form = StatsFilterForm(self.request.GET or None)
+        context["filter_form"] = filter_form
+
         try:
-            # Оптимизированные запросы с использованием select_related и prefetch_related
-            campaigns = (
-                Campaign.objects.select_related("service")
-                .prefetch_related(
-                    Prefetch(
-                        "lead_set",
-                        queryset=Lead.objects.select_related("campaign").prefetch_related(
-                            Prefetch("client", queryset=Client.objects.select_related("contract", "lead"))
-                        ),
-                        to_attr="prefetched_leads",
-                    )
-                )
-                .annotate(
-                    lead_count=Count("lead"),
-                    client_count=Count("lead__client"),
-                    roi=Sum(F("lead__client__contract__amount") - F("budget")),
-                )
-                .order_by("-created_at")
-            )  # Сортировка по дате создания вместо start_date
+            filters = filter_form.cleaned_data if filter_form.is_bound and filter_form.is_valid() else {}
+            date_to = filters.get("date_to") or timezone.localdate()
+            date_from = filters.get("date_from") or date_to - datetime.timedelta(days=self.default_period_days)
+            granularity = filters.get("granularity") or "day"
+            dimension = filters.get("dimension") or "campaign"
 
-            # Расчет коэффициента конверсии с проверкой деления на ноль
-            for campaign in campaigns:
-                campaign.conversion_rate = (
-                    (campaign.client_count * 100.0 / campaign.lead_count) if campaign.lead_count > 0 else 0
+            context.update(
+                cached_result(
+                    "campaign_stats",
+                    [Service, Campaign, Lead, Contract, Client],
+                    lambda: self.build_stats(date_from, date_to, granularity, dimension),
+                    params=(date_from, date_to, granularity, dimension),
                 )
-                campaign.conversion_rate = round(campaign.conversion_rate, 1)  # Округляем до 1 знака после запятой
+            )
 
-            context["campaigns"] = campaigns
-
-            # Дополнительная агрегация для общей статистики
-            total_stats = {
-                "total_leads": sum(c.lead_count for c in campaigns),
-                "total_clients": sum(c.client_count for c in campaigns),
-                "total_roi": sum(c.roi for c in campaigns if c.roi is not None),
-                "avg_conversion": (sum(c.conversion_rate for c in campaigns) / len(campaigns)) if campaigns else 0,
-            }
-            context.update(total_stats)
-
-            log_success(f"Пользователь {user} успешно загрузил статистику кампаний")
+            log_success("Пользователь успешно загрузил статистику кампаний", user=user)
             return context
 
         except Exception as e:
-            log_error(f"Ошибка при расчете статистики кампаний пользователем {user}: {str(e)}")
+            log_error("Ошибка при расчете статистики кампаний: %s", e, user=user)
             messages.error(self.request, "Произошла ошибка при загрузке статистики кампаний.")
             return context
+
+    def build_stats(
+        self, date_from: datetime.date, date_to: datetime.date, granularity: str, dimension: str
+    ) -> Dict[str, Any]:
+        """Вычисляет итоги по кампаниям и временные ряды за период (результат кэшируется)."""
+        stats = list(CampaignStats.objects.select_related("campaign__service").order_by("-campaign__created_at"))
+        return {
+            "stats": stats,
+            # Итоги считаются по уже загруженным строкам сводки (по одной на кампанию)
+            "total_leads": sum(s.lead_count for s in stats),
+            "total_clients": sum(s.client_count for s in stats),
+            "total_roi": sum(s.roi for s in stats),
+            "avg_conversion": (sum(s.conversion_rate for s in stats) / len(stats)) if stats else 0,
+            "series": campaign_timeseries(
+                granularity=granularity, dimension=dimension, date_from=date_from, date_to=date_to
+            ),
+            "date_from": date_from,
+            "date_to": date_to,
+        }
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from dotenv import load_dotenv
 import os
 from pathlib import Path
+import tempfile
 
 load_dotenv()
 
@@ -49,11 +50,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "crm.middleware.RequestMetricsMiddleware",
+    "crm.middleware.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "crm.middleware.AuditMiddleware",
+    "crm.middleware.RequestProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -94,8 +99,123 @@ DATABASES = {
     }
 }
 
+# Соединения с БД. На PostgreSQL с psycopg 3 каждый процесс (WSGI и ASGI) держит пул соединений
+# psycopg_pool: запрос берет соединение из пула и возвращает его по завершении, соединение проверяется
+# при выдаче (CONN_HEALTH_CHECKS), поэтому после перезапуска сервера БД разорванные соединения
+# заменяются новыми без ошибок запросов. Размеры пула и ожидание свободного соединения (секунды)
+# задаются DB_POOL_*; DB_POOL=0 отключает пул. Без пула (psycopg2, SQLite) соединение живет
+# DB_CONN_MAX_AGE секунд (0 — новое соединение на каждый запрос; под ASGI оставляйте 0).
+DB_POOL = os.getenv("DB_POOL", "1") == "1"
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+if DB_POOL and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "0"))
+
+# Реплики для чтения (crm.replicas): через запятую; для SQLite — пути к копиям файла БД,
+# для остальных СУБД — хосты (host или host:port) с теми же именем БД и учетными данными
+for number, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1):
+    if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+        location = {"NAME": replica}
+    else:
+        host, _, port = replica.partition(":")
+        location = {"HOST": host, "PORT": port or DATABASES["default"]["PORT"]}
+    DATABASES[f"replica{number}"] = {**DATABASES["default"], **location, "TEST": {"MIRROR": "default"}}
+
+DATABASE_ROUTERS = ["crm.replicas.ReplicaRouter"]
+# Время закрепления клиента за основной БД после записи и допустимое отставание реплики (секунды),
+# период проверки отставания реплик каждым процессом
+CRM_REPLICA_PIN_SECONDS = float(os.getenv("CRM_REPLICA_PIN_SECONDS", "5"))
+CRM_REPLICA_CHECK_INTERVAL = float(os.getenv("CRM_REPLICA_CHECK_INTERVAL", "5"))
+
 AUTH_USER_MODEL = "accounts.User"
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# По умолчанию local-memory (отдельный кэш на процесс); для нескольких воркеров
+# укажите общий бэкенд, например django.core.cache.backends.filebased.FileBasedCache.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "crm-default"),
+    }
+}
+
+# Пользователь сессии загружается через кэш (accounts.backends), сессии читаются из кэша и пишутся
+# в БД и кэш: в установившемся режиме аутентификация запроса не обращается к БД.
+# Выход и смена пароля или роли сбрасывают записи только в том кэше, где они выполнены, поэтому
+# кэширование включается только с общим бэкендом кэша; с кэшем процесса пользователь и сессия читаются из БД.
+# Явная настройка кэширования с кэшем процесса — ошибка проверки accounts.E001 (accounts.checks).
+CRM_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+_shared_cache = CACHES["default"]["BACKEND"] not in CRM_LOCAL_CACHE_BACKENDS
+AUTHENTICATION_BACKENDS = [
+    "accounts.backends.CachedModelBackend" if _shared_cache else "django.contrib.auth.backends.ModelBackend"
+]
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if _shared_cache else "django.contrib.sessions.backends.db",
+)
+CRM_USER_CACHE_TIMEOUT = int(os.getenv("CRM_USER_CACHE_TIMEOUT", "300"))
+
+# Время жизни записей версионируемого кэша результатов CRM (секунды); с кэшем процесса
+# (CRM_LOCAL_CACHE_BACKENDS) результаты не кэшируются, см. crm.cache
+CRM_CACHE_TIMEOUT = int(os.getenv("CRM_CACHE_TIMEOUT", "300"))
+
+# Прием лидов от рекламных систем (crm.ingest): токены через запятую, без токенов прием отключен
+CRM_INGEST_TOKENS = [token for token in os.getenv("CRM_INGEST_TOKENS", "").split(",") if token]
+CRM_INGEST_BATCH_SIZE = int(os.getenv("CRM_INGEST_BATCH_SIZE", "500"))
+CRM_INGEST_FLUSH_INTERVAL = float(os.getenv("CRM_INGEST_FLUSH_INTERVAL", "0.05"))
+CRM_INGEST_MAX_LEADS = int(os.getenv("CRM_INGEST_MAX_LEADS", "1000"))
+
+# Метрики запросов (crm.metrics): каталог снимков воркеров (очищается при развертывании; пусто — только
+# метрики процесса, обслужившего запрос), период сброса снимка в секундах и токены сборщика через запятую
+CRM_METRICS_DIR = os.getenv("CRM_METRICS_DIR", os.path.join(tempfile.gettempdir(), "crm-metrics"))
+CRM_METRICS_FLUSH_INTERVAL = float(os.getenv("CRM_METRICS_FLUSH_INTERVAL", "1"))
+CRM_METRICS_TOKENS = [token for token in os.getenv("CRM_METRICS_TOKENS", "").split(",") if token]
+
+# Поиск N+1 (crm.querybudget): число выполнений одной формы SQL за запрос, начиная с которого
+# запрос считается N+1 (0 — проверка отключена); при CRM_QUERY_REPEAT_RAISE вместо записи в журнал — исключение
+CRM_QUERY_REPEAT_THRESHOLD = int(os.getenv("CRM_QUERY_REPEAT_THRESHOLD", "5"))
+CRM_QUERY_REPEAT_RAISE = os.getenv("CRM_QUERY_REPEAT_RAISE", "") == "1"
+
+# Профилирование запросов администраторами (crm.profiling): каталог отчетов и число хранимых отчетов
+CRM_PROFILE_DIR = os.getenv("CRM_PROFILE_DIR", os.path.join(LOGS_DIR, "profiles"))
+CRM_PROFILE_KEEP = int(os.getenv("CRM_PROFILE_KEEP", "50"))
+
+# Журнал медленных SQL-запросов (crm.slowqueries): порог в миллисекундах (0 — журнал отключен),
+# доля медленных SELECT, для которых на PostgreSQL снимается план EXPLAIN (без ANALYZE), и файл журнала
+CRM_SLOW_QUERY_MS = float(os.getenv("CRM_SLOW_QUERY_MS", "100"))
+CRM_SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("CRM_SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+CRM_SLOW_QUERY_LOG = os.path.join(LOGS_DIR, "slow_queries.log")
+
+# Журнал аудита (crm.audit): срок хранения событий в днях для команды prune_audit
+CRM_AUDIT_RETENTION_DAYS = int(os.getenv("CRM_AUDIT_RETENTION_DAYS", "365"))
+
+# Архив лидов (crm.archive): возраст в месяцах, после которого неконвертированные лиды переносятся
+# командой archive_leads из рабочей таблицы в секционированный архив
+CRM_LEAD_ARCHIVE_MONTHS = int(os.getenv("CRM_LEAD_ARCHIVE_MONTHS", "12"))
+
+# Отдача документов договоров (crm.downloads) после проверки прав: "nginx" — X-Accel-Redirect
+# на internal-локацию CRM_SENDFILE_PREFIX, отображенную на MEDIA_ROOT; "xsendfile" — X-Sendfile
+# с абсолютным путем (Apache, lighttpd); пусто — потоково из Django с поддержкой Range и ETag
+CRM_SENDFILE_BACKEND = os.getenv("CRM_SENDFILE_BACKEND", "")
+CRM_SENDFILE_PREFIX = os.getenv("CRM_SENDFILE_PREFIX", "/protected/")
+
+# Документы договоров хранятся по хэшу содержимого (crm.storage, STORAGES["documents"] ниже);
+# файлы без ссылок старше CRM_DOCUMENT_ORPHAN_HOURS часов удаляет команда prune_documents
+CRM_DOCUMENT_ORPHAN_HOURS = int(os.getenv("CRM_DOCUMENT_ORPHAN_HOURS", "24"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -138,46 +258,82 @@ DATE_INPUT_FORMATS = [
 
 STATIC_URL = "static/"
 
+# Хранилища файлов: documents — документы договоров с адресацией по содержимому (crm.storage)
+# https://docs.djangoproject.com/en/5.1/ref/settings/#storages
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "documents": {"BACKEND": "crm.storage.ContentAddressedStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Логирование: обработчики ставят записи в очередь, файлы и консоль пишет фоновый поток
+# пачками (services.logging_pipeline); файлы в JSON с ротацией по размеру.
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Доля событий успеха, попадающих в журнал (1.0 — все)
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {message}",
-            "style": "{",
+        "json": {
+            "()": "services.logging_pipeline.StructuredFormatter",
         },
         "simple": {
-            "format": "{levelname} {message}",
-            "style": "{",
+            "()": "services.logging_pipeline.StructuredFormatter",
+            "json_output": False,
         },
     },
     "handlers": {
         "file_success": {
             "level": "INFO",
-            "class": "logging.FileHandler",
-            "filename": "logs/success.log",
-            "formatter": "verbose",
+            "class": "services.logging_pipeline.QueuedRotatingFileHandler",
+            "filename": os.path.join(LOGS_DIR, "success.log"),
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "json",
         },
         "file_warning": {
             "level": "WARNING",
-            "class": "logging.FileHandler",
-            "filename": "logs/warning.log",
-            "formatter": "verbose",
+            "class": "services.logging_pipeline.QueuedRotatingFileHandler",
+            "filename": os.path.join(LOGS_DIR, "warning.log"),
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "json",
         },
         "file_error": {
             "level": "ERROR",
-            "class": "logging.FileHandler",
-            "filename": "logs/error.log",
-            "formatter": "verbose",
+            "class": "services.logging_pipeline.QueuedRotatingFileHandler",
+            "filename": os.path.join(LOGS_DIR, "error.log"),
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "json",
+        },
+        "file_slow_query": {
+            "level": "WARNING",
+            "class": "services.logging_pipeline.QueuedRotatingFileHandler",
+            "filename": CRM_SLOW_QUERY_LOG,
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "json",
         },
         "console": {
             "level": "DEBUG",
-            "class": "logging.StreamHandler",
+            "class": "services.logging_pipeline.QueuedStreamHandler",
             "formatter": "simple",
         },
     },
@@ -197,5 +353,10 @@ LOGGING = {
             "level": "ERROR",
             "propagate": True,
         },
+        "slow_query": {
+            "handlers": ["file_slow_query"],
+            "level": "WARNING",
+            "propagate": False,
+        },
     },
 }
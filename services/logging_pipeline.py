@@ -0,0 +1,190 @@
+"""
+Неблокирующий конвейер логирования.
+
+Обработчики модуля не пишут в файл или консоль в потоке запроса: emit только ставит запись
+в общую очередь, а фоновый поток-писатель забирает записи пачками, форматирует их
+и сбрасывает каждый поток вывода один раз на пачку. Файловый обработчик ротирует логи по размеру.
+
+StructuredFormatter выводит записи в JSON (или в текстовом виде для консоли) вместе
+со структурированным контекстом из services.logging_utils: id пользователя, тип и pk объекта и т.п.
+
+Сообщение форматируется лениво, уже в потоке-писателе, поэтому аргументы сообщений
+должны быть простыми значениями (числа, строки), а не объектами моделей.
+"""
+
+import atexit
+import datetime
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+CONTEXT_ATTR = "context"
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Форматтер записей с контекстом.
+
+    Атрибуты:
+        json_output (bool): JSON-объект на строку (иначе — текст «уровень сообщение ключ=значение»)
+    """
+
+    def __init__(self, *args: Any, json_output: bool = True, **kwargs: Any) -> None:
+        """Инициализирует форматтер."""
+        super().__init__(*args, **kwargs)
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Форматирует запись."""
+        context: Dict[str, Any] = getattr(record, CONTEXT_ATTR, None) or {}
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if not self.json_output:
+            extra = " ".join(f"{key}={value}" for key, value in context.items())
+            text = f"{record.levelname} {message}" + (f" [{extra}]" if extra else "")
+            return f"{text}\n{record.exc_text}" if record.exc_text else text
+
+        payload: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": message,
+            **context,
+        }
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class BackgroundWriter(threading.Thread):
+    """
+    Фоновый поток, записывающий записи логов пачками.
+
+    Атрибуты:
+        batch_size (int): Максимальное количество записей в пачке
+        flush_interval (float): Максимальное ожидание новой записи, секунд
+        dropped (int): Количество записей, отброшенных из-за переполнения очереди
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5, maxsize: int = 100_000) -> None:
+        """Инициализирует поток-писатель с ограниченной очередью."""
+        super().__init__(name="log-writer", daemon=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+
+    def put(self, handler: "QueuedHandlerMixin", record: logging.LogRecord) -> None:
+        """Ставит запись в очередь, не блокируя вызывающий поток (при переполнении запись отбрасывается)."""
+        try:
+            self.queue.put_nowait((handler, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        """Забирает записи пачками и передает их обработчикам."""
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is self._STOP for entry in batch)
+            self.write([entry for entry in batch if entry is not self._STOP])
+            if stop:
+                return
+
+    @staticmethod
+    def write(batch: List[Tuple["QueuedHandlerMixin", logging.LogRecord]]) -> None:
+        """Группирует пачку по обработчикам и передает каждому его записи."""
+        grouped: Dict[int, Tuple["QueuedHandlerMixin", List[logging.LogRecord]]] = {}
+        for handler, record in batch:
+            grouped.setdefault(id(handler), (handler, []))[1].append(record)
+        for handler, records in grouped.values():
+            handler.write_batch(records)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Дописывает накопленные записи и останавливает поток."""
+        if self.is_alive():
+            self.queue.put(self._STOP)
+            self.join(timeout)
+
+
+_writer: Optional[BackgroundWriter] = None
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> BackgroundWriter:
+    """Возвращает поток-писатель процесса, запуская его при первом обращении (и заново после fork)."""
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = BackgroundWriter()
+                _writer_pid = os.getpid()
+                _writer.start()
+                atexit.register(_writer.stop)
+    return _writer
+
+
+class QueuedHandlerMixin:
+    """Примесь обработчика: emit ставит запись в очередь, запись выполняет поток-писатель."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Передает запись потоку-писателю."""
+        get_writer().put(self, record)
+
+    def write_batch(self, records: List[logging.LogRecord]) -> None:
+        """Записывает пачку и сбрасывает буфер потока вывода один раз."""
+        self.acquire()  # type: ignore[attr-defined]
+        try:
+            for record in records:
+                try:
+                    self.write_record(record)
+                except Exception:
+                    self.handleError(record)  # type: ignore[attr-defined]
+            self.flush()  # type: ignore[attr-defined]
+        finally:
+            self.release()  # type: ignore[attr-defined]
+
+    def write_record(self, record: logging.LogRecord) -> None:
+        """Записывает одну запись без сброса буфера."""
+        raise NotImplementedError
+
+
+class QueuedStreamHandler(QueuedHandlerMixin, logging.StreamHandler):
+    """Неблокирующий обработчик вывода в поток (консоль)."""
+
+    def write_record(self, record: logging.LogRecord) -> None:
+        """Записывает отформатированную запись в поток."""
+        self.stream.write(self.format(record) + self.terminator)
+
+
+class QueuedRotatingFileHandler(QueuedHandlerMixin, RotatingFileHandler):
+    """Неблокирующий файловый обработчик с ротацией по размеру (maxBytes, backupCount)."""
+
+    def write_record(self, record: logging.LogRecord) -> None:
+        """Записывает отформатированную запись в файл, предварительно ротируя его при необходимости."""
+        if self.stream is None:
+            self.stream = self._open()
+        message = self.format(record) + self.terminator
+        if self.maxBytes > 0:
+            self.stream.seek(0, 2)  # в режиме дозаписи позиция не определена до первой записи
+            if self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.maxBytes:
+                self.doRollover()
+        self.stream.write(message)
@@ -1,17 +1,71 @@
-from logging import getLogger
+"""
+Функции журналирования событий CRM.
+
+Сообщение передается шаблоном в стиле % с аргументами и форматируется лениво — только если запись
+действительно будет выведена, и уже в фоновом потоке-писателе (см. services.logging_pipeline).
+Пользователь и объект модели попадают в запись структурированными полями (user_id, object, object_id),
+без вызова __str__, который у части моделей выполняет дополнительный SQL-запрос.
+
+События успеха могут прореживаться: в журнал попадает доля LOG_SUCCESS_SAMPLE_RATE из них,
+значение доли сохраняется в поле sample_rate записи.
+"""
+
+from django.conf import settings
+from logging import ERROR, INFO, WARNING, Logger, getLogger
+import random
+from typing import Any, Dict, Optional
 
 success_logger = getLogger("success")
 warning_logger = getLogger("warning")
 error_logger = getLogger("error")
 
 
-def log_success(message: str) -> None:
-    success_logger.info(message)
+def _context(user: Any, obj: Any, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Собирает структурированный контекст записи."""
+    context: Dict[str, Any] = {}
+    if user is not None:
+        context["user_id"] = user.pk if getattr(user, "is_authenticated", False) else None
+    if obj is not None:
+        context["object"] = obj._meta.label_lower
+        context["object_id"] = obj.pk
+    context.update(fields)
+    return context
+
+
+def _log(
+    logger: Logger,
+    level: int,
+    message: str,
+    args: tuple,
+    user: Any,
+    obj: Any,
+    fields: Dict[str, Any],
+    exc_info: Optional[bool] = None,
+) -> None:
+    """Передает запись логгеру, если ее уровень включен."""
+    if logger.isEnabledFor(level):
+        context = _context(user, obj, fields)
+        logger.log(level, message, *args, exc_info=exc_info, extra={"context": context}, stacklevel=3)
+
+
+def log_success(message: str, *args: Any, user: Any = None, obj: Any = None, **fields: Any) -> None:
+    """Записывает успешное событие (с учетом прореживания LOG_SUCCESS_SAMPLE_RATE)."""
+    rate: float = getattr(settings, "LOG_SUCCESS_SAMPLE_RATE", 1.0)
+    if rate < 1.0:
+        # Прореживание логов, а не криптография
+        if random.random() >= rate:  # noqa: S311
+            return
+        fields["sample_rate"] = rate
+    _log(success_logger, INFO, message, args, user, obj, fields)
 
 
-def log_warning(message: str) -> None:
-    warning_logger.warning(message)
+def log_warning(message: str, *args: Any, user: Any = None, obj: Any = None, **fields: Any) -> None:
+    """Записывает предупреждение."""
+    _log(warning_logger, WARNING, message, args, user, obj, fields)
 
 
-def log_error(message: str) -> None:
-    error_logger.error(message)
+def log_error(
+    message: str, *args: Any, user: Any = None, obj: Any = None, exc_info: Optional[bool] = None, **fields: Any
+) -> None:
+    """Записывает ошибку; при exc_info=True к записи прикладывается трассировка текущего исключения."""
+    _log(error_logger, ERROR, message, args, user, obj, fields, exc_info)
@@ -0,0 +1,12 @@
+"""Вспомогательные функции для представлений."""
+
+from django.http import HttpRequest
+import hmac
+from typing import Iterable
+
+def has_bearer_token(request: HttpRequest, tokens: Iterable[str]) -> bool:
+    """Проверяет токен из заголовка "Authorization: Bearer <токен>" сравнением за постоянное время."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), known.encode()) for known in tokens)